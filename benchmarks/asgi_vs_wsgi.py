@@ -0,0 +1,242 @@
+"""
+Список и страница заметки под WSGI и ASGI при медленных клиентах.
+
+Медленные клиенты открывают соединение и передают заголовки запроса
+по строке с паузами. Синхронный сервер с ограниченным числом потоков
+держит на каждом таком клиенте поток, и быстрые запросы ждут в очереди;
+под ASGI медленный клиент занимает только сокет, а представление
+выполняется в пуле notes.async_views. Бенчмарк измеряет пропускную
+способность и задержки быстрых клиентов.
+
+Для ASGI нужен uvicorn (pip install uvicorn).
+
+    python -m benchmarks.asgi_vs_wsgi --threads 8 --slow 32 --seconds 10
+"""
+import argparse
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+from benchmarks.utils import setup_django, summarize, temporary_database
+
+HOST = '127.0.0.1'
+NOTES_COUNT = 200
+
+
+def serve(server, db_name, port, threads):
+    """Запускает сервер в этом процессе; вызывается в подпроцессе."""
+    if server == 'asgi':
+        os.environ['YANOTE_ASYNC_READ_VIEWS'] = '1'
+        os.environ['YANOTE_ASYNC_THREADS'] = str(threads)
+    setup_django()
+    from django.db import connection
+    connection.settings_dict['NAME'] = db_name
+
+    if server == 'asgi':
+        try:
+            import uvicorn
+        except ImportError:
+            sys.exit('Для ASGI нужен uvicorn: pip install uvicorn')
+        from yanote.asgi import application
+        uvicorn.run(application, host=HOST, port=port, log_level='warning')
+    else:
+        from yanote.wsgi import application
+        make_wsgi_server(application, port, threads).serve_forever()
+
+
+def make_wsgi_server(application, port, threads):
+    """
+    WSGI-сервер из wsgiref с пулом в threads потоков.
+
+    Как у синхронных рабочих gunicorn, поток занят соединением
+    с момента приёма и до отправки ответа, включая чтение запроса.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+    from django.db import close_old_connections
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_message(self, *args):
+            pass
+
+    class PooledWSGIServer(WSGIServer):
+        request_queue_size = 1024
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.pool = ThreadPoolExecutor(max_workers=threads)
+
+        def process_request(self, request, client_address):
+            self.pool.submit(self.handle_in_thread, request, client_address)
+
+        def handle_in_thread(self, request, client_address):
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+                close_old_connections()
+
+    server = PooledWSGIServer((HOST, port), QuietHandler)
+    server.set_app(application)
+    return server
+
+
+def prepare_data():
+    """Автор с заметками и cookie его сессии."""
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.test import Client
+
+    from notes.models import Note
+
+    author = get_user_model().objects.create(username='benchmark')
+    Note.objects.bulk_create(
+        Note(title=f'Заметка {index}', text='Текст ' * 50,
+             slug=f'note-{index}', author=author)
+        for index in range(NOTES_COUNT)
+    )
+    client = Client()
+    client.force_login(author)
+    session = client.cookies[settings.SESSION_COOKIE_NAME].value
+    return f'{settings.SESSION_COOKIE_NAME}={session}'
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((HOST, port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f'Сервер не запустился на порту {port}')
+
+
+def slow_client(port, cookie, drip, stop):
+    """Передаёт запрос по строке заголовков с паузой drip секунд."""
+    lines = [
+        'GET /notes/ HTTP/1.1', f'Host: {HOST}', f'Cookie: {cookie}',
+        'User-Agent: slow-client', 'Accept: text/html',
+        'Connection: close',
+    ]
+    while not stop.is_set():
+        try:
+            with socket.create_connection((HOST, port), timeout=30) as sock:
+                for line in lines:
+                    sock.sendall(f'{line}\r\n'.encode())
+                    if stop.wait(drip):
+                        return
+                sock.sendall(b'\r\n')
+                while sock.recv(65536):
+                    pass
+        except OSError:
+            stop.wait(0.1)
+
+
+def fast_client(port, cookie, paths, stop, latencies, errors):
+    connection = http.client.HTTPConnection(HOST, port, timeout=60)
+    index = 0
+    while not stop.is_set():
+        path = paths[index % len(paths)]
+        index += 1
+        started = time.perf_counter()
+        try:
+            connection.request('GET', path, headers={'Cookie': cookie})
+            response = connection.getresponse()
+            response.read()
+            if response.status != 200:
+                raise http.client.HTTPException(response.status)
+        except (OSError, http.client.HTTPException):
+            errors.append(path)
+            connection.close()
+            connection = http.client.HTTPConnection(HOST, port, timeout=60)
+            continue
+        latencies.append(time.perf_counter() - started)
+    connection.close()
+
+
+def run(server, db_name, cookie, args):
+    port = free_port()
+    process = subprocess.Popen([
+        sys.executable, '-m', 'benchmarks.asgi_vs_wsgi', '--serve', server,
+        '--db', db_name, '--port', str(port),
+        '--threads', str(args.threads),
+    ])
+    try:
+        wait_for_port(port)
+        stop = threading.Event()
+        latencies, errors = [], []
+        paths = ['/notes/'] + [
+            f'/note/note-{index}/' for index in range(0, NOTES_COUNT, 20)
+        ]
+        clients = [
+            threading.Thread(target=slow_client,
+                             args=(port, cookie, args.drip, stop))
+            for _ in range(args.slow)
+        ] + [
+            threading.Thread(target=fast_client,
+                             args=(port, cookie, paths, stop,
+                                   latencies, errors))
+            for _ in range(args.fast)
+        ]
+        for client in clients:
+            client.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for client in clients:
+            client.join()
+    finally:
+        process.terminate()
+        process.wait()
+    totals = {
+        name: round(value, 2) for name, value in summarize(latencies).items()
+    }
+    totals['rps'] = round(len(latencies) / args.seconds, 1)
+    totals['errors'] = len(errors)
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--threads', type=int, default=8,
+                        help='потоков сервера или пула ORM')
+    parser.add_argument('--slow', type=int, default=32,
+                        help='медленных клиентов')
+    parser.add_argument('--fast', type=int, default=4,
+                        help='быстрых клиентов')
+    parser.add_argument('--drip', type=float, default=0.5,
+                        help='пауза между строками запроса, секунды')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--servers', default='wsgi,asgi')
+    parser.add_argument('--serve', choices=('wsgi', 'asgi'),
+                        help=argparse.SUPPRESS)
+    parser.add_argument('--db', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.db, args.port, args.threads)
+        return
+
+    setup_django()
+    with temporary_database() as db_name:
+        cookie = prepare_data()
+        for server in args.servers.split(','):
+            print(server, run(server, db_name, cookie, args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Цена сжатия ответов: процессорное время против сэкономленных байтов.
+
+Бенчмарк отрисовывает типичные страницы (список, короткая и длинная
+заметка, поиск, выгрузка NDJSON) и сжимает их тела тем же кодом,
+что и CompressionMiddleware, на разных уровнях gzip и brotli.
+
+    python -m benchmarks.compression --repeat 50
+"""
+import argparse
+import time
+
+from benchmarks.routes import note_text
+from benchmarks.utils import setup_django, temporary_database
+
+# Brotli выше 6 на динамических ответах на порядки медленнее gzip.
+LEVELS = {'gzip': (1, 6, 9), 'br': (1, 4, 6)}
+
+
+def render_pages():
+    """Несжатые тела страниц: словарь имя -> список частей."""
+    import random
+
+    from django.contrib.auth import get_user_model
+    from django.test import Client
+
+    from notes.models import Note
+
+    rng = random.Random(0)
+    author = get_user_model().objects.create(username='benchmark')
+    Note.objects.bulk_create(
+        Note(title=f'Заметка {index}', text=note_text(rng),
+             slug=f'note-{index}', author=author)
+        for index in range(1000)
+    )
+    Note.objects.create(title='Короткая', text='Купить хлеба.',
+                        slug='short', author=author)
+    Note.objects.create(title='Длинная', text=note_text(rng) * 20,
+                        slug='long', author=author)
+    client = Client()
+    client.force_login(author)
+    pages = {}
+    for name, url in (
+        ('list', '/notes/'),
+        ('detail-short', '/note/short/'),
+        ('detail-long', '/note/long/'),
+        ('search', '/search/?q=' + 'заметка'),
+        ('export-ndjson', '/export/?format=ndjson'),
+    ):
+        response = client.get(url)
+        pages[name] = (
+            list(response.streaming_content) if response.streaming
+            else [response.content]
+        )
+    return pages
+
+
+def measure(chunks, stream_class, repeat, flush_size):
+    from notes.middleware import compress_chunks
+
+    started = time.process_time()
+    for _ in range(repeat):
+        size = sum(
+            len(data)
+            for data in compress_chunks(chunks, stream_class(), flush_size)
+        )
+    return size, (time.process_time() - started) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.test import override_settings
+
+    from notes import middleware
+
+    streams = {'gzip': (middleware.GzipStream, 'NOTES_GZIP_LEVEL')}
+    if middleware.brotli is not None:
+        streams['br'] = (middleware.BrotliStream, 'NOTES_BROTLI_QUALITY')
+    with temporary_database():
+        pages = render_pages()
+    print(f'{"страница":15}{"байт":>10}{"сжатие":>10}{"байт":>10}'
+          f'{"экономия":>10}{"мс ЦП":>10}{"МБ/с":>8}')
+    for name, chunks in pages.items():
+        size = sum(len(chunk) for chunk in chunks)
+        for encoding, (stream_class, setting) in streams.items():
+            for level in LEVELS[encoding]:
+                with override_settings(**{setting: level}):
+                    compressed, seconds = measure(
+                        chunks, stream_class, args.repeat,
+                        settings.NOTES_COMPRESS_FLUSH_SIZE,
+                    )
+                print(
+                    f'{name:15}{size:>10}{f"{encoding}-{level}":>10}'
+                    f'{compressed:>10}{1 - compressed / size:>10.1%}'
+                    f'{seconds * 1000:>10.2f}'
+                    f'{size / seconds / 2 ** 20 if seconds else 0:>8.0f}'
+                )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Пропускная способность очереди фоновых задач.
+
+В очередь ставится --jobs пустых задач, затем обработчик выполняет
+их в режиме burst в пуле потоков разного размера и в пуле процессов.
+Пустая задача не обращается к базе, поэтому измеряется цена самой
+очереди: постановка, выборка, запись результата.
+
+    python -m benchmarks.jobs --jobs 2000
+"""
+import argparse
+import time
+
+from benchmarks.utils import setup_django, temporary_database
+
+WORKERS = (
+    ('потоки', 1, False),
+    ('потоки', 4, False),
+    ('потоки', 16, False),
+    ('процессы', 4, True),
+)
+
+
+def noop(number):
+    """Пустая задача."""
+
+
+def fill(count):
+    from notes import jobs
+
+    started = time.perf_counter()
+    for number in range(count):
+        jobs.enqueue('benchmarks.jobs.noop', priority=number % 3,
+                     number=number)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--jobs', type=int, default=2000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+
+    from notes import jobs
+
+    settings.NOTES_JOBS_SYNC = False
+    print(f'{"пул":<10}{"размер":>7}{"постановка":>16}{"выполнение":>16}')
+    with temporary_database():
+        for kind, concurrency, processes in WORKERS:
+            enqueued = fill(args.jobs)
+            worker = jobs.Worker(
+                concurrency=concurrency, processes=processes,
+                poll_interval=0.01,
+            )
+            started = time.perf_counter()
+            result = worker.run(burst=True)
+            elapsed = time.perf_counter() - started
+            assert result.done == args.jobs, result
+            print(f'{kind:<10}{concurrency:>7}'
+                  f'{args.jobs / enqueued:>12.0f} в с'
+                  f'{args.jobs / elapsed:>12.0f} в с')
+
+
+if __name__ == '__main__':
+    main()
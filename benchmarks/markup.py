@@ -0,0 +1,74 @@
+"""
+Цена отрисовки Markdown и попадания в кэш отрисовки.
+
+Для текстов разной длины с типичной разметкой (абзацы, списки,
+выделение, код, ссылки) измеряется отрисовка без кэша и чтение
+готового HTML из кэша NOTES_CACHE_ALIAS. База данных не нужна.
+
+    python -m benchmarks.markup --repeat 500
+"""
+import argparse
+import random
+import time
+
+from benchmarks.routes import text_of
+from benchmarks.utils import setup_django, summarize
+
+SIZES = (50, 300, 1000, 3000)
+
+
+def markdown_text(rng, words):
+    """Текст примерно из words слов с разметкой в каждом абзаце."""
+    blocks = []
+    while words > 0:
+        size = rng.randint(20, 60)
+        roll = rng.random()
+        if roll < 0.2:
+            blocks.append('\n'.join(
+                f'- {text_of(rng, 4)} **{text_of(rng, 1)}**'
+                for _ in range(size // 5)
+            ))
+        elif roll < 0.3:
+            blocks.append(f'```\n{text_of(rng, size)}\n```')
+        else:
+            blocks.append(
+                f'{text_of(rng, size)} *{text_of(rng, 2)}* '
+                f'[{text_of(rng, 1)}](https://example.com/{size}) '
+                f'`{text_of(rng, 1)}`'
+            )
+        words -= size
+    return '\n\n'.join(blocks)
+
+
+def measure(function, text, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(text)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    setup_django()
+    from notes import markup
+
+    rng = random.Random(args.seed)
+    print(f'{"слов":>6}{"символов":>10}{"отрисовка":>16}{"из кэша":>14}')
+    for words in SIZES:
+        text = markdown_text(rng, words)
+        rendered = summarize(measure(markup.render, text, args.repeat))
+        markup.render_cached(text)
+        cached = summarize(measure(markup.render_cached, text, args.repeat))
+        print(f'{words:>6}{len(text):>10}'
+              f'{rendered["p50_ms"] * 1000:>12.0f} мкс'
+              f'{cached["p50_ms"] * 1000:>10.0f} мкс')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""
+Цена истории изменений на пути записи и объём истории.
+
+Заметки разной длины правятся по многу раз небольшими правками:
+замена, вставка или удаление нескольких слов, изредка переписанный
+текст. Каждая правка выполняется дважды - представлением NoteUpdate
+и таким же UpdateView без записи ревизий, - и сравниваются задержка
+и число SQL-запросов. Затем объём истории сравнивается с объёмом
+полных копий всех версий, а каждая версия восстанавливается
+и сверяется с исходной.
+
+    python -m benchmarks.revisions --notes 50 --edits 40
+"""
+import argparse
+import random
+import time
+
+from benchmarks.routes import WORDS, note_text, text_of
+from benchmarks.utils import setup_django, summarize, temporary_database
+
+
+def mutate(text, rng):
+    """Текст после случайной правки."""
+    words = text.split(' ')
+    position = rng.randrange(len(words))
+    roll = rng.random()
+    if roll < 0.6:
+        words[position:position + rng.randint(1, 3)] = [
+            rng.choice(WORDS) for _ in range(rng.randint(1, 3))
+        ]
+    elif roll < 0.85:
+        words[position:position] = text_of(rng, rng.randint(5, 20)).split()
+    elif roll < 0.95 and len(words) > 5:
+        del words[position:position + rng.randint(1, 5)]
+    else:
+        return note_text(rng)
+    return ' '.join(words)
+
+
+def make_views():
+    from django.views import generic
+
+    from notes import views
+    from notes.forms import NoteForm
+
+    class PlainUpdate(views.NoteBase, generic.UpdateView):
+        """NoteUpdate без записи ревизий."""
+        template_name = 'notes/form.html'
+        form_class = NoteForm
+
+    return {
+        'без истории': PlainUpdate.as_view(),
+        'с историей': views.NoteUpdate.as_view(),
+    }
+
+
+def edit(view, user, note, title, text):
+    from django.db import connection
+    from django.test import RequestFactory
+    from django.test.utils import CaptureQueriesContext
+
+    request = RequestFactory().post(
+        f'/edit/{note.slug}/',
+        {'title': title, 'text': text, 'slug': note.slug},
+    )
+    request.user = user
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        response = view(request, slug=note.slug)
+        elapsed = time.perf_counter() - started
+    assert response.status_code == 302, response.status_code
+    return elapsed, len(queries)
+
+
+def check_history(notes, versions):
+    """Восстанавливает каждую версию и сверяет её с исходной."""
+    from notes import revisions
+
+    samples = []
+    for note in notes:
+        expected = versions[note.pk]
+        for number in range(1, note.revisions.count() + 1):
+            started = time.perf_counter()
+            _, text = revisions.rebuild(note, number)
+            samples.append(time.perf_counter() - started)
+            assert text == expected[number - 1], (note.pk, number)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--notes', type=int, default=50)
+    parser.add_argument('--edits', type=int, default=40,
+                        help='правок каждой заметки')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from django.db.models import F, Sum
+    from django.db.models.functions import Length
+
+    from notes.models import Note, NoteRevision
+
+    rng = random.Random(args.seed)
+    with temporary_database():
+        user = get_user_model().objects.create(username='benchmark')
+        texts = [note_text(rng) for _ in range(args.notes)]
+        views = make_views()
+        notes = {
+            name: [
+                Note.objects.create(
+                    title='Заметка', text=text, author=user,
+                    slug=f'{index}-{number}',
+                )
+                for number, text in enumerate(texts)
+            ]
+            for index, name in enumerate(views)
+        }
+        versions = {note.pk: [note.text] for note in notes['с историей']}
+        samples = {name: [] for name in views}
+        queries = {name: 0 for name in views}
+        for _ in range(args.edits):
+            for number, text in enumerate(texts):
+                texts[number] = text = mutate(text, rng)
+                for name, view in views.items():
+                    note = notes[name][number]
+                    elapsed, count = edit(view, user, note, 'Заметка', text)
+                    samples[name].append(elapsed)
+                    queries[name] = max(queries[name], count)
+                history = versions[notes['с историей'][number].pk]
+                # Правка без изменений ревизию не создаёт.
+                if text != history[-1]:
+                    history.append(text)
+
+        for name in views:
+            summary = summarize(samples[name])
+            print(f'{name:12} p50 {summary["p50_ms"]:6.2f} мс  '
+                  f'p95 {summary["p95_ms"]:6.2f} мс  '
+                  f'SQL-запросов {queries[name]}')
+        stored = NoteRevision.objects.aggregate(
+            size=Sum(Length('data'))
+        )['size']
+        full = sum(len(text) for texts in versions.values() for text in texts)
+        snapshots = NoteRevision.objects.filter(base=F('number')).count()
+        print(f'История: {stored} симв., полные копии: {full} симв. '
+              f'({stored / full:.1%}), снимков {snapshots} из '
+              f'{NoteRevision.objects.count()}')
+        summary = summarize(check_history(notes['с историей'], versions))
+        print(f'Восстановление версии: p50 {summary["p50_ms"]:.2f} мс, '
+              f'p95 {summary["p95_ms"]:.2f} мс, все версии совпали')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,489 @@
+"""
+Задержки, пропускная способность и число SQL-запросов по маршрутам.
+
+Бенчмарк заполняет временную базу (N пользователей по M заметок
+с текстами разной длины) и проходит каждый именованный маршрут
+notes: и users: тестовым клиентом Django и через настоящий
+WSGI-сервер. Для каждого маршрута записываются p50/p95/p99, число
+запросов в секунду и число SQL-запросов на запрос (в режиме
+тестового клиента, где запросы видны в том же потоке).
+
+База работает в профиле production (YANOTE_DB_PROFILE), как на
+сервере: без BEGIN IMMEDIATE параллельные писатели SQLite падают
+с "database is locked". Ограничение частоты запросов отключено -
+измеряются маршруты, а не отказы 429.
+
+Результаты сохраняются в JSON и сравниваются с сохранённым базовым
+замером: рост p95 или падение rps больше порога, любой рост числа
+SQL-запросов и любая ошибка считаются регрессией, и команда
+завершается с кодом 1. Базовый замер с ошибками не сохраняется;
+он снимается одним запуском по всем маршрутам и имеет смысл только
+на той же машине:
+
+    python -m benchmarks.routes --save-baseline
+    python -m benchmarks.routes --output results.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from urllib.parse import urlencode
+
+from benchmarks.utils import (
+    run_in_threads, setup_django, summarize, temporary_database
+)
+
+BASELINE = Path(__file__).with_name('baseline.json')
+HOST = '127.0.0.1'
+PASSWORD = 'benchmark-password'
+# Одно значение в cookie и в заголовке проходит проверку CSRF.
+CSRF_TOKEN = 'b' * 64
+WORDS = (
+    'заметка', 'список', 'покупки', 'молоко', 'хлеб', 'встреча', 'проект',
+    'отчёт', 'идея', 'книга', 'фильм', 'рецепт', 'борщ', 'задача', 'срок',
+    'понедельник', 'пятница', 'позвонить', 'написать', 'купить',
+)
+MODES = ('client', 'wsgi')
+
+
+@dataclass
+class Request:
+    method: str
+    path: str
+    data: dict = None
+    json: object = None
+    # None - сессия пользователя, '' - анонимный запрос.
+    session: str = None
+    status: int = 200
+
+
+@dataclass
+class Route:
+    name: str
+    build: object
+
+
+@dataclass
+class BenchUser:
+    user: object
+    session: str
+    slugs: list
+    counter: int = 0
+
+    def next_number(self):
+        self.counter += 1
+        return self.counter
+
+
+def text_of(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def note_text(rng):
+    """Длина текста распределена логнормально, медиана около 100 слов."""
+    return text_of(rng, max(1, min(int(rng.lognormvariate(4.6, 0.8)), 3000)))
+
+
+def login_session(user):
+    from django.conf import settings
+    from django.test import Client
+
+    client = Client()
+    client.force_login(user)
+    return client.cookies[settings.SESSION_COOKIE_NAME].value
+
+
+def seed(users_count, notes_count, rng):
+    """Пользователи с заметками; возвращает список BenchUser."""
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.hashers import make_password
+
+    from notes.models import Note
+    from notes.signals import notes_bulk_changed
+
+    User = get_user_model()
+    password = make_password(PASSWORD)
+    User.objects.bulk_create(
+        User(username=f'user{index}', password=password)
+        for index in range(users_count)
+    )
+    users = []
+    for user in User.objects.order_by('id'):
+        notes = [
+            Note(title=text_of(rng, 4).capitalize(), text=note_text(rng),
+                 slug=f'{user.username}-note-{index}', author=user)
+            for index in range(notes_count)
+        ]
+        Note.objects.bulk_create(notes, batch_size=500)
+        slugs = [note.slug for note in notes]
+        notes_bulk_changed.send(
+            sender=Note, author_ids={user.pk},
+            saved_ids=list(Note.objects.filter(
+                author=user
+            ).values_list('id', flat=True)),
+        )
+        users.append(BenchUser(user, login_session(user), slugs))
+    return users
+
+
+def note_slug(bench, number):
+    return bench.slugs[number % len(bench.slugs)]
+
+
+def build_delete(bench, rng):
+    from notes.models import Note
+
+    note = Note.objects.create(
+        title='На удаление', text='', author=bench.user,
+        slug=f'{bench.user.username}-delete-{bench.next_number()}',
+    )
+    return Request('POST', f'/delete/{note.slug}/', data={}, status=302)
+
+
+def build_restore(bench, rng):
+    """Заметка с двумя ревизиями; восстанавливается первая."""
+    from notes import revisions
+    from notes.models import Note
+
+    note = Note.objects.create(
+        title='Ревизии', text=note_text(rng), author=bench.user,
+        slug=f'{bench.user.username}-restore-{bench.next_number()}',
+    )
+    previous = (note.title, note.text, note.updated)
+    note.text += ' ' + text_of(rng, 5)
+    note.save()
+    revisions.record_revision(note, *previous)
+    return Request('POST', f'/history/{note.slug}/1/', data={}, status=302)
+
+
+def build_logout(bench, rng):
+    return Request('POST', '/auth/logout/', data={},
+                   session=login_session(bench.user))
+
+
+def build_signup(bench, rng):
+    username = f'{bench.user.username}-signup-{bench.next_number()}'
+    return Request('POST', '/auth/signup/', session='', status=302, data={
+        'username': username, 'password1': PASSWORD, 'password2': PASSWORD,
+    })
+
+
+ROUTES = [
+    Route('notes:home', lambda bench, rng: Request('GET', '/')),
+    Route('notes:list', lambda bench, rng: Request('GET', '/notes/')),
+    Route('notes:detail', lambda bench, rng: Request(
+        'GET', f'/note/{note_slug(bench, bench.next_number())}/'
+    )),
+    Route('notes:add', lambda bench, rng: Request(
+        'POST', '/add/', status=302,
+        data={'title': text_of(rng, 4), 'text': note_text(rng), 'slug': ''},
+    )),
+    Route('notes:edit', lambda bench, rng: Request(
+        'POST', f'/edit/{note_slug(bench, bench.next_number())}/',
+        status=302, data={
+            'title': text_of(rng, 4), 'text': note_text(rng),
+            'slug': note_slug(bench, bench.counter),
+        },
+    )),
+    Route('notes:delete', build_delete),
+    Route('notes:history', lambda bench, rng: Request(
+        'GET', f'/history/{note_slug(bench, bench.next_number())}/'
+    )),
+    Route('notes:restore', build_restore),
+    Route('notes:success', lambda bench, rng: Request('GET', '/done/')),
+    Route('notes:search', lambda bench, rng: Request(
+        'GET', '/search/?' + urlencode({'q': rng.choice(WORDS)})
+    )),
+    Route('notes:export', lambda bench, rng: Request(
+        'GET', '/export/?format=ndjson'
+    )),
+    Route('notes:batch', lambda bench, rng: Request(
+        'POST', '/api/batch/', json={'operations': [
+            {'op': 'create', 'title': text_of(rng, 4), 'text': note_text(rng)}
+            for _ in range(10)
+        ]},
+    )),
+    Route('users:login', lambda bench, rng: Request(
+        'POST', '/auth/login/', session='', status=302,
+        data={'username': bench.user.username, 'password': PASSWORD},
+    )),
+    Route('users:logout', build_logout),
+    Route('users:signup', build_signup),
+]
+
+
+def uncovered_routes():
+    """Именованные маршруты notes: и users:, которых нет в ROUTES."""
+    from django.urls import get_resolver
+
+    covered = {route.name for route in ROUTES}
+    names = set()
+    for namespace in ('notes', 'users'):
+        resolver = get_resolver().namespace_dict[namespace][1]
+        names |= {
+            f'{namespace}:{name}' for name in resolver.reverse_dict
+            if isinstance(name, str)
+        }
+    return sorted(names - covered)
+
+
+def client_sender():
+    """Выполняет Request тестовым клиентом и считает SQL-запросы."""
+    from django.conf import settings
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+
+    def send(request, bench):
+        client = Client()
+        session = bench.session if request.session is None else (
+            request.session
+        )
+        if session:
+            client.cookies[settings.SESSION_COOKIE_NAME] = session
+        with CaptureQueriesContext(connection) as queries:
+            if request.json is not None:
+                response = client.post(
+                    request.path, json.dumps(request.json),
+                    content_type='application/json',
+                )
+            elif request.method == 'POST':
+                response = client.post(request.path, request.data)
+            else:
+                response = client.get(request.path)
+            b''.join(response) if response.streaming else response.content
+        return response.status_code, len(queries)
+    return send
+
+
+def wsgi_sender(port):
+    """Выполняет Request по HTTP; соединение своё у каждого потока."""
+    import http.client
+
+    from django.conf import settings
+
+    local = threading.local()
+
+    def send(request, bench):
+        if getattr(local, 'connection', None) is None:
+            local.connection = http.client.HTTPConnection(HOST, port)
+        session = bench.session if request.session is None else (
+            request.session
+        )
+        cookies = [f'{settings.CSRF_COOKIE_NAME}={CSRF_TOKEN}']
+        if session:
+            cookies.append(f'{settings.SESSION_COOKIE_NAME}={session}')
+        headers = {'Cookie': '; '.join(cookies), 'X-CSRFToken': CSRF_TOKEN}
+        body = None
+        if request.json is not None:
+            body = json.dumps(request.json).encode()
+            headers['Content-Type'] = 'application/json'
+        elif request.method == 'POST':
+            body = urlencode(request.data).encode()
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        try:
+            local.connection.request(
+                request.method, request.path, body, headers
+            )
+            response = local.connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            local.connection.close()
+            local.connection = None
+            raise
+        return response.status, None
+    return send
+
+
+def run_route(route, send, users, requests, concurrency, seed_value):
+    from django.db import OperationalError
+
+    per_thread = max(1, requests // concurrency)
+
+    def worker(index):
+        bench = users[index % len(users)]
+        rng = random.Random(seed_value + index)
+        latencies, queries, failures = [], [], 0
+        for _ in range(per_thread):
+            request = route.build(bench, rng)
+            started = time.perf_counter()
+            try:
+                status, count = send(request, bench)
+            except (OSError, OperationalError):
+                failures += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+            if status != request.status:
+                failures += 1
+            if count is not None:
+                queries.append(count)
+        return latencies, queries, failures
+
+    started = time.perf_counter()
+    results = run_in_threads(worker, concurrency)
+    elapsed = time.perf_counter() - started
+    latencies = [sample for samples, _, _ in results for sample in samples]
+    queries = [count for _, counts, _ in results for count in counts]
+    stats = {
+        name: round(value, 2) for name, value in summarize(latencies).items()
+    }
+    stats['rps'] = round(len(latencies) / elapsed, 1)
+    stats['failures'] = sum(failures for _, _, failures in results)
+    if queries:
+        stats['queries'] = statistics.median_low(queries)
+    return stats
+
+
+def start_wsgi_server(threads):
+    from benchmarks.asgi_vs_wsgi import make_wsgi_server
+    from yanote.wsgi import application
+
+    server = make_wsgi_server(application, 0, threads)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def compare(results, baseline, latency_threshold, rps_threshold):
+    """Список регрессий относительно базового замера."""
+    regressions = []
+    for mode, routes in results.items():
+        for name, stats in routes.items():
+            base = baseline.get(mode, {}).get(name)
+            if base is None:
+                continue
+            if stats['p95_ms'] > base['p95_ms'] * (1 + latency_threshold):
+                regressions.append(
+                    f'{mode} {name}: p95 {base["p95_ms"]} -> '
+                    f'{stats["p95_ms"]} мс'
+                )
+            if stats['rps'] < base['rps'] * (1 - rps_threshold):
+                regressions.append(
+                    f'{mode} {name}: rps {base["rps"]} -> {stats["rps"]}'
+                )
+            if stats.get('queries', 0) > base.get('queries', 0):
+                regressions.append(
+                    f'{mode} {name}: SQL-запросов {base.get("queries")} -> '
+                    f'{stats["queries"]}'
+                )
+            if stats['failures']:
+                regressions.append(
+                    f'{mode} {name}: ошибок {base["failures"]} -> '
+                    f'{stats["failures"]}'
+                )
+    return regressions
+
+
+def run_mode(mode, routes, users, args):
+    server = None
+    if mode == 'wsgi':
+        server = start_wsgi_server(args.concurrency)
+        send = wsgi_sender(server.server_address[1])
+    else:
+        send = client_sender()
+    results = {}
+    try:
+        for route in routes:
+            results[route.name] = run_route(
+                route, send, users, args.requests, args.concurrency,
+                args.seed,
+            )
+            print(mode, route.name, results[route.name])
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+    return results
+
+
+def check_baseline(report, args):
+    """Печатает регрессии и завершает работу с кодом 1, если они есть."""
+    baseline = json.loads(args.baseline.read_text())
+    if any(baseline['meta'].get(name) != report['meta'][name]
+           for name in ('users', 'notes', 'requests', 'concurrency')):
+        print('Параметры базового замера другие:', baseline['meta'],
+              file=sys.stderr)
+    regressions = compare(report['results'], baseline['results'],
+                          args.latency_threshold, args.rps_threshold)
+    for regression in regressions:
+        print('Регрессия:', regression)
+    if regressions:
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--notes', type=int, default=200,
+                        help='заметок на пользователя')
+    parser.add_argument('--requests', type=int, default=200,
+                        help='запросов на маршрут')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--modes', default=','.join(MODES))
+    parser.add_argument('--routes', default='',
+                        help='имена маршрутов через запятую')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', type=Path)
+    parser.add_argument('--baseline', type=Path, default=BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--latency-threshold', type=float, default=0.25,
+                        help='допустимый рост p95, доля')
+    parser.add_argument('--rps-threshold', type=float, default=0.2,
+                        help='допустимое падение rps, доля')
+    args = parser.parse_args()
+    if args.save_baseline and (
+        args.routes or set(args.modes.split(',')) != set(MODES)
+    ):
+        parser.error('базовый замер снимается одним запуском по всем '
+                     'маршрутам и режимам')
+
+    os.environ.setdefault('YANOTE_DB_PROFILE', 'production')
+    setup_django()
+    from django.conf import settings
+
+    settings.NOTES_RATE_LIMITS = {}
+    missing = uncovered_routes()
+    if missing:
+        print('Маршруты без сценария:', ', '.join(missing), file=sys.stderr)
+    routes = [
+        route for route in ROUTES
+        if not args.routes or route.name in args.routes.split(',')
+    ]
+    with temporary_database():
+        users = seed(args.users, args.notes, random.Random(args.seed))
+        results = {
+            mode: run_mode(mode, routes, users, args)
+            for mode in args.modes.split(',')
+        }
+    report = {
+        'meta': {
+            'users': args.users, 'notes': args.notes,
+            'requests': args.requests, 'concurrency': args.concurrency,
+            'python': platform.python_version(),
+        },
+        'results': results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + '\n')
+    if args.save_baseline:
+        failed = [
+            f'{mode} {name}' for mode, routes in results.items()
+            for name, stats in routes.items() if stats['failures']
+        ]
+        if failed:
+            print('Базовый замер не сохранён, ошибки в маршрутах:',
+                  ', '.join(failed), file=sys.stderr)
+            sys.exit(1)
+        args.baseline.write_text(json.dumps(report, indent=2) + '\n')
+    elif args.baseline.exists():
+        check_baseline(report, args)
+
+
+if __name__ == '__main__':
+    main()
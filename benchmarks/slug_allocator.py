@@ -0,0 +1,97 @@
+"""
+Параллельное создание заметок с одинаковым заголовком.
+
+Сравнивает прежний способ (slugify + exists() + INSERT) с выбором
+свободного slug в notes.slugs: прежний способ теряет заметки
+на IntegrityError, новый создаёт все с суффиксами.
+
+    python -m benchmarks.slug_allocator --threads 16 --notes 20
+"""
+import argparse
+import time
+
+from benchmarks.utils import (
+    run_in_threads, setup_django, summarize, temporary_database
+)
+
+TITLE = 'Одинаковый заголовок'
+
+
+def naive_create(author):
+    """Прежняя логика NoteForm.clean_slug и Note.save."""
+    from pytils.translit import slugify
+
+    from notes.models import Note
+
+    slug = slugify(TITLE)
+    if Note.objects.filter(slug=slug).exists():
+        return 'rejected'
+    Note.objects.create(title=TITLE, text='', slug=slug, author=author)
+    return 'created'
+
+
+def allocator_create(author):
+    from notes.models import Note
+
+    Note.objects.create(title=TITLE, text='', author=author)
+    return 'created'
+
+
+def run(create, author, threads, notes):
+    from django.db import IntegrityError, OperationalError
+
+    from notes.models import Note
+
+    Note.objects.all().delete()
+
+    def worker(index):
+        outcomes = {'created': 0, 'rejected': 0, 'integrity_error': 0,
+                    'locked': 0}
+        latencies = []
+        for _ in range(notes):
+            started = time.perf_counter()
+            try:
+                outcomes[create(author)] += 1
+            except IntegrityError:
+                outcomes['integrity_error'] += 1
+            except OperationalError:
+                outcomes['locked'] += 1
+            latencies.append(time.perf_counter() - started)
+        return outcomes, latencies
+
+    started = time.perf_counter()
+    results = run_in_threads(worker, threads)
+    elapsed = time.perf_counter() - started
+    totals = {}
+    latencies = []
+    for outcomes, samples in results:
+        for name, value in outcomes.items():
+            totals[name] = totals.get(name, 0) + value
+        latencies.extend(samples)
+    totals['notes_per_second'] = round(threads * notes / elapsed, 1)
+    totals.update({
+        name: round(value, 2) for name, value in summarize(latencies).items()
+    })
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--notes', type=int, default=20,
+                        help='заметок на поток')
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+
+    with temporary_database():
+        author = get_user_model().objects.create(username='benchmark')
+        for name, create in (('naive', naive_create),
+                             ('allocator', allocator_create)):
+            totals = run(create, author, args.threads, args.notes)
+            print(name, totals)
+
+
+if __name__ == '__main__':
+    main()
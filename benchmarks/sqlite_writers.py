@@ -0,0 +1,115 @@
+"""
+Параллельные писатели SQLite в разных профилях базы.
+
+Каждый поток от имени своего пользователя создаёт заметки формой
+и пакетным API. Сравниваются профили:
+
+* default - без PRAGMA, транзакции BEGIN, соединение на запрос,
+  как без YANOTE_DB_PROFILE;
+* wal - PRAGMA из NOTES_SQLITE_PRODUCTION_PRAGMAS (WAL, busy_timeout...);
+* production - PRAGMA, BEGIN IMMEDIATE и постоянные соединения,
+  как с YANOTE_DB_PROFILE=production.
+
+    python -m benchmarks.sqlite_writers --threads 8 --requests 50
+"""
+import argparse
+import time
+
+from benchmarks.utils import (
+    run_in_threads, setup_django, summarize, temporary_database
+)
+
+PROFILES = {
+    'default': {'CONN_MAX_AGE': 0, 'pragmas': False, 'immediate': False},
+    'wal': {'CONN_MAX_AGE': 0, 'pragmas': True, 'immediate': False},
+    'production': {'CONN_MAX_AGE': 60, 'pragmas': True, 'immediate': True},
+}
+# Режим журнала хранится в файле базы, поэтому без PRAGMA профиля
+# его нужно вернуть к стандартному явно.
+SQLITE_DEFAULTS = {'journal_mode': 'delete'}
+
+
+def apply_profile(profile):
+    """Меняет настройки соединений; новые потоки откроют соединения с ними."""
+    from django.conf import settings
+    from django.db import connection, connections
+
+    connections.close_all()
+    connection.settings_dict['CONN_MAX_AGE'] = profile['CONN_MAX_AGE']
+    settings.NOTES_SQLITE_PRAGMAS = (
+        settings.NOTES_SQLITE_PRODUCTION_PRAGMAS if profile['pragmas']
+        else SQLITE_DEFAULTS
+    )
+    settings.NOTES_SQLITE_BEGIN_IMMEDIATE = profile['immediate']
+
+
+def run(users, threads, requests):
+    import json
+
+    from django.db import OperationalError, connection
+    from django.test import Client
+
+    clients = []
+    for user in users:
+        clients.append(Client())
+        clients[-1].force_login(user)
+    connection.close()
+
+    def worker(index):
+        client = clients[index]
+        latencies, locked = [], 0
+        for number in range(requests):
+            started = time.perf_counter()
+            try:
+                if number % 2:
+                    client.post('/add/', {
+                        'title': f'Заметка {index}-{number}', 'text': 'Текст',
+                        'slug': '',
+                    })
+                else:
+                    client.post('/api/batch/', json.dumps({'operations': [
+                        {'op': 'create', 'title': f'Пакет {index}-{number}',
+                         'text': 'Текст'} for _ in range(5)
+                    ]}), content_type='application/json')
+            except OperationalError:
+                locked += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+        return latencies, locked
+
+    started = time.perf_counter()
+    results = run_in_threads(worker, threads)
+    elapsed = time.perf_counter() - started
+    latencies = [sample for samples, _ in results for sample in samples]
+    totals = {
+        name: round(value, 2) for name, value in summarize(latencies).items()
+    }
+    totals['locked'] = sum(locked for _, locked in results)
+    totals['requests_per_second'] = round(len(latencies) / elapsed, 1)
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=50,
+                        help='запросов на поток')
+    parser.add_argument('--profiles', default=','.join(PROFILES))
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+
+    User = get_user_model()
+    with temporary_database():
+        User.objects.bulk_create(
+            User(username=f'writer{index}') for index in range(args.threads)
+        )
+        users = list(User.objects.order_by('id'))
+        for name in args.profiles.split(','):
+            apply_profile(PROFILES[name])
+            print(name, run(users, args.threads, args.requests))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""
+Время отрисовки шаблонов страниц заметок.
+
+Каждый шаблон загружается и отрисовывается с типичным контекстом
+в трёх режимах: шаблоны Django без кэширующего загрузчика (разбор
+на каждом запросе), с кэширующим загрузчиком и Jinja2, если пакет
+jinja2 установлен. Форма заметки и сводка в шапке читают базу,
+поэтому бенчмарк создаёт временную тестовую базу.
+
+    python -m benchmarks.templates --repeat 2000
+"""
+import argparse
+import time
+
+from benchmarks.utils import setup_django, summarize, temporary_database
+
+FILE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
+
+def make_engines():
+    from django.conf import settings
+    from django.template.backends.django import DjangoTemplates
+
+    def django_engine(name, loaders):
+        return DjangoTemplates({
+            'NAME': name,
+            'DIRS': settings.TEMPLATES[-1]['DIRS'],
+            'APP_DIRS': False,
+            'OPTIONS': {
+                'context_processors': settings.CONTEXT_PROCESSORS,
+                'loaders': loaders,
+            },
+        })
+
+    engines = {
+        'django': django_engine('django', FILE_LOADERS),
+        'django-cached': django_engine(
+            'django-cached',
+            [('django.template.loaders.cached.Loader', FILE_LOADERS)],
+        ),
+    }
+    try:
+        from django.template.backends.jinja2 import Jinja2
+    except ImportError:
+        return engines
+    engines['jinja2'] = Jinja2({
+        'NAME': 'jinja2',
+        'DIRS': [],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'environment': 'notes.jinja_env.environment',
+            'context_processors': settings.CONTEXT_PROCESSORS,
+        },
+    })
+    return engines
+
+
+def make_contexts():
+    """Шаблон и контекст для каждой страницы заметок."""
+    from django.contrib.auth import get_user_model
+    from django.test import RequestFactory
+
+    from notes.forms import NoteForm
+    from notes.models import Note
+    from notes.pagination import KeysetPage
+    from notes.search import SearchResult
+
+    user = get_user_model()(id=1, username='benchmark')
+    request = RequestFactory().get('/notes/')
+    request.user = user
+    note = Note(id=1, title='Заметка', text='Текст ' * 100, slug='note',
+                author=user)
+    notes = [
+        Note(id=index, title=f'Заметка {index}', slug=f'note-{index}')
+        for index in range(1, 51)
+    ]
+    page = KeysetPage(notes, next_cursor=50, previous_cursor=None)
+    items = {'object_list': notes, 'page_obj': page, 'is_paginated': True}
+    return request, {
+        'notes/home.html': {},
+        'notes/detail.html': {'note': note, 'object': note},
+        'notes/delete.html': {'note': note, 'object': note},
+        'notes/form.html': {'form': NoteForm(instance=note)},
+        'notes/success.html': {},
+        'notes/includes/list_items.html': items,
+        'notes/list.html': {'list_fragment': ''},
+        'notes/search.html': {'query': 'заметка', 'results': [
+            SearchResult(note, note.title, note.text[:80])
+            for note in notes[:20]
+        ]},
+    }
+
+
+def measure(engine, name, context, request, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        engine.get_template(name).render(context, request)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.middleware.csrf import get_token
+
+    with temporary_database():
+        engines = make_engines()
+        request, contexts = make_contexts()
+        get_token(request)
+        print(f'{"шаблон":32}' + ''.join(f'{name:>16}' for name in engines))
+        for name, context in contexts.items():
+            row = []
+            for engine in engines.values():
+                summary = summarize(
+                    measure(engine, name, context, request, args.repeat)
+                )
+                row.append(f'{summary["p50_ms"] * 1000:>13.0f} мкс')
+            print(f'{name:32}' + ''.join(row))
+
+
+if __name__ == '__main__':
+    main()
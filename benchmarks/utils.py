@@ -0,0 +1,95 @@
+"""
+Общие средства для бенчмарков YaNote.
+
+Бенчмарки запускаются из корня проекта: python -m benchmarks.<имя>.
+Каждый работает на отдельной временной базе и не трогает db.sqlite3.
+"""
+import os
+import statistics
+import tempfile
+import threading
+from contextlib import contextmanager
+
+
+def setup_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yanote.settings')
+    # Бенчмарки, как и тесты, обходятся без collectstatic.
+    os.environ.setdefault('YANOTE_STATIC_MANIFEST_STRICT', '0')
+    import django
+    django.setup()
+
+
+@contextmanager
+def temporary_database():
+    """
+    Создаёт тестовую базу с миграциями на время бенчмарка.
+
+    Для SQLite база создаётся во временном файле, а не в памяти,
+    чтобы её видели все потоки и процессы бенчмарка.
+    """
+    from django.db import connection, connections
+
+    with tempfile.TemporaryDirectory() as directory:
+        if connection.vendor == 'sqlite':
+            connection.settings_dict['TEST']['NAME'] = os.path.join(
+                directory, 'benchmark.sqlite3'
+            )
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            yield connection.settings_dict['NAME']
+        finally:
+            connections.close_all()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def percentile(samples, point):
+    """Перцентиль point (0-100) по методу ближайшего ранга."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1,
+                       round(point / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples):
+    """Сводка задержек в миллисекундах."""
+    return {
+        'count': len(samples),
+        'mean_ms': statistics.fmean(samples) * 1000 if samples else 0.0,
+        'p50_ms': percentile(samples, 50) * 1000,
+        'p95_ms': percentile(samples, 95) * 1000,
+        'p99_ms': percentile(samples, 99) * 1000,
+    }
+
+
+def run_in_threads(worker, threads):
+    """
+    Запускает worker(index) в threads потоках одновременно.
+
+    Потоки стартуют с барьера, а по завершении закрывают
+    свои соединения с базой. Возвращает список результатов.
+    """
+    from django.db import connection
+
+    barrier = threading.Barrier(threads)
+    results = [None] * threads
+
+    def target(index):
+        barrier.wait()
+        try:
+            results[index] = worker(index)
+        finally:
+            connection.close()
+
+    pool = [
+        threading.Thread(target=target, args=(index,))
+        for index in range(threads)
+    ]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return results
@@ -1,5 +1,119 @@
-from django.contrib import admin
+"""
+Админка заметок для таблицы в миллионы строк.
 
+Список не считает COUNT(*) по всей таблице (EstimatedCountPaginator),
+автор выбирается автодополнением, а не списком всех пользователей.
+Поиск идёт по индексам: точное совпадение slug или имени автора
+и слова в полнотекстовом индексе.
+
+Действия применяются к выбранным заметкам порциями по id
+множественными запросами, не загружая объекты: удаление само
+обновляет счётчики тегов, сводки авторов, индекс и кэш списка,
+которые иначе поддерживают сигналы каждой заметки.
+"""
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+from django.template.response import TemplateResponse
+
+from . import fields, jobs, search
+from .bulk import delete_notes, note_batches
 from .models import Note
+from .pagination import EstimatedCountPaginator
+
+User = get_user_model()
+
+
+@admin.register(Note)
+class NoteAdmin(admin.ModelAdmin):
+    list_display = ('title', 'slug', 'author', 'created', 'updated')
+    list_select_related = ('author',)
+    autocomplete_fields = ('author',)
+    readonly_fields = ('created', 'updated')
+    # Список выбирается по индексу первичного ключа.
+    ordering = ('-pk',)
+    # Поиск - get_search_results(): по адресу, имени автора и словам.
+    search_fields = ('=slug',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ('delete_selected_notes', 'compress_text', 'reindex')
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        # Стандартное удаление загружает и показывает каждую заметку.
+        actions.pop('delete_selected', None)
+        return actions
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        # Каждое условие - на столбец notes_note без JOIN, иначе SQLite
+        # не объединит индексы (MULTI-INDEX OR) и просмотрит всю таблицу.
+        condition = Q(slug=term) | Q(author__in=User.objects.filter(
+            username=term
+        ).values('pk'))
+        ids = search.matching_ids(term)
+        if ids is not None:
+            condition |= Q(pk__in=ids)
+        else:
+            condition |= Q(title__icontains=term)
+        return queryset.filter(condition), False
+
+    @admin.action(
+        description='Удалить выбранные заметки', permissions=('delete',)
+    )
+    def delete_selected_notes(self, request, queryset):
+        if request.POST.get('post') == 'yes':
+            deleted = delete_notes(queryset)
+            self.message_user(
+                request, f'Удалено заметок: {deleted}', messages.SUCCESS
+            )
+            return None
+        # Подтверждение показывает число заметок, а не их список.
+        count = self.get_paginator(request, queryset, 1).count
+        return TemplateResponse(
+            request, 'admin/notes/note/delete_selected_notes.html', {
+                **self.admin_site.each_context(request),
+                'title': 'Удаление заметок',
+                'opts': self.model._meta,
+                'count': count,
+                'exact': count <= settings.NOTES_ADMIN_COUNT_LIMIT,
+                'selected': request.POST.getlist(
+                    helpers.ACTION_CHECKBOX_NAME
+                ),
+                'select_across': request.POST.get('select_across', '0'),
+                'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+                'media': self.media,
+            },
+        )
+
+    @admin.action(
+        description='Сжать текст выбранных заметок', permissions=('change',)
+    )
+    def compress_text(self, request, queryset):
+        result = fields.repack(queryset, 'text')
+        self.message_user(
+            request,
+            f'Проверено заметок: {result.rows}, изменено: {result.changed}, '
+            f'освобождено байт: {result.before - result.after}',
+            messages.SUCCESS,
+        )
 
-admin.site.register(Note)
+    @admin.action(
+        description='Обновить поисковый индекс', permissions=('change',)
+    )
+    def reindex(self, request, queryset):
+        total = 0
+        for batch in note_batches(queryset):
+            jobs.enqueue(
+                'notes.search.refresh_notes',
+                saved_ids=[pk for pk, _ in batch],
+            )
+            total += len(batch)
+        self.message_user(
+            request, f'Индекс обновляется для заметок: {total}',
+            messages.SUCCESS,
+        )
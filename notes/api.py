@@ -0,0 +1,273 @@
+"""
+JSON API для пакетного изменения заметок.
+
+POST /api/batch/ принимает {"operations": [...]}, где каждая операция -
+объект с полем op:
+
+* {"op": "create", "title": ..., "text": ..., "slug": ...} - slug
+  необязателен;
+* {"op": "update", "slug": ..., "title": ..., "text": ...,
+  "new_slug": ...} - изменяются только переданные поля;
+* {"op": "delete", "slug": ...}.
+
+Весь пакет выполняется в одной транзакции: один запрос находит все
+затронутые заметки, новые заметки создаются одним bulk_create,
+изменённые сохраняются одним bulk_update. Ответ содержит результат
+для каждой операции в порядке их следования. Если slug успел занять
+параллельный запрос, пакет не применяется и ответ - 409. Запрос защищён от CSRF
+так же, как формы: клиент передаёт токен в заголовке X-CSRFToken.
+"""
+import copy
+import json
+from http import HTTPStatus
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.http import JsonResponse
+from django.utils import timezone
+from django.views import View
+
+from . import stats
+from .bulk import delete_notes
+from .forms import WARNING
+from .models import Note
+from .signals import notes_bulk_changed
+from .slugs import SlugPlanner, base_slug
+from .views import NoteBase
+
+OPERATIONS = ('create', 'update', 'delete')
+UPDATE_FIELDS = ('title', 'text', 'slug', 'updated')
+
+
+class BatchError(Exception):
+    """Ошибка в отдельной операции пакета."""
+
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+def _error(message, status=HTTPStatus.BAD_REQUEST):
+    return JsonResponse({'error': message}, status=status)
+
+
+class NoteBatch(NoteBase, View):
+    """Создание, изменение и удаление многих заметок одним запросом."""
+    http_method_names = ['post']
+    raise_exception = True
+
+    def post(self, request, *args, **kwargs):
+        try:
+            payload = json.loads(request.body)
+        except ValueError:
+            return _error('Тело запроса должно быть JSON')
+        operations = (
+            payload.get('operations') if isinstance(payload, dict) else None
+        )
+        if not isinstance(operations, list):
+            return _error('Ожидается объект с полем operations')
+        if len(operations) > settings.NOTES_API_BATCH_LIMIT:
+            return _error(
+                'В пакете не больше '
+                f'{settings.NOTES_API_BATCH_LIMIT} операций'
+            )
+        try:
+            with transaction.atomic():
+                results = BatchRunner(
+                    self.get_queryset(), request.user
+                ).run(operations)
+        except IntegrityError:
+            return _error(
+                'Адрес заметки занят параллельным изменением, '
+                'пакет не применён; повторите запрос',
+                status=HTTPStatus.CONFLICT,
+            )
+        return JsonResponse({'results': results})
+
+
+class BatchRunner:
+    """Проверяет операции пакета и применяет их множественными запросами."""
+
+    def __init__(self, queryset, author):
+        self.queryset = queryset
+        self.author = author
+        self.max_slug_length = Note._meta.get_field('slug').max_length
+        self.results = []
+        self.to_create = []
+        self.to_update = {}
+        self.to_delete = {}
+
+    def run(self, operations):
+        self.notes = self.load_targets(operations)
+        self.busy_slugs = self.load_busy_slugs(operations)
+        for index, operation in enumerate(operations):
+            result = {'index': index}
+            try:
+                if not isinstance(operation, dict):
+                    raise BatchError({'op': ['Ожидается объект']})
+                result['op'] = operation.get('op')
+                if result['op'] not in OPERATIONS:
+                    raise BatchError({'op': [
+                        f'Допустимые операции: {", ".join(OPERATIONS)}'
+                    ]})
+                handler = getattr(self, result['op'])
+                result.update(handler(operation))
+            except BatchError as error:
+                result.update(status='error', errors=error.errors)
+            self.results.append(result)
+        self.apply()
+        return self.results
+
+    def load_targets(self, operations):
+        """Один запрос за всеми заметками, которые меняются или удаляются."""
+        slugs = {
+            operation.get('slug') for operation in operations
+            if isinstance(operation, dict)
+            and operation.get('op') in ('update', 'delete')
+            and isinstance(operation.get('slug'), str)
+        }
+        if not slugs:
+            return {}
+        return {note.slug: note for note in self.queryset.filter(
+            slug__in=slugs
+        )}
+
+    def load_busy_slugs(self, operations):
+        """Один запрос: какие из явно указанных новых slug уже заняты."""
+        slugs = {
+            slug for slug in (
+                operation.get('new_slug' if operation.get('op') == 'update'
+                              else 'slug')
+                for operation in operations
+                if isinstance(operation, dict)
+                and operation.get('op') in ('create', 'update')
+            )
+            if slug and isinstance(slug, str)
+        }
+        if not slugs:
+            return set()
+        return set(Note.objects.filter(slug__in=slugs).values_list(
+            'slug', flat=True
+        ))
+
+    def validate(self, note, fields):
+        try:
+            note.full_clean(
+                exclude=[
+                    name for name in ('title', 'text', 'slug')
+                    if name not in fields
+                ] + ['author'],
+                validate_unique=False,
+            )
+        except ValidationError as error:
+            raise BatchError(error.message_dict)
+
+    @staticmethod
+    def get_string(operation, name):
+        """Строковое поле операции; отсутствующее - пустая строка."""
+        value = operation.get(name)
+        if value is None:
+            return ''
+        if not isinstance(value, str):
+            raise BatchError({name: ['Ожидается строка']})
+        return value
+
+    def claim_slug(self, slug):
+        """Занимает явно указанный slug или сообщает о конфликте."""
+        if slug in self.busy_slugs:
+            raise BatchError({'slug': [slug + WARNING]})
+        self.busy_slugs.add(slug)
+
+    def get_target(self, operation):
+        slug = operation.get('slug')
+        note = self.notes.get(slug) if isinstance(slug, str) else None
+        if note is None or note.pk in self.to_delete:
+            raise BatchError({'slug': ['Заметка не найдена']})
+        return note
+
+    def create(self, operation):
+        note = Note(
+            title=self.get_string(operation, 'title'),
+            text=self.get_string(operation, 'text'),
+            slug=self.get_string(operation, 'slug'),
+            author=self.author,
+        )
+        self.validate(note, ('title', 'text', 'slug'))
+        if note.slug:
+            self.claim_slug(note.slug)
+        self.to_create.append((len(self.results), note))
+        return {'status': 'created'}
+
+    def update(self, operation):
+        original = self.get_target(operation)
+        # Изменения применяются к копии, чтобы отклонённая операция
+        # не повлияла на следующие операции с той же заметкой.
+        note = copy.copy(original)
+        fields = [
+            name for name in ('title', 'text') if name in operation
+        ]
+        for name in fields:
+            setattr(note, name, self.get_string(operation, name))
+        new_slug = self.get_string(operation, 'new_slug')
+        if new_slug and new_slug != note.slug:
+            fields.append('slug')
+            note.slug = new_slug
+        self.validate(note, fields)
+        if 'slug' in fields:
+            self.claim_slug(note.slug)
+            del self.notes[original.slug]
+        self.notes[note.slug] = note
+        self.to_update[note.pk] = note
+        return {'status': 'updated', 'slug': note.slug}
+
+    def delete(self, operation):
+        note = self.get_target(operation)
+        self.to_update.pop(note.pk, None)
+        self.to_delete[note.pk] = note
+        return {'status': 'deleted', 'slug': note.slug}
+
+    def apply(self):
+        """Применяет все проверенные операции множественными запросами."""
+        if self.to_delete:
+            # Без сигналов каждой заметки: индекс обновит фоновая задача.
+            delete_notes(self.queryset.filter(pk__in=self.to_delete))
+        saved_ids = list(self.to_update)
+        if self.to_update:
+            now = timezone.now()
+            for note in self.to_update.values():
+                note.updated = now
+            Note.objects.bulk_update(self.to_update.values(), UPDATE_FIELDS)
+        if self.to_create:
+            planner = SlugPlanner(Note.objects.all(), self.max_slug_length)
+            planner.taken |= self.busy_slugs
+            pending = [
+                note for _, note in self.to_create if not note.slug
+            ]
+            slugs = planner.plan([
+                base_slug(note.title, self.max_slug_length)
+                for note in pending
+            ])
+            for note, slug in zip(pending, slugs):
+                note.slug = slug
+            Note.objects.bulk_create([note for _, note in self.to_create])
+            created = dict(self.queryset.filter(
+                slug__in=[note.slug for _, note in self.to_create]
+            ).values_list('slug', 'id'))
+            for index, note in self.to_create:
+                self.results[index]['slug'] = note.slug
+                saved_ids.append(created[note.slug])
+        if saved_ids:
+            # bulk_create и bulk_update не вызывают post_save.
+            saved = [*self.to_update.values()] + [
+                note for _, note in self.to_create
+            ]
+            stats.record(
+                self.author.pk,
+                notes=len(self.to_create),
+                size=sum(stats.size_change(note) for note in saved),
+                edited=timezone.now(),
+            )
+            notes_bulk_changed.send(
+                sender=Note, author_ids={self.author.pk}, saved_ids=saved_ids
+            )
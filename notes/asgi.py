@@ -0,0 +1,152 @@
+"""
+Отдача потоковых ответов под ASGI без блокировки цикла событий.
+
+ASGIHandler в Django 3.2 перебирает streaming_content прямо в цикле
+событий: каждая порция выгрузки - запрос к базе, а сжатие и чтение
+файла - работа процессора и диска, и всё это время цикл не обслуживает
+другие соединения. Асинхронные итераторы в streaming_content Django
+3.2 не принимает, поэтому асинхронный перебор сделан здесь, в
+обработчике, который используется только для ASGI-запросов: части
+ответа, уже обёрнутые всеми middleware, собираются в отдельном потоке
+и ожидаются через loop.run_in_executor.
+
+Здесь же общий пул на NOTES_ASYNC_THREADS потоков, в котором под ASGI
+обращаются к базе асинхронные представления notes.async_views
+и RateLimitMiddleware. Хуки MiddlewareMixin в Django 3.2 выполняются
+через sync_to_async(thread_sensitive=True), то есть по очереди
+в одном общем потоке, поэтому работа с базой туда не попадает.
+"""
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.db import close_old_connections, connection
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Общий пул на NOTES_ASYNC_THREADS потоков, создаётся при вызове."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.NOTES_ASYNC_THREADS,
+                thread_name_prefix='notes-orm',
+            )
+        return _executor
+
+
+def _call(func, args):
+    try:
+        return func(*args)
+    finally:
+        # Потоки пула живут долго: соединения закрываются
+        # по тем же правилам CONN_MAX_AGE, что и после запроса.
+        close_old_connections()
+
+
+async def call_in_pool(func, *args):
+    """
+    Выполняет синхронную func в общем пуле и возвращает её результат.
+
+    Контекст передаётся в поток, чтобы запросы к базе попали
+    в замер ServerTimingMiddleware.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_executor(),
+        functools.partial(
+            contextvars.copy_context().run, _call, func, args
+        ),
+    )
+
+
+def _take(iterator, batch_size):
+    batch = []
+    size = 0
+    for part in iterator:
+        batch.append(part)
+        size += len(part)
+        if size >= batch_size:
+            break
+    return batch
+
+
+def _close(iterator):
+    try:
+        if hasattr(iterator, 'close'):
+            iterator.close()
+    finally:
+        connection.close()
+
+
+async def iterate_in_thread(parts, batch_size):
+    """
+    Асинхронно перебирает синхронную последовательность частей.
+
+    Части забираются из своего потока пачками не меньше batch_size
+    байтов, чтобы не платить переключением потока за каждую строку.
+    Поток один на ответ: соединение с базой, открытое генератором,
+    закрывается в нём же после перебора.
+    """
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(
+        max_workers=1, thread_name_prefix='notes-stream'
+    )
+    context = contextvars.copy_context()
+    iterator = iter(parts)
+    try:
+        while True:
+            batch = await loop.run_in_executor(
+                executor, context.run, _take, iterator, batch_size
+            )
+            if not batch:
+                return
+            for part in batch:
+                yield part
+    finally:
+        # Единственный поток исполнителя закроет генератор только
+        # после того, как закончит выдавать текущую пачку.
+        await loop.run_in_executor(executor, context.run, _close, iterator)
+        executor.shutdown(wait=False)
+
+
+class StreamingASGIHandler(ASGIHandler):
+    """ASGIHandler, перебирающий потоковые ответы вне цикла событий."""
+
+    async def send_response(self, response, send):
+        if not response.streaming:
+            return await super().send_response(response, send)
+        response_headers = []
+        for header, value in response.items():
+            if isinstance(header, str):
+                header = header.encode('ascii')
+            if isinstance(value, str):
+                value = value.encode('latin1')
+            response_headers.append((bytes(header), bytes(value)))
+        for cookie in response.cookies.values():
+            response_headers.append((
+                b'Set-Cookie',
+                cookie.output(header='').encode('ascii').strip(),
+            ))
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': response_headers,
+        })
+        async for part in iterate_in_thread(response, self.chunk_size):
+            for chunk, _ in self.chunk_bytes(part):
+                await send({
+                    'type': 'http.response.body',
+                    'body': chunk,
+                    'more_body': True,
+                })
+        await send({'type': 'http.response.body'})
+        await sync_to_async(response.close, thread_sensitive=True)()
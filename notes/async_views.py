@@ -0,0 +1,39 @@
+"""
+Асинхронные варианты страниц чтения для работы под ASGI.
+
+Представление выполняет синхронный NotesList или NoteDetail целиком,
+вместе с отрисовкой шаблона, в ограниченном пуле потоков, а цикл
+событий тем временем обслуживает другие соединения. Медленный клиент
+занимает только сокет, а не поток с соединением к базе.
+
+Пул общий с RateLimitMiddleware (notes.asgi.call_in_pool): сессия
+и пользователь, которых проверка частоты читает из базы, загружаются
+в нём же, а остальные слои на страницах чтения к базе не обращаются.
+"""
+import functools
+
+from . import views
+from .asgi import call_in_pool
+from .middleware import template_timer
+
+
+def _run(view, request, args, kwargs):
+    response = view(request, *args, **kwargs)
+    if hasattr(response, 'render') and callable(response.render):
+        # Отрисовка прошла здесь, и ServerTimingMiddleware
+        # её уже не увидит.
+        with template_timer():
+            response = response.render()
+    return response
+
+
+def run_in_pool(view):
+    """Превращает синхронное представление в асинхронное."""
+    @functools.wraps(view)
+    async def async_view(request, *args, **kwargs):
+        return await call_in_pool(_run, view, request, args, kwargs)
+    return async_view
+
+
+notes_list = run_in_pool(views.NotesList.as_view())
+note_detail = run_in_pool(views.NoteDetail.as_view())
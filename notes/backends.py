@@ -0,0 +1,73 @@
+"""
+Бэкенд авторизации с кэшем пользователей.
+
+AuthenticationMiddleware на каждом запросе загружает пользователя
+по id из сессии. CachedModelBackend берёт его из кэша на
+NOTES_USER_CACHE_TIMEOUT секунд; запись удаляется при выходе,
+сохранении (в том числе смене пароля) и удалении пользователя.
+
+Удаление записи видно другим процессам, только если кэш у них общий,
+поэтому кэш пользователей и сессии в кэше включаются явно и требуют
+кэша вроде Redis или Memcached (см. check_shared_cache).
+"""
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.exceptions import ImproperlyConfigured, PermissionDenied
+
+from . import cache
+
+# Бэкенды, которые хранят данные в памяти одного процесса.
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+CACHED_SESSION_ENGINES = (
+    'django.contrib.sessions.backends.cache',
+    'django.contrib.sessions.backends.cached_db',
+)
+
+
+def check_shared_cache():
+    """
+    Отказывается работать с кэшем пользователей или сессий
+    в кэше, который не общий для процессов.
+
+    Иначе выход, смена пароля или удаление пользователя в одном
+    процессе не заметны другим, и старая сессия продолжает работать.
+    """
+    uses = []
+    if settings.NOTES_USER_CACHE_TIMEOUT:
+        uses.append(('NOTES_USER_CACHE_TIMEOUT', settings.NOTES_CACHE_ALIAS))
+    if settings.SESSION_ENGINE in CACHED_SESSION_ENGINES:
+        uses.append(('SESSION_ENGINE', settings.SESSION_CACHE_ALIAS))
+    for setting, alias in uses:
+        backend = settings.CACHES[alias]['BACKEND']
+        if backend in PROCESS_LOCAL_CACHES:
+            raise ImproperlyConfigured(
+                f'{setting} требует общего для процессов кэша, '
+                f'а кэш {alias!r} - {backend}'
+            )
+
+
+class CachedModelBackend(ModelBackend):
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        user = super().authenticate(
+            request, username=username, password=password, **kwargs
+        )
+        if user is None:
+            # Следующий в AUTHENTICATION_BACKENDS ModelBackend нужен
+            # только для старых сессий и проверил бы тот же пароль
+            # повторно, удвоив время неудачного входа.
+            raise PermissionDenied
+        return user
+
+    def get_user(self, user_id):
+        if not settings.NOTES_USER_CACHE_TIMEOUT:
+            return super().get_user(user_id)
+        user = cache.get_user(user_id)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set_user(user)
+        return user
@@ -0,0 +1,72 @@
+"""
+Массовые операции с заметками множественными запросами.
+
+Заметки обрабатываются порциями по id без загрузки объектов, поэтому
+сигналы отдельных заметок не срабатывают: удаление само обновляет
+счётчики тегов и сводки авторов, а индекс и кэш списка обновляет
+сигнал notes_bulk_changed - индекс фоновой задачей.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import stats, tags
+from .models import Note, NoteRevision, NoteTag
+from .signals import notes_bulk_changed
+
+# Id одной порции встречаются в запросе дважды: вместе с остальными
+# параметрами это не больше 999 параметров старых версий SQLite.
+BATCH_SIZE = 400
+
+
+def note_batches(queryset, batch_size=BATCH_SIZE):
+    """
+    Порции пар (id, author_id) заметок queryset по возрастанию id.
+
+    Следующая порция читается после обработки предыдущей, поэтому
+    удалённые заметки не мешают курсору.
+    """
+    rows = queryset.order_by('pk').values_list('pk', 'author_id')
+    last_pk = 0
+    while True:
+        batch = list(rows.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last_pk = batch[-1][0]
+
+
+def delete_notes(queryset, batch_size=BATCH_SIZE):
+    """
+    Удаляет заметки queryset порциями, каждую в своей транзакции.
+
+    Возвращает число удалённых заметок.
+    """
+    deleted = 0
+    for batch in note_batches(queryset, batch_size):
+        ids = [pk for pk, _ in batch]
+        by_author = defaultdict(list)
+        for pk, author_id in batch:
+            by_author[author_id].append(pk)
+        notes = Note.objects.filter(pk__in=ids)
+        with transaction.atomic():
+            counted = stats.count_notes(notes)
+            for author_id, note_ids in by_author.items():
+                tags.forget_notes(author_id, note_ids)
+            NoteTag.objects.filter(note_id__in=ids).delete()
+            NoteRevision.objects.filter(note_id__in=ids).delete()
+            # QuerySet.delete() загрузил бы каждую заметку ради
+            # pre_delete и post_delete; их работа сделана выше и ниже.
+            notes._raw_delete(notes.db)
+            edited = timezone.now()
+            for row in counted.values():
+                stats.record(
+                    row.author_id, notes=-row.notes, size=-row.size,
+                    edited=edited,
+                )
+            notes_bulk_changed.send(
+                sender=Note, author_ids=set(by_author), deleted_ids=ids
+            )
+        deleted += len(ids)
+    return deleted
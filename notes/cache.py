@@ -0,0 +1,151 @@
+"""
+Кэш отрисованного списка заметок и авторизованных пользователей.
+
+Фрагменты кэшируются под ключом с версией списка пользователя.
+Любое изменение заметок увеличивает версию, и старые фрагменты
+просто перестают запрашиваться - инвалидация стоит одну операцию
+с кэшем и не требует перебора ключей.
+"""
+import hashlib
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+def get_cache():
+    return caches[settings.NOTES_CACHE_ALIAS]
+
+
+class CacheStats:
+    """
+    Счётчики попаданий и промахов.
+
+    Счётчики копятся в памяти процесса и сбрасываются в общий кэш
+    пачками по flush_every событий, чтобы не писать в кэш
+    на каждый запрос.
+    """
+
+    prefix = 'notes:stats:'
+
+    def __init__(self, flush_every=100):
+        self.flush_every = flush_every
+        self._pending = Counter()
+        self._events = 0
+        self._lock = threading.Lock()
+
+    def incr(self, name, delta=1):
+        with self._lock:
+            self._pending[name] += delta
+            self._events += 1
+            if self._events < self.flush_every:
+                return
+            pending, self._pending = self._pending, Counter()
+            self._events = 0
+        self._flush(pending)
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+            self._events = 0
+        self._flush(pending)
+
+    def _flush(self, pending):
+        cache = get_cache()
+        for name, delta in pending.items():
+            key = self.prefix + name
+            if not cache.add(key, delta, timeout=None):
+                try:
+                    cache.incr(key, delta)
+                except ValueError:
+                    cache.set(key, delta, timeout=None)
+
+    def get(self, *names):
+        """Возвращает значения счётчиков из кэша с учётом несброшенных."""
+        self.flush()
+        values = get_cache().get_many([self.prefix + name for name in names])
+        return {name: values.get(self.prefix + name, 0) for name in names}
+
+
+stats = CacheStats()
+
+
+def _version_key(author_id):
+    return f'notes:list:version:{author_id}'
+
+
+def list_version(author_id):
+    """
+    Текущая версия списка заметок пользователя.
+
+    Начальное значение берётся из часов, поэтому после вытеснения
+    ключа версии из кэша старые фрагменты не станут снова актуальными.
+    """
+    cache = get_cache()
+    key = _version_key(author_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_list_version(author_id):
+    """Инвалидирует все кэшированные фрагменты списка пользователя."""
+    cache = get_cache()
+    key = _version_key(author_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+
+
+def list_fragment_key(author_id, params):
+    """
+    Ключ фрагмента списка для параметров запроса.
+
+    Версию нужно прочитать до выборки заметок: тогда изменение,
+    сделанное во время отрисовки, не попадёт под новую версию.
+    """
+    params = hashlib.md5(
+        '&'.join(sorted(
+            f'{name}={value}' for name, value in params.items()
+        )).encode()
+    ).hexdigest()
+    version = list_version(author_id)
+    return f'notes:list:{author_id}:{version}:{params}'
+
+
+def get_list_fragment(key):
+    """Возвращает отрисованный фрагмент списка или None."""
+    fragment = get_cache().get(key)
+    stats.incr('list_hits' if fragment is not None else 'list_misses')
+    return fragment
+
+
+def set_list_fragment(key, fragment):
+    get_cache().set(key, fragment, settings.NOTES_LIST_CACHE_TIMEOUT)
+    return fragment
+
+
+def _user_key(user_id):
+    return f'notes:user:{user_id}'
+
+
+def get_user(user_id):
+    """Пользователь из кэша или None."""
+    user = get_cache().get(_user_key(user_id))
+    stats.incr('user_hits' if user is not None else 'user_misses')
+    return user
+
+
+def set_user(user):
+    get_cache().set(
+        _user_key(user.pk), user, settings.NOTES_USER_CACHE_TIMEOUT
+    )
+
+
+def delete_user(user_id):
+    get_cache().delete(_user_key(user_id))
@@ -0,0 +1,10 @@
+import pytest
+
+from notes.tests.runner import test_environment
+
+
+@pytest.fixture(autouse=True, scope='session')
+def notes_test_environment():
+    """Окружение тестов, как у manage.py test (NotesTestRunner)."""
+    with test_environment():
+        yield
@@ -0,0 +1,15 @@
+from django.utils.functional import SimpleLazyObject
+
+from . import stats
+
+
+def note_stats(request):
+    """
+    Сводка по заметкам пользователя в переменной note_stats.
+
+    Сводка читается, только если шаблон к ней обращается.
+    """
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {}
+    return {'note_stats': SimpleLazyObject(lambda: stats.get_stats(user.pk))}
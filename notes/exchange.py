@@ -0,0 +1,296 @@
+"""
+Импорт и экспорт заметок в форматах JSON Lines, CSV и Markdown в zip.
+
+Чтение и запись идут потоком, строка за строкой; импорт пишет
+в базу порциями через bulk_create, экспорт читает её порциями
+ограниченного размера.
+"""
+import csv
+import json
+import time
+import zipfile
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from . import stats
+from .fields import unpack
+from .models import Note
+from .signals import notes_bulk_changed
+from .slugs import SlugPlanner, base_slug
+
+FORMATS = ('jsonl', 'csv')
+FIELDS = ('title', 'text', 'slug', 'author')
+
+
+def guess_format(path):
+    return 'csv' if str(path).lower().endswith('.csv') else 'jsonl'
+
+
+def read_rows(stream, fmt):
+    """
+    Потоково читает словари с полями заметок.
+
+    Вместо строки, которую не удалось разобрать, возвращается None.
+    """
+    if fmt == 'csv':
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield None
+
+
+class RowWriter:
+    """Пишет словари с полями заметок в поток."""
+
+    def __init__(self, stream, fmt, fields=FIELDS):
+        self.stream = stream
+        self.fields = fields
+        self.csv = None
+        if fmt == 'csv':
+            self.csv = csv.DictWriter(stream, fieldnames=fields)
+            self.csv.writeheader()
+
+    def write(self, row):
+        if self.csv is not None:
+            self.csv.writerow(row)
+        else:
+            self.stream.write(json.dumps(row, ensure_ascii=False) + '\n')
+
+
+def export_rows(queryset, chunk_size):
+    """
+    Строки для экспорта в порядке id.
+
+    iterator() читает результат порциями по chunk_size строк,
+    поэтому расход памяти не зависит от размера таблицы.
+    """
+    rows = queryset.order_by('id').values_list(
+        'title', 'text', 'slug', 'author__username'
+    ).iterator(chunk_size=chunk_size)
+    for title, text, slug, author in rows:
+        yield dict(zip(FIELDS, (title, unpack(text), slug, author)))
+
+
+class ChunkedRows:
+    """
+    Итератор по строкам queryset, читающий их порциями по chunk_size.
+
+    Каждая порция - отдельный запрос с условием id > последнего id,
+    поэтому между порциями не держится открытый курсор и транзакция.
+    Сжатые значения полей распаковываются.
+
+    Под ASGI итератор перебирается в отдельном потоке
+    (notes.asgi.StreamingASGIHandler), а не в цикле событий.
+    """
+
+    def __init__(self, queryset, fields, chunk_size):
+        self.queryset = queryset.order_by('id').values_list('id', *fields)
+        self.chunk_size = chunk_size
+
+    def fetch(self, last_id):
+        return list(
+            self.queryset.filter(id__gt=last_id)[:self.chunk_size]
+        )
+
+    def __iter__(self):
+        last_id = 0
+        while True:
+            rows = self.fetch(last_id)
+            if not rows:
+                return
+            for row in rows:
+                yield tuple(unpack(value) for value in row[1:])
+            last_id = rows[-1][0]
+
+
+NDJSON_FIELDS = ('title', 'text', 'slug', 'created', 'updated')
+
+
+def ndjson_stream(queryset, chunk_size):
+    """Заметки по одной в строке JSON, порциями байтов."""
+    for row in ChunkedRows(queryset, NDJSON_FIELDS, chunk_size):
+        yield (json.dumps(
+            dict(zip(NDJSON_FIELDS, row)),
+            cls=DjangoJSONEncoder,
+            ensure_ascii=False,
+        ) + '\n').encode()
+
+
+class _StreamBuffer:
+    """
+    Файл без перемотки для zipfile.
+
+    zipfile пишет в него архив, а генератор забирает накопленные
+    байты после каждой заметки; позиция нужна zipfile для заголовков.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def markdown_zip_stream(queryset, chunk_size):
+    """Zip-архив с файлом <slug>.md на заметку, собираемый на лету."""
+    buffer = _StreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        rows = ChunkedRows(
+            queryset, ('slug', 'title', 'text', 'updated'), chunk_size
+        )
+        for slug, title, text, updated in rows:
+            info = zipfile.ZipInfo(
+                f'{slug}.md', date_time=updated.timetuple()[:6]
+            )
+            info.compress_type = zipfile.ZIP_DEFLATED
+            archive.writestr(info, f'# {title}\n\n{text}\n')
+            yield buffer.pop()
+    yield buffer.pop()
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    skipped: int = 0
+    seconds: float = 0.0
+    errors: list = field(default_factory=list)
+
+    @property
+    def rate(self):
+        return self.created / self.seconds if self.seconds else 0.0
+
+
+class NotesImporter:
+    """
+    Создаёт заметки из строк порциями по chunk_size.
+
+    Каждая порция - одна транзакция и один bulk_create; slug
+    подбираются заранее в памяти, включая суффиксы для совпадений
+    с уже существующими заметками.
+    """
+
+    max_errors = 100
+
+    def __init__(self, author=None, chunk_size=1000):
+        self.author = author
+        self.chunk_size = chunk_size
+        self.planner = SlugPlanner(
+            Note.objects.all(), Note._meta.get_field('slug').max_length
+        )
+        self.title_length = Note._meta.get_field('title').max_length
+        self._authors = {}
+        self.result = ImportResult()
+
+    def run(self, rows, progress=None):
+        started = time.perf_counter()
+        rows = enumerate(rows, start=1)
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                break
+            self.import_chunk(chunk)
+            self.result.seconds = time.perf_counter() - started
+            if progress is not None:
+                progress(self.result)
+        self.result.seconds = time.perf_counter() - started
+        return self.result
+
+    def skip(self, number, message):
+        self.result.skipped += 1
+        if len(self.result.errors) < self.max_errors:
+            self.result.errors.append(f'Строка {number}: {message}')
+
+    def resolve_authors(self, chunk):
+        usernames = {
+            row.get('author') for _, row in chunk
+            if isinstance(row, dict) and row.get('author')
+            and isinstance(row['author'], str)
+        } - self._authors.keys()
+        if usernames:
+            self._authors.update(
+                get_user_model().objects.filter(
+                    username__in=usernames
+                ).values_list('username', 'id')
+            )
+
+    def build_note(self, number, row):
+        if not isinstance(row, dict):
+            self.skip(number, 'ожидается объект с полями заметки')
+            return None
+        for name in FIELDS:
+            if not isinstance(row.get(name) or '', str):
+                self.skip(number, f'поле {name} должно быть строкой')
+                return None
+        if row.get('author'):
+            author_id = self._authors.get(row['author'])
+        else:
+            author_id = getattr(self.author, 'pk', None)
+        if author_id is None:
+            self.skip(number, f'автор {row.get("author")!r} не найден')
+            return None
+        title = (row.get('title') or '')[:self.title_length]
+        if not title:
+            self.skip(number, 'пустой заголовок')
+            return None
+        return Note(
+            title=title,
+            text=row.get('text') or '',
+            slug=row.get('slug') or '',
+            author_id=author_id,
+        )
+
+    def import_chunk(self, chunk):
+        self.resolve_authors(chunk)
+        notes = [
+            note for note in (
+                self.build_note(number, row) for number, row in chunk
+            )
+            if note is not None
+        ]
+        if not notes:
+            return
+        max_length = self.planner.max_length
+        slugs = self.planner.plan([
+            base_slug(note.slug or note.title, max_length) for note in notes
+        ])
+        for note, slug in zip(notes, slugs):
+            note.slug = slug
+        with transaction.atomic():
+            Note.objects.bulk_create(notes)
+            saved_ids = list(
+                Note.objects.filter(slug__in=slugs).values_list(
+                    'id', flat=True
+                )
+            )
+            # bulk_create не вызывает post_save.
+            stats.record_created(notes)
+            notes_bulk_changed.send(
+                sender=Note,
+                author_ids={note.author_id for note in notes},
+                saved_ids=saved_ids,
+            )
+        self.result.created += len(notes)
@@ -0,0 +1,201 @@
+"""
+Текстовое поле, которое сжимает длинные значения.
+
+Значение длиной от NOTES_TEXT_COMPRESS_MIN_SIZE символов сжимается
+алгоритмом NOTES_TEXT_COMPRESSION (zlib или zstd, если установлен пакет
+zstandard) и хранится в той же текстовой колонке как base64 с префиксом
+PREFIX и буквой алгоритма. Короткие значения и те, что не стали
+короче, хранятся как есть, поэтому в одной колонке лежат вперемешку
+сжатые и обычные строки, а схема базы не меняется.
+
+Сжатое значение из базы распаковывается только при первом обращении
+к атрибуту модели; сохранение модели без изменения поля пишет
+сжатые данные обратно без распаковки и повторного сжатия. Запросы
+values() и values_list() возвращают для сжатых строк PackedText,
+который превращает в строку unpack().
+
+Поиск по подстроке в базе (text__icontains) сжатые значения
+не находит; поиск FTS5 индексирует уже распакованный текст.
+"""
+import base64
+import zlib
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models, transaction
+from django.db.models.query_utils import DeferredAttribute
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Управляющий символ, с которого не начинается обычный текст.
+PREFIX = '\x01'
+
+
+def _zstd():
+    if zstandard is None:
+        raise ImproperlyConfigured('Для сжатия zstd нужен пакет zstandard')
+    return zstandard
+
+
+CODECS = {
+    'zlib': ('z', lambda data: zlib.compress(data, 6), zlib.decompress),
+    'zstd': (
+        's',
+        lambda data: _zstd().ZstdCompressor(level=6).compress(data),
+        lambda data: _zstd().ZstdDecompressor().decompress(data),
+    ),
+}
+_DECOMPRESS = {
+    marker: decompress for marker, _, decompress in CODECS.values()
+}
+
+
+class PackedText:
+    """Сжатое значение в том виде, в каком оно хранится в базе."""
+
+    __slots__ = ('raw',)
+
+    def __init__(self, raw):
+        self.raw = raw
+
+    def __repr__(self):
+        return f'<PackedText {len(self.raw)}>'
+
+    def unpack(self):
+        data = base64.b64decode(self.raw[2:])
+        return _DECOMPRESS[self.raw[1]](data).decode()
+
+
+def pack(text):
+    """
+    Значение для записи в базу: сжатое, если это выгодно.
+
+    Текст, который сам начинается с PREFIX, сжимается всегда,
+    иначе при чтении его приняли бы за сжатый.
+    """
+    forced = text.startswith(PREFIX)
+    if len(text) < settings.NOTES_TEXT_COMPRESS_MIN_SIZE and not forced:
+        return text
+    marker, compress, _ = CODECS[settings.NOTES_TEXT_COMPRESSION]
+    data = text.encode()
+    raw = PREFIX + marker + base64.b64encode(compress(data)).decode()
+    if len(raw) >= len(data) and not forced:
+        return text
+    return PackedText(raw)
+
+
+def unpack(value):
+    """Строка из значения, прочитанного values() или values_list()."""
+    return value.unpack() if isinstance(value, PackedText) else value
+
+
+def _raw(value):
+    return value.raw if isinstance(value, PackedText) else value
+
+
+class CompressedTextDescriptor(DeferredAttribute):
+    """Распаковывает значение при первом обращении к атрибуту."""
+
+    def __get__(self, instance, cls=None):
+        if instance is None:
+            return self
+        value = super().__get__(instance, cls)
+        if isinstance(value, PackedText):
+            value = instance.__dict__[self.field.attname] = value.unpack()
+        return value
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.field.attname] = value
+
+
+class CompressedTextField(models.TextField):
+    descriptor_class = CompressedTextDescriptor
+
+    def from_db_value(self, value, expression, connection):
+        if value is not None and value.startswith(PREFIX):
+            return PackedText(value)
+        return value
+
+    def to_python(self, value):
+        return super().to_python(unpack(value))
+
+    def pre_save(self, model_instance, add):
+        # Нераспакованное значение пишется как есть.
+        return model_instance.__dict__.get(self.attname)
+
+    def get_prep_value(self, value):
+        if isinstance(value, PackedText):
+            return value.raw
+        value = super().get_prep_value(value)
+        return None if value is None else _raw(pack(value))
+
+
+def stored_size(value):
+    """Размер значения в колонке, байт."""
+    if isinstance(value, PackedText):
+        return len(value.raw)
+    return len(value.encode())
+
+
+@dataclass
+class RepackResult:
+    rows: int = 0
+    changed: int = 0
+    packed: int = 0
+    before: int = 0
+    after: int = 0
+
+
+def repack(queryset, field_name, batch_size=1000, decompress=False,
+           dry_run=False, progress=None):
+    """
+    Пересохраняет значения поля по текущим настройкам сжатия.
+
+    Строки читаются порциями по batch_size в порядке pk; каждая порция
+    читается с блокировкой и записывается одним UPDATE в своей
+    транзакции. Значения пишутся выражением Value, минуя
+    get_prep_value, поэтому с decompress=True текст сохраняется
+    несжатым независимо от порога. Время изменения строк не меняется.
+    """
+    rows = queryset.order_by('pk').values_list('pk', field_name)
+    result = RepackResult()
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                rows.select_for_update().filter(pk__gt=last_pk)[:batch_size]
+            )
+            if not batch:
+                break
+            updates = {}
+            for pk, value in batch:
+                text = unpack(value)
+                stored = (
+                    text if decompress and not text.startswith(PREFIX)
+                    else pack(text)
+                )
+                if _raw(stored) != _raw(value):
+                    updates[pk] = _raw(stored)
+                result.packed += isinstance(stored, PackedText)
+                result.before += stored_size(value)
+                result.after += stored_size(stored)
+            if updates and not dry_run:
+                queryset.model.objects.filter(pk__in=updates).update(**{
+                    field_name: models.Case(
+                        *(
+                            models.When(pk=pk, then=models.Value(raw))
+                            for pk, raw in updates.items()
+                        ),
+                        output_field=models.TextField(),
+                    ),
+                })
+        result.rows += len(batch)
+        result.changed += len(updates)
+        last_pk = batch[-1][0]
+        if progress is not None:
+            progress(result)
+    return result
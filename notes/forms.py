@@ -1,29 +1,68 @@
-from pytils.translit import slugify
-
 from django import forms
 from django.core.exceptions import ValidationError
 
-from .models import Note
+from . import tags
+from .models import Note, Tag
 
 WARNING = ' - такой slug уже существует, придумайте уникальное значение!'
+MAX_TAGS = 20
 
 
 class NoteForm(forms.ModelForm):
     """Форма для создания или обновления заметки."""
 
+    tags = forms.CharField(
+        label='Теги',
+        required=False,
+        help_text='Перечислите теги через запятую',
+    )
+
     class Meta:
         model = Note
         fields = ('title', 'text', 'slug')
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk is not None and 'tags' not in self.initial:
+            self.initial['tags'] = ', '.join(tags.note_tags(self.instance))
+
+    def clean_tags(self):
+        names = tags.parse(self.cleaned_data['tags'])
+        if len(names) > MAX_TAGS:
+            raise ValidationError(f'Не больше {MAX_TAGS} тегов')
+        max_length = Tag._meta.get_field('name').max_length
+        for name in names:
+            if len(name) > max_length:
+                raise ValidationError(
+                    f'Тег длиннее {max_length} символов: {name}'
+                )
+        return names
+
     def clean_slug(self):
-        """Обрабатывает случай, если slug не уникален."""
-        cleaned_data = super().clean()
-        slug = cleaned_data.get('slug')
+        """
+        Обрабатывает случай, если slug не уникален.
+
+        Пустой slug не проверяется: свободный вариант из заголовка
+        подберёт Note.save() в момент сохранения.
+        """
+        slug = self.cleaned_data.get('slug')
         if not slug:
-            title = cleaned_data.get('title')
-            slug = slugify(title)[:100]
+            return slug
         if Note.objects.filter(
                 slug=slug
         ).exclude(id=self.instance.pk).exists():
             raise ValidationError(slug + WARNING)
         return slug
+
+    def validate_unique(self):
+        """Уникальность slug уже проверена в clean_slug()."""
+        exclude = self._get_validation_exclusions()
+        exclude.append('slug')
+        try:
+            self.instance.validate_unique(exclude=exclude)
+        except ValidationError as error:
+            self._update_errors(error)
+
+    def _save_m2m(self):
+        super()._save_m2m()
+        tags.set_note_tags(self.instance, self.cleaned_data['tags'])
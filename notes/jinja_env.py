@@ -0,0 +1,35 @@
+"""
+Окружение Jinja2 для шаблонов notes/jinja2/.
+
+Включается переменной окружения YANOTE_JINJA2=1; шаблоны Django
+в templates/ остаются запасным вариантом для остальных страниц.
+"""
+from django.template.defaultfilters import date
+from django.templatetags.static import static
+from django.urls import reverse
+from django.utils.timezone import localtime
+from jinja2 import Environment
+
+from .markup import render_cached
+from .templatetags.notes_urls import cached_url
+
+
+def url(viewname, *args, **kwargs):
+    return reverse(viewname, args=args, kwargs=kwargs)
+
+
+def local_date(value, format=None):
+    """Фильтр date, как в шаблонах Django: в текущем часовом поясе."""
+    return date(localtime(value), format)
+
+
+def environment(**options):
+    env = Environment(**options)
+    env.globals.update(
+        static=static,
+        static_url=cached_url,
+        url=url,
+    )
+    env.filters['date'] = local_date
+    env.filters['markdown'] = render_cached
+    return env
@@ -0,0 +1,288 @@
+"""
+Очередь фоновых задач в таблице базы данных.
+
+Задача - это функция, заданная путём импорта ('notes.search.refresh'),
+и именованные аргументы, которые сохраняются в JSON. enqueue() кладёт
+задачу в таблицу Job, команда run_jobs выбирает и выполняет задачи
+в пуле потоков или процессов. При NOTES_JOBS_SYNC = True задача
+выполняется сразу в enqueue(), и отдельный обработчик не нужен.
+
+Задачи выбираются по убыванию приоритета, затем по времени, с которого
+их можно выполнять. Выборку в PostgreSQL делает SELECT ... FOR UPDATE
+SKIP LOCKED: параллельные обработчики пропускают строки друг друга
+и не ждут. В SQLite, где SKIP LOCKED нет, задачи занимает один UPDATE
+с подзапросом - он атомарен сам по себе; занятые строки обработчик
+находит по своей метке в locked_by.
+
+Упавшая задача повторяется через NOTES_JOBS_RETRY_DELAY * 2 ** (n - 1)
+секунд, со случайным разбросом, пока не кончатся попытки. Задача,
+не завершённая за timeout секунд, считается упавшей; сам поток или
+процесс прервать нельзя, и его результат просто не учитывается.
+Задачи обработчика, который завершился посреди работы, возвращаются
+в очередь так же по истечении timeout.
+
+Через очередь идёт обновление поискового индекса после массовых
+операций: импорта, пакетного API (создание, изменение и удаление),
+удаления и переиндексации в админке. Остальное выполняется в запросе:
+сохранение одной заметки обновляет индекс в своей транзакции,
+удаление заметок вместе с тегами, историей и сводками авторов
+остаётся транзакционным, выгрузка отдаётся потоком.
+
+По умолчанию NOTES_JOBS_SYNC = True, и задачи выполняются сразу.
+Для очереди сервер запускается с YANOTE_JOBS_SYNC=0, а рядом
+с ним - постоянно работающий обработчик с той же базой и настройками,
+который перезапускает менеджер процессов (systemd, supervisor):
+
+    YANOTE_JOBS_SYNC=0 python manage.py run_jobs --concurrency 4
+
+Без обработчика задачи копятся в таблице Job, и индекс не
+обновляется. Их можно выполнить разово: run_jobs --burst.
+"""
+import itertools
+import logging
+import multiprocessing
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import (
+    FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait,
+)
+from dataclasses import dataclass
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+logger = logging.getLogger('notes.jobs')
+
+# Как часто обработчик ищет задачи, брошенные другими обработчиками.
+STALE_CHECK_INTERVAL = 60
+
+
+def enqueue(name, *, priority=0, delay=0, timeout=None, max_attempts=None,
+            **kwargs):
+    """
+    Ставит в очередь вызов функции name с аргументами kwargs.
+
+    Аргументы должны сериализоваться в JSON. В режиме NOTES_JOBS_SYNC
+    функция вызывается сразу, и возвращается None.
+    """
+    function = import_string(name)
+    if settings.NOTES_JOBS_SYNC:
+        function(**kwargs)
+        return None
+    return Job.objects.create(
+        name=name,
+        args=kwargs,
+        priority=priority,
+        run_at=timezone.now() + timedelta(seconds=delay),
+        timeout=timeout or settings.NOTES_JOBS_TIMEOUT,
+        max_attempts=max_attempts or settings.NOTES_JOBS_MAX_ATTEMPTS,
+    )
+
+
+def retry_delay(attempt):
+    """Пауза перед повтором после попытки attempt, в секундах."""
+    delay = min(
+        settings.NOTES_JOBS_RETRY_DELAY * 2 ** (attempt - 1),
+        settings.NOTES_JOBS_RETRY_MAX_DELAY,
+    )
+    return random.uniform(delay / 2, delay)
+
+
+def claim(limit, token):
+    """Занимает до limit готовых к выполнению задач меткой token."""
+    now = timezone.now()
+    ready = Job.objects.filter(status=Job.QUEUED, run_at__lte=now).order_by(
+        '-priority', 'run_at', 'id'
+    )
+    with transaction.atomic():
+        if connection.features.has_select_for_update_skip_locked:
+            ids = list(
+                ready.select_for_update(skip_locked=True).values_list(
+                    'id', flat=True
+                )[:limit]
+            )
+        else:
+            ids = ready.values('id')[:limit]
+        Job.objects.filter(pk__in=ids, status=Job.QUEUED).update(
+            status=Job.RUNNING,
+            locked_by=token,
+            started=now,
+            attempts=F('attempts') + 1,
+        )
+    return list(
+        Job.objects.filter(status=Job.RUNNING, locked_by=token).order_by(
+            '-priority', 'run_at', 'id'
+        )
+    )
+
+
+def finish(job, error=None):
+    """
+    Записывает результат попытки.
+
+    Запись выполняется, только если задача всё ещё занята этой
+    попыткой: опоздавший результат после таймаута ничего не меняет.
+    """
+    attempt = Job.objects.filter(
+        pk=job.pk, status=Job.RUNNING, locked_by=job.locked_by
+    )
+    now = timezone.now()
+    if error is None:
+        if settings.NOTES_JOBS_KEEP_DONE:
+            return attempt.update(status=Job.DONE, finished=now)
+        return attempt.delete()[0]
+    if job.attempts < job.max_attempts:
+        return attempt.update(
+            status=Job.QUEUED,
+            locked_by='',
+            run_at=now + timedelta(seconds=retry_delay(job.attempts)),
+            last_error=error,
+        )
+    return attempt.update(status=Job.FAILED, finished=now, last_error=error)
+
+
+def requeue_stale(grace=0):
+    """Считает упавшими задачи, занятые дольше timeout + grace секунд."""
+    now = timezone.now()
+    stale = [
+        job for job in Job.objects.filter(status=Job.RUNNING)
+        if job.started + timedelta(seconds=job.timeout + grace) < now
+    ]
+    for job in stale:
+        finish(job, 'Обработчик не завершил задачу')
+    return len(stale)
+
+
+def execute(name, kwargs):
+    """Вызов задачи в потоке или процессе пула."""
+    try:
+        import_string(name)(**kwargs)
+    finally:
+        # Потоки пула живут долго: соединения закрываются
+        # по тем же правилам CONN_MAX_AGE, что и после запроса.
+        close_old_connections()
+
+
+@dataclass
+class WorkerResult:
+    done: int = 0
+    failed: int = 0
+    timed_out: int = 0
+
+
+class Worker:
+    """
+    Выбирает задачи из очереди и выполняет их в пуле.
+
+    Новые задачи занимаются, только когда в пуле есть свободные места,
+    поэтому задачи не ждут в памяти обработчика, пока их могли бы
+    взять другие.
+    """
+
+    def __init__(self, concurrency=4, processes=False, poll_interval=1.0,
+                 name=None):
+        self.concurrency = concurrency
+        self.processes = processes
+        self.poll_interval = poll_interval
+        self.name = name or f'{socket.gethostname()}:{os.getpid()}'
+        self.result = WorkerResult()
+        self._claims = itertools.count(1)
+        self._stop = threading.Event()
+        # future -> (задача, срок); задачи с истёкшим сроком остаются,
+        # пока поток или процесс не освободится.
+        self._running = {}
+
+    def stop(self):
+        """Просит обработчик завершиться после текущих задач."""
+        self._stop.set()
+
+    def make_executor(self):
+        if self.processes:
+            return ProcessPoolExecutor(
+                max_workers=self.concurrency,
+                mp_context=multiprocessing.get_context('spawn'),
+                # Не функция этого модуля: его импорт в новом процессе
+                # загружает модели до django.setup().
+                initializer=django.setup,
+            )
+        return ThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix='notes-job'
+        )
+
+    def run(self, burst=False):
+        """
+        Выполняет задачи до вызова stop().
+
+        С burst=True обработчик завершается, когда очередь опустела.
+        """
+        next_stale_check = 0
+        with self.make_executor() as executor:
+            while True:
+                if time.monotonic() >= next_stale_check:
+                    requeue_stale()
+                    next_stale_check = time.monotonic() + STALE_CHECK_INTERVAL
+                claimed = []
+                free = self.concurrency - len(self._running)
+                if free > 0 and not self._stop.is_set():
+                    claimed = claim(free, f'{self.name}:{next(self._claims)}')
+                for job in claimed:
+                    future = executor.submit(execute, job.name, job.args)
+                    self._running[future] = (
+                        job, time.monotonic() + job.timeout
+                    )
+                if not self._running:
+                    if self._stop.is_set() or burst:
+                        break
+                    self._stop.wait(self.poll_interval)
+                    continue
+                self.wait_running()
+        return self.result
+
+    def wait_running(self):
+        now = time.monotonic()
+        deadline = min(
+            (deadline for job, deadline in self._running.values()
+             if job is not None),
+            default=now + self.poll_interval,
+        )
+        done, _ = wait(
+            self._running,
+            timeout=max(min(deadline - now, self.poll_interval), 0),
+            return_when=FIRST_COMPLETED,
+        )
+        for future in done:
+            job, _ = self._running.pop(future)
+            if job is not None:
+                self.complete(job, future)
+        now = time.monotonic()
+        for future, (job, deadline) in self._running.items():
+            if job is not None and deadline <= now:
+                self.result.timed_out += 1
+                self.result.failed += 1
+                finish(job, f'Задача не завершилась за {job.timeout} с')
+                self._running[future] = (None, deadline)
+
+    def complete(self, job, future):
+        error = future.exception()
+        if error is None:
+            self.result.done += 1
+            finish(job)
+            return
+        self.result.failed += 1
+        logger.warning(
+            'Задача %s, попытка %s: %r', job, job.attempts, error
+        )
+        finish(job, ''.join(traceback.format_exception(
+            type(error), error, error.__traceback__
+        )))
@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from notes import fields
+from notes.models import Note, NoteRevision
+
+TARGETS = (
+    (Note, 'text', 'Тексты заметок'),
+    (NoteRevision, 'data', 'История изменений'),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сжимает длинные тексты заметок и снимки истории порциями '
+        'и показывает, сколько места это освободило.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Количество строк в одной транзакции.',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только посчитать экономию, ничего не записывая.',
+        )
+        parser.add_argument(
+            '--decompress',
+            action='store_true',
+            help='Сохранить все тексты несжатыми.',
+        )
+
+    def handle(self, *args, batch_size, dry_run, decompress, **options):
+        if batch_size < 1:
+            raise CommandError('--batch-size должен быть положительным')
+
+        def progress(result):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'Обработано строк: {result.rows}')
+
+        for model, field_name, title in TARGETS:
+            result = fields.repack(
+                model.objects.all(), field_name, batch_size=batch_size,
+                decompress=decompress, dry_run=dry_run, progress=progress,
+            )
+            saved = result.before - result.after
+            ratio = saved / result.before if result.before else 0
+            self.stdout.write(
+                f'{title}: строк {result.rows}, изменено {result.changed}, '
+                f'сжато {result.packed}; {result.before} -> {result.after} '
+                f'байт, освобождено {saved} ({ratio:.1%})'
+            )
+        if dry_run:
+            self.stdout.write('Пробный запуск: база не изменена.')
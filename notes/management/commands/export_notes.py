@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from notes.exchange import FORMATS, RowWriter, export_rows, guess_format
+from notes.models import Note
+
+
+class Command(BaseCommand):
+    help = 'Выгружает заметки в файл JSON Lines или CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл для выгрузки или - для stdout.')
+        parser.add_argument('--format', choices=FORMATS)
+        parser.add_argument(
+            '--author', help='Выгрузить только заметки этого пользователя.'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Сколько строк читать из базы за один раз.',
+        )
+
+    def handle(self, *args, path, format, author, chunk_size, **options):
+        if chunk_size < 1:
+            raise CommandError('--chunk-size должен быть положительным')
+        queryset = Note.objects.all()
+        if author is not None:
+            queryset = queryset.filter(author__username=author)
+        fmt = format or guess_format(path)
+        stream = (
+            self.stdout if path == '-'
+            else open(path, 'w', encoding='utf-8', newline='')
+        )
+        writer = RowWriter(stream, fmt)
+        exported = 0
+        try:
+            for row in export_rows(queryset, chunk_size):
+                writer.write(row)
+                exported += 1
+        finally:
+            if stream is not self.stdout:
+                stream.close()
+        self.stderr.write(f'Выгружено заметок: {exported}')
@@ -0,0 +1,61 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from notes.exchange import FORMATS, NotesImporter, guess_format, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует заметки из файла JSON Lines или CSV. '
+        'Поля: title, text, slug (необязательно), author (username).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл с заметками или - для stdin.')
+        parser.add_argument('--format', choices=FORMATS)
+        parser.add_argument(
+            '--author',
+            help='username автора для строк без поля author.',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Количество заметок в одной транзакции.',
+        )
+
+    def handle(self, *args, path, format, author, chunk_size, **options):
+        if chunk_size < 1:
+            raise CommandError('--chunk-size должен быть положительным')
+        if author is not None:
+            try:
+                author = get_user_model().objects.get(username=author)
+            except get_user_model().DoesNotExist:
+                raise CommandError(f'Пользователь {author} не найден')
+        fmt = format or guess_format(path)
+        importer = NotesImporter(author=author, chunk_size=chunk_size)
+
+        def progress(result):
+            if options['verbosity'] > 1:
+                self.stdout.write(
+                    f'Создано {result.created} заметок, '
+                    f'{result.rate:.0f} в секунду'
+                )
+
+        stream = (
+            sys.stdin if path == '-'
+            else open(path, encoding='utf-8', newline='')
+        )
+        try:
+            result = importer.run(read_rows(stream, fmt), progress=progress)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        for error in result.errors:
+            self.stderr.write(error)
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано заметок: {result.created}, пропущено: {result.skipped}, '
+            f'{result.seconds:.2f} с, {result.rate:.0f} заметок в секунду'
+        ))
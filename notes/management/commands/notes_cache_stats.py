@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+
+from notes import cache
+
+COUNTERS = (
+    ('list', 'Список заметок'),
+    ('user', 'Пользователи'),
+    ('markdown', 'Markdown'),
+)
+REJECTIONS = (
+    ('rejected_read', 'чтение, 429'),
+    ('rejected_write', 'запись, 429'),
+    ('rejected_overload', 'перегрузка, 503'),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает счётчики попаданий и промахов кэша заметок '
+        'и число отклонённых запросов.'
+    )
+
+    def handle(self, *args, **options):
+        counters = cache.stats.get(
+            'markdown_render_us',
+            *(name for name, _ in REJECTIONS),
+            *(
+                f'{name}_{kind}' for name, _ in COUNTERS
+                for kind in ('hits', 'misses')
+            ),
+        )
+        for name, title in COUNTERS:
+            hits = counters[f'{name}_hits']
+            misses = counters[f'{name}_misses']
+            total = hits + misses
+            ratio = hits / total if total else 0
+            self.stdout.write(
+                f'{title}: попаданий {hits}, промахов {misses}, '
+                f'доля попаданий {ratio:.1%}'
+            )
+        misses = counters['markdown_misses']
+        if misses:
+            self.stdout.write(
+                f'Отрисовка Markdown: {misses} раз, в среднем '
+                f'{counters["markdown_render_us"] / misses / 1000:.2f} мс'
+            )
+        self.stdout.write('Отклонено запросов: ' + ', '.join(
+            f'{title} - {counters[name]}' for name, title in REJECTIONS
+        ))
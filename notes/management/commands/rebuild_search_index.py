@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from notes import search
+from notes.models import Note
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает полнотекстовый индекс заметок порциями.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество заметок в одной транзакции.',
+        )
+
+    def handle(self, *args, batch_size, **options):
+        if not search.is_available():
+            raise CommandError(
+                'Полнотекстовый индекс доступен только в SQLite'
+            )
+        if batch_size < 1:
+            raise CommandError('--batch-size должен быть положительным')
+
+        def progress(total):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'Проиндексировано заметок: {total}')
+
+        total = search.rebuild_index(
+            Note.objects.all(), batch_size=batch_size, progress=progress
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f'Индекс перестроен, заметок: {total}')
+        )
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from notes import stats
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает сводки по заметкам пользователей порциями.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Количество пользователей в одной транзакции.',
+        )
+
+    def handle(self, *args, batch_size, **options):
+        if batch_size < 1:
+            raise CommandError('--batch-size должен быть положительным')
+
+        def progress(total, fixed):
+            if options['verbosity'] > 1:
+                self.stdout.write(
+                    f'Проверено пользователей: {total}, исправлено: {fixed}'
+                )
+
+        total, fixed = stats.reconcile(batch_size, progress=progress)
+        self.stdout.write(self.style.SUCCESS(
+            f'Сводки пересчитаны: пользователей {total}, исправлено {fixed}'
+        ))
@@ -0,0 +1,62 @@
+import signal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from notes import jobs
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет фоновые задачи из очереди в пуле потоков или процессов. '
+        'SIGTERM и SIGINT завершают обработчик после текущих задач.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=4,
+            help='Сколько задач выполняется одновременно.',
+        )
+        parser.add_argument(
+            '--processes',
+            action='store_true',
+            help='Выполнять задачи в процессах, а не в потоках.',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=1.0,
+            help='Пауза в секундах между проверками пустой очереди.',
+        )
+        parser.add_argument(
+            '--burst',
+            action='store_true',
+            help='Завершиться, когда в очереди не останется готовых задач.',
+        )
+
+    def handle(self, *args, concurrency, processes, poll_interval, burst,
+               **options):
+        if concurrency < 1:
+            raise CommandError('--concurrency должен быть положительным')
+        if poll_interval <= 0:
+            raise CommandError('--poll-interval должен быть положительным')
+        worker = jobs.Worker(
+            concurrency=concurrency, processes=processes,
+            poll_interval=poll_interval,
+        )
+        handlers = {
+            signum: signal.signal(signum, lambda *args: worker.stop())
+            for signum in (signal.SIGTERM, signal.SIGINT)
+        }
+        if options['verbosity'] > 1:
+            self.stdout.write(f'Обработчик {worker.name} запущен')
+        try:
+            result = worker.run(burst=burst)
+        finally:
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+        self.stdout.write(self.style.SUCCESS(
+            f'Выполнено задач: {result.done}, ошибок: {result.failed}, '
+            f'из них по таймауту: {result.timed_out}'
+        ))
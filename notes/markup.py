@@ -0,0 +1,286 @@
+"""
+Отрисовка текста заметки в разметке Markdown.
+
+Поддерживается подмножество Markdown, которым пишут заметки: заголовки
+#, абзацы, списки -, * и 1., цитаты >, блоки кода ``` и отступ
+в четыре пробела, горизонтальная черта, **жирный**, *курсив*, `код`,
+[ссылки](адрес) и экранирование обратной косой чертой.
+
+Вывод безопасен по построению: весь текст экранируется, а теги
+создаёт только сам отрисовщик из фиксированного набора. Встроенный
+HTML выводится как текст, ссылки допускаются только относительные
+и со схемами из SAFE_SCHEMES.
+
+Отрисованный HTML кэшируется по хешу текста, поэтому заметка
+отрисовывается один раз после каждой правки, а устаревшие записи
+просто перестают запрашиваться. Попадания, промахи и суммарное время
+отрисовки копятся в счётчиках cache.stats.
+"""
+import hashlib
+import html
+import re
+import time
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .cache import get_cache, stats
+
+# Увеличивается при изменении вывода, чтобы не отдавать старый HTML.
+VERSION = 3
+SAFE_SCHEMES = ('http', 'https', 'mailto')
+# Глубже цитаты не вкладываются: маркеры > выводятся как текст.
+MAX_QUOTE_DEPTH = 16
+
+_FENCE = re.compile(r'^ {0,3}(`{3,}|~{3,})')
+_HEADING = re.compile(r'^ {0,3}(#{1,6})(?:[ \t]+(.*?))?(?:[ \t]+#+)?[ \t]*$')
+_RULE = re.compile(r'^ {0,3}([-*_])(?:[ \t]*\1){2,}[ \t]*$')
+_QUOTE = re.compile(r'^ {0,3}> ?')
+_BULLET = re.compile(r'^ {0,3}[-*+][ \t]+')
+_ORDERED = re.compile(r'^ {0,3}(\d{1,9})[.)][ \t]+')
+_INDENTED = re.compile(r'^(?: {4}|\t)')
+
+_BACKSLASH = re.compile(r'\\([\\`*_{}\[\]()#+\-.!>~|])')
+_CODE_SPAN = re.compile(r'(`+)(.+?)(?<!`)\1(?!`)', re.S)
+_LINK = re.compile(r'\[([^\[\]]+)\]\(\s*([^()\s]+)\s*\)')
+# Выделение не может содержать свой ограничитель (кроме одиночной
+# звёздочки в жирном и подчёркивания внутри слова), поэтому поиск
+# пары для каждого открывающего ограничителя обрывается на следующем
+# ограничителе и время разбора строки линейно.
+_STRONG = re.compile(
+    r'\*\*(?=\S)((?:[^*]|\*(?!\*))+?)(?<=\S)\*\*'
+    r'|(?<!\w)__(?=\S)((?:[^_]|_(?!_))+?)(?<=\S)__(?!\w)'
+)
+_EM = re.compile(
+    r'\*(?=\S)([^*]+?)(?<=\S)\*'
+    r'|(?<!\w)_(?=\S)((?:[^_]|(?<=\w)_(?=\w))+?)(?<=\S)_(?!\w)'
+)
+# Браузер молча выбрасывает из адреса управляющие символы и пробелы,
+# поэтому "java\tscript:" для него - та же схема javascript.
+_URL_CONTROL = re.compile(r'[\x00-\x20\x7f-\x9f]')
+# Заглушки для уже готовых фрагментов; в тексте такого символа нет.
+_MARK = '\x00'
+_PLACEHOLDER = re.compile(_MARK + r'(\d+)' + _MARK)
+
+
+def _safe_url(url):
+    """
+    Можно ли вывести адрес в href.
+
+    Проверяется адрес в том виде, в каком его прочтёт браузер, то есть
+    после раскрытия HTML-сущностей; адрес с управляющими символами или
+    пробелами отвергается целиком.
+    """
+    url = html.unescape(url)
+    if _URL_CONTROL.search(url):
+        return False
+    try:
+        scheme = urlsplit(url).scheme
+    except ValueError:
+        return False
+    return not scheme or scheme.lower() in SAFE_SCHEMES
+
+
+class _Inline:
+    """Отрисовка строки: код, ссылки и выделение."""
+
+    def __init__(self):
+        self.parts = []
+
+    def keep(self, html):
+        self.parts.append(html)
+        return f'{_MARK}{len(self.parts) - 1}{_MARK}'
+
+    def render(self, text):
+        text = _BACKSLASH.sub(lambda match: self.keep(escape(match[1])), text)
+        text = _CODE_SPAN.sub(
+            lambda match: self.keep(
+                f'<code>{escape(match[2].strip())}</code>'
+            ),
+            text,
+        )
+        text = _LINK.sub(self.link, text)
+        text = self.emphasis(escape(text))
+        while _PLACEHOLDER.search(text):
+            text = _PLACEHOLDER.sub(lambda match: self.parts[int(match[1])],
+                                    text)
+        return text
+
+    def link(self, match):
+        label, url = match[1], match[2]
+        if not _safe_url(url):
+            return match[0]
+        return self.keep(
+            f'<a href="{escape(url)}" rel="nofollow noopener">'
+            f'{self.emphasis(escape(label))}</a>'
+        )
+
+    @staticmethod
+    def emphasis(html):
+        html = _STRONG.sub(
+            lambda match: f'<strong>{match[1] or match[2]}</strong>', html
+        )
+        return _EM.sub(lambda match: f'<em>{match[1] or match[2]}</em>', html)
+
+
+def _inline(text):
+    return _Inline().render(text)
+
+
+def _list_item(line):
+    """Тег списка и текст пункта или None, если строка - не пункт."""
+    match = _BULLET.match(line)
+    if match:
+        return 'ul', line[match.end():]
+    match = _ORDERED.match(line)
+    if match:
+        return 'ol', line[match.end():]
+    return None
+
+
+def _code_block(lines):
+    code = escape('\n'.join(lines).rstrip('\n'))
+    return f'<pre><code>{code}</code></pre>'
+
+
+def _fenced(lines, index):
+    fence = _FENCE.match(lines[index])
+    if not fence:
+        return None
+    end = index + 1
+    while end < len(lines) and not lines[end].lstrip().startswith(fence[1]):
+        end += 1
+    return _code_block(lines[index + 1:end]), end + 1
+
+
+def _indented(lines, index):
+    end = index
+    while end < len(lines) and (
+        _INDENTED.match(lines[end]) or not lines[end].strip()
+    ):
+        end += 1
+    if end == index:
+        return None
+    code = [_INDENTED.sub('', line) for line in lines[index:end]]
+    return _code_block(code), end
+
+
+def _heading(lines, index):
+    heading = _HEADING.match(lines[index])
+    if not heading:
+        return None
+    level = len(heading[1])
+    return f'<h{level}>{_inline(heading[2] or "")}</h{level}>', index + 1
+
+
+def _rule(lines, index):
+    return ('<hr>', index + 1) if _RULE.match(lines[index]) else None
+
+
+def _quote(lines, index, depth):
+    if depth >= MAX_QUOTE_DEPTH:
+        return None
+    end = index
+    while end < len(lines) and _QUOTE.match(lines[end]):
+        end += 1
+    if end == index:
+        return None
+    quoted = [_QUOTE.sub('', line) for line in lines[index:end]]
+    return f'<blockquote>{_blocks(quoted, depth + 1)}</blockquote>', end
+
+
+def _list(lines, index):
+    item = _list_item(lines[index])
+    if not item:
+        return None
+    tag, items = item[0], []
+    while index < len(lines):
+        line = lines[index]
+        item = _list_item(line)
+        if item is not None and item[0] == tag:
+            items.append(item[1])
+        elif item is None and line[:1] in (' ', '\t') and line.strip():
+            # Продолжение пункта на следующей строке.
+            items[-1] += '\n' + line.strip()
+        else:
+            break
+        index += 1
+    html = ''.join(f'<li>{_inline(text)}</li>' for text in items)
+    return f'<{tag}>{html}</{tag}>', index
+
+
+def _starts_block(line):
+    return (
+        _FENCE.match(line) or _HEADING.match(line) or _RULE.match(line)
+        or _QUOTE.match(line) or _list_item(line)
+    )
+
+
+def _paragraph(lines, index):
+    end = index + 1
+    while end < len(lines) and lines[end].strip() and not _starts_block(
+        lines[end]
+    ):
+        end += 1
+    text = '\n'.join(line.strip() for line in lines[index:end])
+    return f'<p>{_inline(text)}</p>', end
+
+
+# Порядок важен: черта "- - -" - не список, абзац подходит всегда.
+_BLOCKS = (_fenced, _indented, _heading, _rule, _quote, _list, _paragraph)
+
+
+def _blocks(lines, depth=0):
+    """HTML-блоки для списка строк; depth - глубина вложения цитат."""
+    html = []
+    index = 0
+    while index < len(lines):
+        if not lines[index].strip():
+            index += 1
+            continue
+        for block in _BLOCKS:
+            if block is _quote:
+                result = _quote(lines, index, depth)
+            else:
+                result = block(lines, index)
+            if result is not None:
+                break
+        block_html, index = result
+        html.append(block_html)
+    return ''.join(html)
+
+
+def render(text):
+    """Безопасный HTML для текста в разметке Markdown."""
+    text = text.replace(_MARK, '\ufffd')
+    return mark_safe(_blocks(text.replace('\r\n', '\n').split('\n')))
+
+
+def _key(text):
+    digest = hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+    return f'notes:markdown:{VERSION}:{digest}'
+
+
+def render_cached(text):
+    """
+    HTML текста из кэша; при промахе текст отрисовывается и кэшируется.
+
+    Время отрисовки копится в счётчике markdown_render_us.
+    """
+    if not text:
+        return mark_safe('')
+    cache = get_cache()
+    key = _key(text)
+    html = cache.get(key)
+    if html is not None:
+        stats.incr('markdown_hits')
+        return mark_safe(html)
+    started = time.perf_counter()
+    html = render(text)
+    elapsed = time.perf_counter() - started
+    stats.incr('markdown_misses')
+    stats.incr('markdown_render_us', round(elapsed * 1_000_000))
+    cache.set(key, str(html), settings.NOTES_MARKDOWN_CACHE_TIMEOUT)
+    return html
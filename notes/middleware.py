@@ -0,0 +1,458 @@
+"""
+Промежуточные слои YaNote.
+
+ServerTimingMiddleware измеряет для каждого запроса число SQL-запросов
+и их суммарное время, время отрисовки шаблона и общее время обработки.
+Результат отдаётся в заголовке Server-Timing и пишется строкой JSON
+в журнал notes.timing; запрос, превысивший NOTES_QUERY_BUDGET
+SQL-запросов, пишется с уровнем WARNING.
+
+SQL-запросы считает обёртка execute_wrapper, которая ставится на каждое
+соединение один раз. Текущий замер она находит через contextvar, поэтому
+вне запроса обёртка стоит одного обращения к переменной, а запросы
+из потоков пула notes.async_views попадают в замер того же запроса.
+
+StaticFilesMiddleware отдаёт файлы из STATIC_ROOT, выбирая сжатую
+при collectstatic копию .br или .gz по заголовку Accept-Encoding.
+Файлы с хешем в имени кэшируются браузером навсегда.
+
+CompressionMiddleware сжимает ответы brotli или gzip; потоковые
+ответы сжимаются по мере генерации, без сборки тела в памяти.
+
+ConcurrencyLimitMiddleware стоит до сессий и пользователей и отвечает
+503, когда процесс уже обрабатывает NOTES_MAX_CONCURRENT_REQUESTS
+запросов: лишний запрос отклоняется, не дойдя до базы. RateLimitMiddleware
+стоит после AuthenticationMiddleware и отвечает 429, когда у пользователя
+или IP-адреса кончились токены (notes.ratelimit). Оба ответа содержат
+Retry-After, отказы считаются в cache.stats.
+"""
+import contextvars
+import json
+import logging
+import mimetypes
+import os
+import math
+import re
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from http import HTTPStatus
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+from . import ratelimit
+from .asgi import call_in_pool
+from .cache import stats
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger('notes.timing')
+
+_current = contextvars.ContextVar('notes_request_timing', default=None)
+
+
+class RequestTiming:
+    """Замер одного запроса; время в секундах."""
+
+    __slots__ = (
+        'started', 'queries', 'db', 'template', 'render_started'
+    )
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db = 0.0
+        self.template = 0.0
+        self.render_started = None
+
+    def render_finished(self, response):
+        if self.render_started is not None:
+            self.template += time.perf_counter() - self.render_started
+            self.render_started = None
+
+    def header(self, total):
+        return ', '.join((
+            f'db;dur={self.db * 1000:.1f};desc="{self.queries} queries"',
+            f'tpl;dur={self.template * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ))
+
+
+@contextmanager
+def template_timer():
+    """
+    Относит время блока к отрисовке шаблонов текущего запроса.
+
+    Нужен там, где шаблон отрисовывается мимо TemplateResponse:
+    render_to_string во view или render() в потоке пула.
+    """
+    timing = _current.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timing is not None:
+            timing.template += time.perf_counter() - started
+
+
+def record_query(execute, sql, params, many, context):
+    timing = _current.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timing.queries += 1
+        timing.db += time.perf_counter() - started
+
+
+def install_query_recorder(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+connection_created.connect(install_query_recorder)
+
+
+def show_timing(request):
+    """Отдавать ли клиенту заголовок Server-Timing."""
+    if settings.DEBUG or settings.NOTES_SERVER_TIMING_PUBLIC:
+        return True
+    user = getattr(request, 'user', None)
+    return user is not None and user.is_staff
+
+
+class ServerTimingMiddleware(MiddlewareMixin):
+    """
+    Server-Timing и строка журнала с замером каждого запроса.
+
+    Заголовок получают сотрудники и все при DEBUG или
+    NOTES_SERVER_TIMING_PUBLIC, строка журнала пишется всегда.
+    Для потоковых ответов время передачи тела не учитывается.
+    """
+
+    def __init__(self, get_response=None):
+        super().__init__(get_response)
+        # Соединения, открытые до загрузки слоя, не получили сигнал.
+        for connection in connections.all():
+            install_query_recorder(connection)
+
+    def process_request(self, request):
+        request.timing = RequestTiming()
+        _current.set(request.timing)
+
+    def process_template_response(self, request, response):
+        timing = getattr(request, 'timing', None)
+        if timing is not None:
+            timing.render_started = time.perf_counter()
+            response.add_post_render_callback(timing.render_finished)
+        return response
+
+    def process_response(self, request, response):
+        _current.set(None)
+        timing = getattr(request, 'timing', None)
+        if timing is None:
+            return response
+        total = time.perf_counter() - timing.started
+        if show_timing(request):
+            response['Server-Timing'] = timing.header(total)
+        over_budget = timing.queries > settings.NOTES_QUERY_BUDGET
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': timing.queries,
+            'db_ms': round(timing.db * 1000, 1),
+            'template_ms': round(timing.template * 1000, 1),
+            'total_ms': round(total * 1000, 1),
+            'over_budget': over_budget,
+        }
+        logger.log(
+            logging.WARNING if over_budget else logging.INFO,
+            json.dumps(record, ensure_ascii=False),
+            extra={'timing': record},
+        )
+        return response
+
+
+# Суффикс, который ManifestStaticFilesStorage добавляет к имени файла.
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.\w+$')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+# Тип сжатого файла, запрошенного напрямую: mimetypes считает
+# style.css.gz стилями в кодировке gzip, но без Content-Encoding
+# браузер принял бы сжатые байты за CSS.
+ENCODED_TYPES = {'gzip': 'application/gzip'}
+
+
+def static_content_type(path):
+    content_type, encoding = mimetypes.guess_type(path)
+    if encoding:
+        content_type = ENCODED_TYPES.get(encoding)
+    return content_type or 'application/octet-stream'
+
+
+def accepted_encodings(header):
+    """Кодировки из Accept-Encoding, кроме явно запрещённых q=0."""
+    encodings = set()
+    for item in header.split(','):
+        encoding, _, params = item.strip().partition(';')
+        quality = params.strip().partition('=')[2]
+        if quality:
+            try:
+                if float(quality) == 0:
+                    continue
+            except ValueError:
+                continue
+        encodings.add(encoding.strip().lower())
+    return encodings
+
+
+class StaticFilesMiddleware(MiddlewareMixin):
+    """Отдача собранной статики без обращения к представлениям."""
+
+    def process_request(self, request):
+        if (
+            not settings.NOTES_SERVE_STATIC
+            or not settings.STATIC_ROOT
+            or request.method not in ('GET', 'HEAD')
+            or not request.path.startswith(settings.STATIC_URL)
+        ):
+            return None
+        name = request.path[len(settings.STATIC_URL):]
+        try:
+            path = safe_join(settings.STATIC_ROOT, name)
+        except SuspiciousFileOperation:
+            return None
+        if not os.path.isfile(path):
+            return None
+        encoding, served = None, path
+        accepted = accepted_encodings(
+            request.headers.get('Accept-Encoding', '')
+        )
+        for candidate, suffix in PRECOMPRESSED:
+            if candidate in accepted and os.path.isfile(path + suffix):
+                encoding, served = candidate, path + suffix
+                break
+        stat = os.stat(served)
+        if not was_modified_since(
+            request.headers.get('If-Modified-Since'), stat.st_mtime
+        ):
+            return HttpResponseNotModified()
+        response = FileResponse(
+            open(served, 'rb'), content_type=static_content_type(path)
+        )
+        del response['Content-Disposition']
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        response['Vary'] = 'Accept-Encoding'
+        if encoding:
+            response['Content-Encoding'] = encoding
+        if HASHED_NAME.search(name):
+            response['Cache-Control'] = IMMUTABLE
+        else:
+            response['Cache-Control'] = (
+                f'public, max-age={settings.NOTES_STATIC_MAX_AGE}'
+            )
+        return response
+
+
+COMPRESSIBLE_TYPES = (
+    'text/', 'application/json', 'application/x-ndjson',
+    'application/javascript', 'application/xml', 'image/svg+xml',
+)
+
+
+class GzipStream:
+    encoding = 'gzip'
+
+    def __init__(self):
+        self._compressor = zlib.compressobj(
+            settings.NOTES_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS
+        )
+
+    def process(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class BrotliStream:
+    encoding = 'br'
+
+    def __init__(self):
+        self._compressor = brotli.Compressor(
+            quality=settings.NOTES_BROTLI_QUALITY
+        )
+
+    def process(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+def choose_stream(accept_encoding):
+    """Класс сжатия для Accept-Encoding клиента или None."""
+    accepted = accepted_encodings(accept_encoding)
+    if brotli is not None and 'br' in accepted:
+        return BrotliStream
+    if 'gzip' in accepted:
+        return GzipStream
+    return None
+
+
+def compress_chunks(chunks, stream, flush_size):
+    """
+    Сжимает последовательность частей тела.
+
+    Сжатое отдаётся клиенту каждые flush_size исходных байтов,
+    а не после каждой части: генераторы вроде выгрузки заметок
+    отдают части по одной строке, и сброс на каждой из них
+    свёл бы сжатие на нет.
+    """
+    pending = 0
+    for chunk in chunks:
+        data = stream.process(chunk)
+        pending += len(chunk)
+        if pending >= flush_size:
+            data += stream.flush()
+            pending = 0
+        if data:
+            yield data
+    yield stream.finish()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Сжатие текстовых ответов brotli или gzip."""
+
+    def process_response(self, request, response):
+        if (
+            response.has_header('Content-Encoding')
+            or 'no-transform' in response.get('Cache-Control', '')
+            or not response.get('Content-Type', '').startswith(
+                COMPRESSIBLE_TYPES
+            )
+        ):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        stream_class = choose_stream(
+            request.headers.get('Accept-Encoding', '')
+        )
+        if stream_class is None:
+            return response
+        min_size = settings.NOTES_COMPRESS_MIN_SIZE
+        if response.streaming:
+            length = response.get('Content-Length')
+            if length is not None and int(length) < min_size:
+                return response
+            stream = stream_class()
+            response.streaming_content = compress_chunks(
+                response.streaming_content, stream,
+                settings.NOTES_COMPRESS_FLUSH_SIZE,
+            )
+            del response['Content-Length']
+        else:
+            if len(response.content) < min_size:
+                return response
+            stream = stream_class()
+            compressed = stream.process(response.content) + stream.finish()
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+        # Сжатое тело - другое представление: сильный ETag
+        # становится слабым, как в django.middleware.gzip.
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = stream.encoding
+        return response
+
+
+def retry_later(status, retry_after, message):
+    """Отказ с заголовком Retry-After в целых секундах."""
+    response = HttpResponse(
+        message, status=status, content_type='text/plain; charset=utf-8'
+    )
+    response['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+class ConcurrencyLimitMiddleware(MiddlewareMixin):
+    """
+    Ограничение числа запросов, которые процесс обрабатывает одновременно.
+
+    Для потоковых ответов место освобождается до передачи тела.
+    """
+
+    def __init__(self, get_response=None):
+        super().__init__(get_response)
+        self.active = 0
+        self._lock = threading.Lock()
+
+    def process_request(self, request):
+        limit = settings.NOTES_MAX_CONCURRENT_REQUESTS
+        with self._lock:
+            admitted = not limit or self.active < limit
+            if admitted:
+                self.active += 1
+        if admitted:
+            request.admitted = True
+            return None
+        stats.incr('rejected_overload')
+        return retry_later(
+            HTTPStatus.SERVICE_UNAVAILABLE,
+            settings.NOTES_OVERLOAD_RETRY_AFTER,
+            'Сервер перегружен, повторите запрос позже.',
+        )
+
+    def process_response(self, request, response):
+        if getattr(request, 'admitted', False):
+            request.admitted = False
+            with self._lock:
+                self.active -= 1
+        return response
+
+
+class RateLimitMiddleware(MiddlewareMixin):
+    """
+    Корзины токенов на чтение и запись для пользователя или IP.
+
+    Под ASGI проверка, которая загружает сессию и пользователя,
+    выполняется в пуле notes.asgi, а не в общем потоке sync_to_async.
+    """
+
+    async def __acall__(self, request):
+        response = await call_in_pool(self.process_request, request)
+        return response or await self.get_response(request)
+
+    def process_request(self, request):
+        kind, retry_after = ratelimit.check(request)
+        if not retry_after:
+            return None
+        stats.incr(f'rejected_{kind}')
+        return retry_later(
+            HTTPStatus.TOO_MANY_REQUESTS, retry_after,
+            'Слишком много запросов, повторите позже.',
+        )
@@ -0,0 +1,36 @@
+from django.db import migrations
+
+CREATE_SQL = (
+    'CREATE VIRTUAL TABLE IF NOT EXISTS notes_note_fts USING fts5('
+    'title, text, author, '
+    "tokenize = 'unicode61 remove_diacritics 2')"
+)
+FILL_SQL = (
+    'INSERT INTO notes_note_fts (rowid, title, text, author) '
+    "SELECT id, title, text, 'a' || author_id FROM notes_note"
+)
+DROP_SQL = 'DROP TABLE IF EXISTS notes_note_fts'
+
+
+def create_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(CREATE_SQL)
+    schema_editor.execute(FILL_SQL)
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(DROP_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0002_note_author_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
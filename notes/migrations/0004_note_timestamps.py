@@ -0,0 +1,40 @@
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_timestamps(apps, schema_editor):
+    """Существующим заметкам проставляется время миграции."""
+    Note = apps.get_model('notes', 'Note')
+    now = timezone.now()
+    Note.objects.filter(created__isnull=True).update(created=now, updated=now)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0003_note_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='note',
+            name='created',
+            field=models.DateTimeField(null=True, verbose_name='Создана'),
+        ),
+        migrations.AddField(
+            model_name='note',
+            name='updated',
+            field=models.DateTimeField(null=True, verbose_name='Изменена'),
+        ),
+        migrations.RunPython(backfill_timestamps, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='note',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, verbose_name='Создана'),
+        ),
+        migrations.AlterField(
+            model_name='note',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, verbose_name='Изменена'),
+        ),
+    ]
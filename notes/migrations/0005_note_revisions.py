@@ -0,0 +1,32 @@
+# Generated by Django 3.2.15 on 2026-10-18 03:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0004_note_timestamps'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoteRevision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField(verbose_name='Номер')),
+                ('title', models.CharField(max_length=100, verbose_name='Заголовок')),
+                ('base', models.PositiveIntegerField(verbose_name='Снимок')),
+                ('data', models.TextField(verbose_name='Текст или дельта')),
+                ('checksum', models.CharField(max_length=16, verbose_name='Хеш текста')),
+                ('created', models.DateTimeField(verbose_name='Сохранена')),
+                ('note', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='revisions', to='notes.note')),
+            ],
+            options={
+                'constraints': [
+                    models.UniqueConstraint(fields=('note', 'number'), name='revision_note_number_uniq'),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+from django.db import migrations
+
+import notes.fields
+
+
+class Migration(migrations.Migration):
+    """
+    Колонки остаются текстовыми, меняется только класс поля.
+
+    Без SeparateDatabaseAndState SQLite пересоздал бы таблицу заметок
+    целиком. Уже сохранённые тексты сжимает команда compress_notes.
+    """
+
+    dependencies = [
+        ('notes', '0005_note_revisions'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(state_operations=[
+            migrations.AlterField(
+                model_name='note',
+                name='text',
+                field=notes.fields.CompressedTextField(
+                    help_text='Добавьте подробностей', verbose_name='Текст'
+                ),
+            ),
+            migrations.AlterField(
+                model_name='noterevision',
+                name='data',
+                field=notes.fields.CompressedTextField(
+                    verbose_name='Текст или дельта'
+                ),
+            ),
+        ]),
+    ]
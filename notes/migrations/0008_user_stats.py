@@ -0,0 +1,29 @@
+# Generated by Django 3.2.15 on 2026-10-18 04:02
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    """
+    Сводки создаются пустыми; для уже существующих заметок их
+    заполняет команда reconcile_note_stats.
+    """
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('notes', '0007_tags'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='note_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('notes', models.IntegerField(default=0, verbose_name='Заметок')),
+                ('size', models.BigIntegerField(default=0, verbose_name='Символов')),
+                ('last_edited', models.DateTimeField(blank=True, null=True, verbose_name='Последнее изменение')),
+            ],
+        ),
+    ]
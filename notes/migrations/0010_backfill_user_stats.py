@@ -0,0 +1,47 @@
+from django.db import migrations
+
+from notes.fields import unpack
+
+BATCH_SIZE = 500
+
+
+def backfill_user_stats(apps, schema_editor):
+    """
+    Сводки пересчитываются по существующим заметкам: до этой миграции
+    их заполняла только команда reconcile_note_stats.
+    """
+    Note = apps.get_model('notes', 'Note')
+    UserStats = apps.get_model('notes', 'UserStats')
+    totals = {}
+    rows = Note.objects.order_by().values_list(
+        'author_id', 'title', 'text', 'updated'
+    )
+    for author_id, title, text, updated in rows.iterator():
+        row = totals.setdefault(
+            author_id, UserStats(author_id=author_id)
+        )
+        row.notes += 1
+        row.size += len(title) + len(unpack(text))
+        if row.last_edited is None or updated > row.last_edited:
+            row.last_edited = updated
+    existing = set(UserStats.objects.values_list('author_id', flat=True))
+    UserStats.objects.bulk_update(
+        [row for row in totals.values() if row.author_id in existing],
+        ('notes', 'size', 'last_edited'),
+        batch_size=BATCH_SIZE,
+    )
+    UserStats.objects.bulk_create(
+        [row for row in totals.values() if row.author_id not in existing],
+        batch_size=BATCH_SIZE,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0009_jobs'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_user_stats, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,8 @@
 from django.conf import settings
 from django.db import models
 
-from pytils.translit import slugify
+from .fields import CompressedTextField
+from .slugs import save_with_free_slug
 
 
 class Note(models.Model):
@@ -11,7 +12,7 @@ class Note(models.Model):
         default='Название заметки',
         help_text='Дайте короткое название заметке'
     )
-    text = models.TextField(
+    text = CompressedTextField(
         'Текст',
         help_text='Добавьте подробностей'
     )
@@ -26,13 +27,215 @@ class Note(models.Model):
     author = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
+        # Отдельный индекс не нужен: author_id - префикс составных индексов.
+        db_index=False,
+    )
+    created = models.DateTimeField('Создана', auto_now_add=True)
+    updated = models.DateTimeField('Изменена', auto_now=True)
+    tags = models.ManyToManyField(
+        'Tag',
+        through='NoteTag',
+        related_name='notes',
+        blank=True,
+        verbose_name='Теги',
     )
 
+    class Meta:
+        indexes = (
+            # Список заметок пользователя с сортировкой по id.
+            models.Index(
+                fields=('author', 'id'), name='note_author_id_idx'
+            ),
+            # Поиск заметки пользователя по slug.
+            models.Index(
+                fields=('author', 'slug'), name='note_author_slug_idx'
+            ),
+        )
+
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        note = super().from_db(db, field_names, values)
+        # Прочитанные значения: по ним notes.stats считает, на сколько
+        # изменился размер заметки при сохранении.
+        note._loaded_values = dict(zip(field_names, values))
+        return note
+
     def save(self, *args, **kwargs):
-        if not self.slug:
-            max_slug_length = self._meta.get_field('slug').max_length
-            self.slug = slugify(self.title)[:max_slug_length]
-        super().save(*args, **kwargs)
+        if self.slug:
+            super().save(*args, **kwargs)
+            return
+        save_with_free_slug(
+            self, lambda: super(Note, self).save(*args, **kwargs)
+        )
+
+
+class Tag(models.Model):
+    """Тег; одно имя - одна строка для всех пользователей."""
+    name = models.CharField('Название', max_length=50, unique=True)
+
+    def __str__(self):
+        return self.name
+
+
+class NoteTag(models.Model):
+    """Связь заметки с тегом."""
+    note = models.ForeignKey(
+        Note,
+        on_delete=models.CASCADE,
+        # note_id - префикс уникального ограничения (note, tag).
+        db_index=False,
+    )
+    tag = models.ForeignKey(
+        Tag,
+        on_delete=models.CASCADE,
+        # tag_id - префикс индекса (tag, note).
+        db_index=False,
+    )
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('note', 'tag'), name='notetag_note_tag_uniq'
+            ),
+        )
+        indexes = (
+            # Заметки с тегом в порядке id - фильтр списка по тегу.
+            models.Index(fields=('tag', 'note'), name='notetag_tag_note_idx'),
+        )
+
+    def __str__(self):
+        return f'{self.note_id}:{self.tag_id}'
+
+
+class TagCount(models.Model):
+    """
+    Сколько заметок пользователя отмечено тегом.
+
+    Счётчики меняются вместе с тегами заметок, поэтому облако тегов
+    читается из этой таблицы без подсчёта по заметкам.
+    """
+    author = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        # author_id - префикс уникального ограничения (author, tag).
+        db_index=False,
+    )
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE)
+    count = models.IntegerField('Заметок', default=0)
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('author', 'tag'), name='tagcount_author_tag_uniq'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.author_id}:{self.tag_id}={self.count}'
+
+
+class UserStats(models.Model):
+    """
+    Сводка по заметкам пользователя для шапки страницы.
+
+    Меняется на разницу при каждом изменении заметок (notes.stats);
+    заметки, созданные до появления сводок, учитывает миграция 0010,
+    пересчитать с нуля - команда reconcile_note_stats.
+    """
+    author = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='note_stats',
+    )
+    notes = models.IntegerField('Заметок', default=0)
+    size = models.BigIntegerField('Символов', default=0)
+    last_edited = models.DateTimeField(
+        'Последнее изменение', null=True, blank=True
+    )
+
+    def __str__(self):
+        return f'{self.author_id}: {self.notes}'
+
+
+class NoteRevision(models.Model):
+    """Версия заметки: полный текст или дельта от предыдущей версии."""
+    note = models.ForeignKey(
+        Note,
+        on_delete=models.CASCADE,
+        related_name='revisions',
+        # note_id - префикс уникального ограничения (note, number).
+        db_index=False,
+    )
+    number = models.PositiveIntegerField('Номер')
+    title = models.CharField('Заголовок', max_length=100)
+    # Номер снимка, от которого восстанавливается эта версия;
+    # у самого снимка совпадает с number.
+    base = models.PositiveIntegerField('Снимок')
+    data = CompressedTextField('Текст или дельта')
+    # Хеш полного текста версии: по нему видно, что заметку изменили
+    # в обход истории.
+    checksum = models.CharField('Хеш текста', max_length=16)
+    created = models.DateTimeField('Сохранена')
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('note', 'number'), name='revision_note_number_uniq'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.note_id}#{self.number}'
+
+    @property
+    def is_snapshot(self):
+        return self.base == self.number
+
+
+class Job(models.Model):
+    """Фоновая задача в очереди notes.jobs."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    DONE = 'done'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (FAILED, 'Ошибка'),
+        (DONE, 'Выполнена'),
+    )
+
+    name = models.CharField('Задача', max_length=100)
+    args = models.JSONField('Аргументы', default=dict)
+    status = models.CharField(
+        'Состояние', max_length=10, choices=STATUSES, default=QUEUED
+    )
+    # Чем больше, тем раньше задача будет выполнена.
+    priority = models.SmallIntegerField('Приоритет', default=0)
+    run_at = models.DateTimeField('Не раньше')
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveSmallIntegerField('Максимум попыток')
+    timeout = models.PositiveIntegerField('Таймаут, с')
+    # Метка выборки, которой задачу взял обработчик, и время начала:
+    # задачу, не завершённую за timeout, возвращают в очередь.
+    locked_by = models.CharField('Обработчик', max_length=64, blank=True)
+    started = models.DateTimeField('Начата', null=True, blank=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created = models.DateTimeField('Создана', auto_now_add=True)
+    finished = models.DateTimeField('Завершена', null=True, blank=True)
+
+    class Meta:
+        indexes = (
+            # Выбор следующих задач: состояние, приоритет, время.
+            models.Index(
+                fields=('status', '-priority', 'run_at'),
+                name='job_queue_idx',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.name}#{self.pk}'
@@ -0,0 +1,155 @@
+from django.conf import settings
+from django.core.paginator import InvalidPage, Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+# Наибольшее значение BigAutoField; больший курсор не передать в базу.
+MAX_CURSOR = 2 ** 63 - 1
+
+
+class KeysetPage:
+    """Страница, полученная по курсору."""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<KeysetPage of {len(self.object_list)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Постраничный вывод по курсору (keyset pagination).
+
+    Вместо OFFSET страница выбирается условием ``id > after``
+    или ``id < before`` с устойчивой сортировкой по ``id``,
+    поэтому стоимость запроса не зависит от номера страницы
+    и от общего количества записей.
+    """
+
+    def __init__(self, object_list, per_page, key='id', **kwargs):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.key = key
+
+    def validate_cursor(self, cursor):
+        """Курсор - это значение ключа, положительное целое число."""
+        try:
+            cursor = int(cursor)
+        except (TypeError, ValueError):
+            raise InvalidPage('Курсор должен быть целым числом')
+        if cursor < 0:
+            raise InvalidPage('Курсор не может быть отрицательным')
+        if cursor > MAX_CURSOR:
+            raise InvalidPage('Курсор слишком велик')
+        return cursor
+
+    def page(self, after=None, before=None):
+        """Возвращает страницу после курсора after или перед before."""
+        if before is not None:
+            return self._page_before(self.validate_cursor(before))
+        if after is not None:
+            after = self.validate_cursor(after)
+        return self._page_after(after)
+
+    def _page_after(self, after):
+        queryset = self.object_list.order_by(self.key)
+        if after is not None:
+            queryset = queryset.filter(**{f'{self.key}__gt': after})
+        # Одна лишняя запись показывает, есть ли следующая страница.
+        objects = list(queryset[:self.per_page + 1])
+        next_cursor = None
+        if len(objects) > self.per_page:
+            objects = objects[:self.per_page]
+            next_cursor = getattr(objects[-1], self.key)
+        previous_cursor = None
+        if after is not None:
+            previous_cursor = (
+                getattr(objects[0], self.key) if objects
+                else min(after + 1, MAX_CURSOR)
+            )
+        return KeysetPage(objects, next_cursor, previous_cursor)
+
+    def _page_before(self, before):
+        queryset = self.object_list.filter(
+            **{f'{self.key}__lt': before}
+        ).order_by(f'-{self.key}')
+        objects = list(queryset[:self.per_page + 1])
+        previous_cursor = None
+        if len(objects) > self.per_page:
+            objects = objects[:self.per_page]
+            previous_cursor = getattr(objects[-1], self.key)
+        objects.reverse()
+        next_cursor = (
+            getattr(objects[-1], self.key) if objects else before - 1
+        )
+        return KeysetPage(objects, next_cursor, previous_cursor)
+
+
+def estimate_count(queryset):
+    """
+    Примерное число строк в таблице queryset без COUNT(*).
+
+    В PostgreSQL - по статистике pg_class.reltuples (None, если
+    таблицу ещё не анализировали), в других СУБД - по разнице
+    наибольшего и наименьшего pk: обе границы читаются по индексу
+    первичного ключа, удалённые строки оценку завышают.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                [connection.ops.quote_name(queryset.model._meta.db_table)],
+            )
+            row = cursor.fetchone()
+        return int(row[0]) if row and row[0] >= 0 else None
+    # Два запроса: SQLite читает MIN и MAX по индексу, только когда
+    # в запросе одна такая функция.
+    keys = queryset.model._default_manager.using(queryset.db).values_list(
+        'pk', flat=True
+    )
+    low = keys.order_by('pk').first()
+    if low is None:
+        return 0
+    return keys.order_by('-pk').first() - low + 1
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator для больших таблиц, который не считает все строки.
+
+    Число строк запроса без условий оценивается estimate_count();
+    если оценка не больше NOTES_ADMIN_COUNT_LIMIT, оно считается
+    точно. Запрос с условиями считается не дальше этой границы
+    плюс одна строка: страницы за ней недоступны, и условие
+    нужно уточнить.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        limit = settings.NOTES_ADMIN_COUNT_LIMIT
+        if queryset.query.where:
+            return queryset[:limit + 1].count()
+        estimate = estimate_count(queryset)
+        if estimate is None or estimate <= limit:
+            return queryset.count()
+        return estimate
@@ -0,0 +1,93 @@
+"""
+Ограничение частоты запросов корзинами токенов.
+
+У каждого пользователя - а у анонимных клиентов у каждого IP-адреса -
+две корзины: для чтения (GET, HEAD, OPTIONS) и для записи. Корзина
+вмещает capacity токенов и пополняется на rate токенов в секунду;
+запрос забирает один токен, а при пустой корзине отклоняется
+с указанием, через сколько секунд появится следующий токен.
+
+Состояние корзины - пара (токены, время) в кэше NOTES_CACHE_ALIAS;
+запись живёт, пока корзина не наполнится снова, после этого она
+не нужна. В кэше нет сравнения с обменом, поэтому одновременные
+запросы из разных процессов могут потратить один токен дважды:
+превышение ограничено числом процессов, а запросы одного процесса
+берут токены под общей блокировкой.
+"""
+import math
+import threading
+import time
+
+from django.conf import settings
+
+from .cache import get_cache
+
+READ_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS'))
+
+_lock = threading.Lock()
+
+
+def request_kind(request):
+    return 'read' if request.method in READ_METHODS else 'write'
+
+
+def client_ip(request):
+    """
+    IP-адрес клиента.
+
+    За NOTES_RATE_LIMIT_PROXIES доверенными прокси адрес берётся
+    из X-Forwarded-For: каждый прокси дописывает адрес справа,
+    поэтому левее доверенных записей стоит адрес клиента.
+    """
+    proxies = settings.NOTES_RATE_LIMIT_PROXIES
+    if proxies:
+        forwarded = [
+            address.strip() for address in
+            request.headers.get('X-Forwarded-For', '').split(',')
+            if address.strip()
+        ]
+        if len(forwarded) >= proxies:
+            return forwarded[-proxies]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def client_key(request):
+    """Чьи корзины тратит запрос: пользователя или IP-адреса."""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f'user:{user.pk}'
+    return f'ip:{client_ip(request)}'
+
+
+def take(key, capacity, rate):
+    """
+    Забирает токен из корзины key.
+
+    Возвращает 0, если токен был, иначе - сколько секунд ждать
+    следующего.
+    """
+    cache = get_cache()
+    key = f'notes:rate:{key}'
+    with _lock:
+        now = time.time()
+        state = cache.get(key)
+        tokens, updated = state if state is not None else (capacity, now)
+        tokens = min(capacity, tokens + max(now - updated, 0) * rate)
+        if tokens < 1:
+            return (1 - tokens) / rate
+        cache.set(key, (tokens - 1, now), math.ceil(capacity / rate))
+    return 0
+
+
+def check(request):
+    """
+    Вид запроса и пауза до следующей попытки или 0.
+
+    Вид без записи в NOTES_RATE_LIMITS не ограничивается.
+    """
+    kind = request_kind(request)
+    limit = settings.NOTES_RATE_LIMITS.get(kind)
+    if not limit:
+        return kind, 0
+    capacity, rate = limit
+    return kind, take(f'{kind}:{client_key(request)}', capacity, rate)
@@ -0,0 +1,158 @@
+"""
+История изменений заметок.
+
+Каждая версия хранится строкой NoteRevision. Обычная ревизия содержит
+дельту по словам от предыдущей версии, каждая
+NOTES_REVISION_SNAPSHOT_EVERY-я - полный текст (снимок). Чтобы
+восстановить любую версию, достаточно одним запросом прочитать
+ближайший снимок и не больше NOTES_REVISION_SNAPSHOT_EVERY - 1 дельт
+после него.
+
+Дельта - JSON-список операций над словами предыдущей версии (слово
+берётся вместе с пробелами после него): положительное число -
+скопировать столько слов, отрицательное - пропустить столько слов,
+строка - вставить её как есть. Заметки чаще всего - один-два абзаца,
+и построчная дельта хранила бы абзац целиком из-за одной правки.
+
+Ревизия хранит номер своего снимка (base) и хеш полного текста,
+поэтому для записи новой достаточно прочитать последнюю. Если заметку
+изменили в обход истории (пакетным API, импортом), хеш её текста
+не совпадёт с хешем последней ревизии, и перед новой версией
+сохраняется снимок прежней: дельты всегда строятся от той версии,
+на которую указывает цепочка.
+"""
+import hashlib
+import json
+import re
+from difflib import SequenceMatcher
+
+from django.conf import settings
+from django.db.models import Subquery
+
+from .fields import unpack
+from .models import NoteRevision
+
+# Слово с пробелами после него; пробелы в начале текста - отдельно.
+_TOKEN = re.compile(r'\s+|\S+\s*')
+
+
+def checksum(text):
+    return hashlib.blake2b(text.encode(), digest_size=8).hexdigest()
+
+
+def make_delta(old, new):
+    """Дельта, превращающая текст old в new."""
+    old_words = _TOKEN.findall(old)
+    new_words = _TOKEN.findall(new)
+    # Правка обычно затрагивает одно место: общие начало и конец
+    # отрезаются сразу, и SequenceMatcher сравнивает только середину.
+    limit = min(len(old_words), len(new_words))
+    prefix = 0
+    while prefix < limit and old_words[prefix] == new_words[prefix]:
+        prefix += 1
+    suffix = 0
+    while (suffix < limit - prefix
+           and old_words[-1 - suffix] == new_words[-1 - suffix]):
+        suffix += 1
+    old_middle = old_words[prefix:len(old_words) - suffix]
+    new_middle = new_words[prefix:len(new_words) - suffix]
+    delta = [prefix]
+    matcher = SequenceMatcher(None, old_middle, new_middle)
+    for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+        if tag == 'equal':
+            delta.append(old_end - old_start)
+            continue
+        if old_end > old_start:
+            delta.append(old_start - old_end)
+        if new_end > new_start:
+            delta.append(''.join(new_middle[new_start:new_end]))
+    delta.append(suffix)
+    return json.dumps(
+        [operation for operation in delta if operation != 0],
+        ensure_ascii=False, separators=(',', ':'),
+    )
+
+
+def _apply(words, delta):
+    """Слова текста после применения дельты к словам words."""
+    position = 0
+    result = []
+    for operation in json.loads(delta):
+        if isinstance(operation, str):
+            result.extend(_TOKEN.findall(operation))
+        elif operation > 0:
+            result.extend(words[position:position + operation])
+            position += operation
+        else:
+            position -= operation
+    return result
+
+
+def apply_delta(old, delta):
+    """Текст, полученный применением дельты к old."""
+    return ''.join(_apply(_TOKEN.findall(old), delta))
+
+
+def record_revision(note, previous_title, previous_text, previous_updated):
+    """
+    Записывает ревизию для только что сохранённой заметки.
+
+    previous_* - заголовок, текст и время изменения заметки до
+    сохранения. Заголовок без изменения текста тоже даёт ревизию,
+    а сохранение без изменений - нет. Вызывать в той же транзакции,
+    в которой заметка заблокирована и сохранена: иначе параллельная
+    правка может вклиниться между версией, от которой строится
+    дельта, и записью.
+    """
+    if note.title == previous_title and note.text == previous_text:
+        return None
+    last = NoteRevision.objects.filter(note=note).order_by(
+        '-number'
+    ).values_list('number', 'base', 'checksum').first()
+    number, base, last_checksum = last or (0, 0, None)
+    previous_checksum = checksum(previous_text)
+    revisions = []
+    if last_checksum != previous_checksum:
+        number += 1
+        base = number
+        revisions.append(NoteRevision(
+            note=note, number=number, base=base, title=previous_title,
+            data=previous_text, checksum=previous_checksum,
+            created=previous_updated,
+        ))
+    number += 1
+    revision = NoteRevision(
+        note=note, number=number, base=number, title=note.title,
+        data=note.text, checksum=checksum(note.text), created=note.updated,
+    )
+    if number - base < settings.NOTES_REVISION_SNAPSHOT_EVERY:
+        delta = make_delta(previous_text, note.text)
+        # Дельта полностью переписанного текста длиннее самого текста.
+        if len(delta) < len(note.text):
+            revision.base, revision.data = base, delta
+    revisions.append(revision)
+    NoteRevision.objects.bulk_create(revisions)
+    return revision
+
+
+def rebuild(note, number):
+    """
+    Заголовок и текст версии number одним запросом.
+
+    Возбуждает NoteRevision.DoesNotExist, если такой ревизии нет.
+    """
+    base = NoteRevision.objects.filter(note=note, number=number).values(
+        'base'
+    )
+    rows = NoteRevision.objects.filter(
+        note=note, number__lte=number, number__gte=Subquery(base)
+    ).order_by('number').values_list('number', 'base', 'title', 'data')
+    words = None
+    for row_number, row_base, title, data in rows:
+        words = (
+            _TOKEN.findall(unpack(data)) if row_base == row_number
+            else _apply(words, unpack(data))
+        )
+    if words is None:
+        raise NoteRevision.DoesNotExist(f'Нет ревизии {number}')
+    return title, ''.join(words)
@@ -0,0 +1,223 @@
+"""
+Полнотекстовый поиск по заметкам на основе SQLite FTS5.
+
+Индекс хранится в виртуальной таблице ``notes_note_fts``: rowid строки
+совпадает с id заметки, а колонка ``author`` содержит токен автора,
+поэтому ограничение поиска заметками пользователя выполняет сам индекс.
+"""
+import re
+from dataclasses import dataclass
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .fields import unpack
+from .models import Note
+
+FTS_TABLE = 'notes_note_fts'
+# Вес совпадений в заголовке, тексте и токене автора для bm25().
+RANK_WEIGHTS = (10.0, 1.0, 0.0)
+SNIPPET_TOKENS = 16
+RESULTS_LIMIT = 50
+
+# Управляющие символы, которыми FTS5 отмечает совпадения;
+# после экранирования текста они заменяются на <mark>.
+_MARK_START = '\x02'
+_MARK_END = '\x03'
+_WORD = re.compile(r'\w+')
+
+
+@dataclass
+class SearchResult:
+    note: object
+    title: str
+    snippet: str
+
+
+def is_available():
+    """Индекс FTS5 есть только в SQLite."""
+    return connection.vendor == 'sqlite'
+
+
+def author_token(author_id):
+    return f'a{author_id}'
+
+
+def build_match(query):
+    """
+    Превращает пользовательский запрос в выражение MATCH.
+
+    Каждое слово берётся в кавычки, поэтому операторы FTS5
+    в запросе не интерпретируются; слова объединяются через AND.
+    """
+    return ' '.join(f'"{word}"' for word in _WORD.findall(query))
+
+
+def _render(fragment):
+    """Экранирует фрагмент и заменяет маркеры FTS5 на <mark>."""
+    return mark_safe(
+        escape(fragment)
+        .replace(_MARK_START, '<mark>')
+        .replace(_MARK_END, '</mark>')
+    )
+
+
+def _clean(value):
+    return value.replace(_MARK_START, '').replace(_MARK_END, '')
+
+
+def index_notes(rows):
+    """
+    Добавляет или обновляет строки (id, title, text, author_id).
+
+    Текст может быть сжатым значением из values_list().
+    """
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT OR REPLACE INTO {FTS_TABLE} '
+            '(rowid, title, text, author) VALUES (%s, %s, %s, %s)',
+            [
+                (pk, _clean(title), _clean(unpack(text)),
+                 author_token(author_id))
+                for pk, title, text, author_id in rows
+            ],
+        )
+
+
+def index_note(note):
+    index_notes([(note.pk, note.title, note.text, note.author_id)])
+
+
+def unindex_notes(note_ids):
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+            [(pk,) for pk in note_ids],
+        )
+
+
+def refresh_notes(saved_ids=(), deleted_ids=()):
+    """
+    Обновляет индекс для заметок по id: задача notes.jobs.
+
+    Заметки читаются из базы при выполнении, поэтому повтор задачи
+    или правка между постановкой и выполнением индексируют актуальный
+    текст; удалённые к этому времени заметки пропускаются.
+    """
+    if deleted_ids:
+        unindex_notes(deleted_ids)
+    if saved_ids:
+        index_notes(
+            Note.objects.filter(id__in=saved_ids).values_list(
+                'id', 'title', 'text', 'author_id'
+            )
+        )
+
+
+def rebuild_index(queryset, batch_size=1000, progress=None):
+    """
+    Перестраивает индекс по queryset порциями по batch_size заметок.
+
+    Заметки выбираются по возрастанию id с курсором по последнему id,
+    каждая порция записывается в своей транзакции.
+    Возвращает количество проиндексированных заметок.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+    rows = queryset.order_by('id').values_list(
+        'id', 'title', 'text', 'author_id'
+    )
+    last_id = 0
+    total = 0
+    while True:
+        batch = list(rows.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            break
+        with transaction.atomic():
+            index_notes(batch)
+        last_id = batch[-1][0]
+        total += len(batch)
+        if progress is not None:
+            progress(total)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')"
+        )
+    return total
+
+
+def search_notes(queryset, author_id, query, limit=RESULTS_LIMIT):
+    """
+    Ищет заметки автора по словам запроса.
+
+    queryset должен быть уже ограничен заметками автора;
+    результаты упорядочены по bm25, заголовок и фрагмент текста
+    возвращаются с подсветкой совпадений.
+    """
+    match = build_match(query)
+    if not match:
+        return []
+    if not is_available():
+        return _search_fallback(queryset, query, limit)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid, '
+            f'highlight({FTS_TABLE}, 0, %s, %s), '
+            f'snippet({FTS_TABLE}, 1, %s, %s, %s, %s) '
+            f'FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s '
+            f'ORDER BY bm25({FTS_TABLE}, %s, %s, %s) '
+            f'LIMIT %s',
+            (
+                _MARK_START, _MARK_END,
+                _MARK_START, _MARK_END, '…', SNIPPET_TOKENS,
+                f'author : {author_token(author_id)} '
+                f'AND {{title text}} : ({match})',
+                *RANK_WEIGHTS,
+                limit,
+            ),
+        )
+        rows = cursor.fetchall()
+    notes = queryset.only('id', 'slug', 'title').in_bulk(
+        [pk for pk, _, _ in rows]
+    )
+    return [
+        SearchResult(notes[pk], _render(title), _render(snippet))
+        for pk, title, snippet in rows
+        if pk in notes
+    ]
+
+
+def matching_ids(query):
+    """
+    Подзапрос id заметок всех авторов со всеми словами запроса.
+
+    Слова ищутся только в заголовке и тексте. Для filter(pk__in=...);
+    без FTS5 или без слов в запросе - None.
+    """
+    match = build_match(query)
+    if not match or not is_available():
+        return None
+    return RawSQL(
+        f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+        (f'{{title text}} : ({match})',),
+    )
+
+
+def _search_fallback(queryset, query, limit):
+    """Поиск без FTS5 для других СУБД: все слова в заголовке или тексте."""
+    for word in _WORD.findall(query):
+        queryset = queryset.filter(
+            Q(title__icontains=word) | Q(text__icontains=word)
+        )
+    return [
+        SearchResult(note, escape(note.title), escape(note.text[:200]))
+        for note in queryset.order_by('-id')[:limit]
+    ]
@@ -0,0 +1,108 @@
+from django.conf import settings
+from django.contrib.auth.signals import user_logged_out
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from . import cache, jobs, search, stats, tags
+from .models import Note
+
+SEARCH_FIELDS = frozenset(('title', 'text', 'author'))
+
+# Массовые операции (bulk_create, bulk_update, QuerySet.delete без
+# загрузки объектов) не вызывают post_save и post_delete; вместо этого
+# они отправляют этот сигнал с аргументами author_ids, saved_ids
+# и deleted_ids.
+notes_bulk_changed = Signal()
+
+
+@receiver(post_save, sender=Note)
+def index_saved_note(sender, instance, update_fields=None, **kwargs):
+    """Обновляет поисковый индекс после сохранения заметки."""
+    if update_fields is not None and not SEARCH_FIELDS & set(update_fields):
+        return
+    search.index_note(instance)
+
+
+@receiver(post_delete, sender=Note)
+def unindex_deleted_note(sender, instance, **kwargs):
+    """Удаляет заметку из поискового индекса."""
+    search.unindex_notes([instance.pk])
+
+
+@receiver(post_save, sender=Note)
+def count_saved_note(sender, instance, created, **kwargs):
+    """Добавляет к сводке автора новую заметку или разницу в размере."""
+    stats.record(
+        instance.author_id,
+        notes=1 if created else 0,
+        size=stats.size_change(instance),
+        edited=instance.updated,
+    )
+
+
+@receiver(post_delete, sender=Note)
+def uncount_deleted_note(sender, instance, **kwargs):
+    stats.record(
+        instance.author_id,
+        notes=-1,
+        size=-stats.current_size(instance),
+        edited=timezone.now(),
+    )
+
+
+@receiver(pre_delete, sender=Note)
+def uncount_note_tags(sender, instance, **kwargs):
+    """Уменьшает счётчики тегов, пока связи заметки ещё не удалены."""
+    tags.forget_notes(instance.author_id, [instance.pk])
+
+
+def invalidate_notes_list(author_id):
+    """
+    Сбрасывает кэш списка заметок автора.
+
+    Внутри транзакции версия увеличивается ещё раз после фиксации:
+    иначе параллельный запрос мог бы закэшировать под новой версией
+    ещё не изменённые данные.
+    """
+    cache.bump_list_version(author_id)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: cache.bump_list_version(author_id))
+
+
+@receiver(post_save, sender=Note)
+@receiver(post_delete, sender=Note)
+def invalidate_list_cache(sender, instance, **kwargs):
+    invalidate_notes_list(instance.author_id)
+
+
+@receiver(notes_bulk_changed)
+def sync_bulk_changes(sender, author_ids=(), saved_ids=(), deleted_ids=(),
+                      **kwargs):
+    """
+    Обновляет индекс и кэш списка после массовой операции.
+
+    Индекс для большого числа заметок обновляется фоновой задачей.
+    """
+    if saved_ids or deleted_ids:
+        jobs.enqueue(
+            'notes.search.refresh_notes',
+            saved_ids=list(saved_ids),
+            deleted_ids=list(deleted_ids),
+        )
+    for author_id in set(author_ids):
+        invalidate_notes_list(author_id)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """Удаляет пользователя из кэша после изменения или удаления."""
+    cache.delete_user(instance.pk)
+
+
+@receiver(user_logged_out)
+def forget_logged_out_user(sender, user, **kwargs):
+    if user is not None:
+        cache.delete_user(user.pk)
@@ -0,0 +1,129 @@
+"""
+Выбор свободного slug для заметки.
+
+Если slug не указан, он строится из заголовка; при совпадении
+добавляется первый свободный суффикс: title, title-2, title-3...
+Занятые варианты выбираются одним запросом по префиксу,
+а гонку с параллельной записью разрешает повтор в точке сохранения.
+"""
+import random
+
+from django.db import IntegrityError, transaction
+from pytils.translit import slugify
+
+DEFAULT_SLUG = 'note'
+# Запас длины под суффикс вида -123456789.
+SUFFIX_RESERVE = 10
+SAVE_ATTEMPTS = 10
+
+
+def base_slug(title, max_length):
+    return slugify(title)[:max_length] or DEFAULT_SLUG
+
+
+def slug_prefix(base, max_length):
+    """Общий префикс всех вариантов slug с суффиксами."""
+    return base[:max(max_length - SUFFIX_RESERVE, 1)]
+
+
+def next_free_slug(base, taken, max_length, skip=0):
+    """
+    Первый вариант base, base-2, base-3..., которого нет в taken.
+
+    skip пропускает столько свободных вариантов: при повторных
+    попытках это разводит параллельные запросы по разным суффиксам.
+    """
+    candidate = base
+    number = 1
+    while True:
+        if candidate not in taken:
+            if not skip:
+                return candidate
+            skip -= 1
+        number += 1
+        suffix = f'-{number}'
+        candidate = base[:max_length - len(suffix)] + suffix
+
+
+def taken_slugs(queryset, prefix):
+    """
+    Занятые slug с заданным префиксом.
+
+    Диапазонное условие, в отличие от LIKE, использует
+    уникальный индекс по slug.
+    """
+    return set(
+        queryset.filter(
+            slug__gte=prefix, slug__lt=prefix + '\uffff'
+        ).values_list('slug', flat=True)
+    )
+
+
+def save_with_free_slug(note, save, attempts=SAVE_ATTEMPTS):
+    """
+    Назначает заметке свободный slug и сохраняет её вызовом save().
+
+    Если параллельный запрос успел занять выбранный slug,
+    сохранение в точке сохранения откатывается, список занятых
+    вариантов перечитывается и попытка повторяется.
+    """
+    max_length = note._meta.get_field('slug').max_length
+    base = base_slug(note.title, max_length)
+    queryset = type(note)._default_manager.all()
+    if note.pk is not None:
+        queryset = queryset.exclude(pk=note.pk)
+    prefix = slug_prefix(base, max_length)
+    taken = taken_slugs(queryset, prefix)
+    for attempt in range(attempts):
+        note.slug = next_free_slug(
+            base, taken, max_length, skip=random.randrange(attempt + 1)
+        )
+        try:
+            with transaction.atomic():
+                save()
+            return
+        except IntegrityError:
+            if attempt == attempts - 1:
+                note.slug = ''
+                raise
+            taken = taken_slugs(queryset, prefix) | {note.slug}
+
+
+class SlugPlanner:
+    """
+    Назначает свободные slug пачкам новых заметок без их сохранения.
+
+    На пачку уходит один запрос по точным совпадениям и по одному
+    запросу по префиксу на каждую совпавшую основу. Уже выданные
+    slug запоминаются, поэтому совпадения внутри импорта тоже
+    получают суффиксы.
+    """
+
+    def __init__(self, queryset, max_length):
+        self.queryset = queryset
+        self.max_length = max_length
+        self.taken = set()
+        self._checked = set()
+        self._loaded = set()
+
+    def plan(self, bases):
+        """Возвращает список свободных slug для списка основ."""
+        unknown = set(bases) - self._checked
+        if unknown:
+            self.taken |= set(
+                self.queryset.filter(
+                    slug__in=unknown
+                ).values_list('slug', flat=True)
+            )
+            self._checked |= unknown
+        slugs = []
+        for base in bases:
+            if base in self.taken and base not in self._loaded:
+                self.taken |= taken_slugs(
+                    self.queryset, slug_prefix(base, self.max_length)
+                )
+                self._loaded.add(base)
+            slug = next_free_slug(base, self.taken, self.max_length)
+            self.taken.add(slug)
+            slugs.append(slug)
+        return slugs
@@ -0,0 +1,199 @@
+"""
+Сводка по заметкам пользователя: количество, размер и время изменения.
+
+Строка UserStats меняется одним UPDATE с F()-выражениями на разницу,
+которую внёс каждый create, update или delete, поэтому шапке страницы
+не нужен подсчёт по таблице заметок. Размер заметки - число символов
+заголовка и текста; прежний размер берётся из значений, прочитанных
+из базы (Note.from_db), и сжатый текст, который не менялся,
+не распаковывается.
+
+Сводка читается через кэш NOTES_CACHE_ALIAS: запись удаляется при
+каждом изменении, и страница стоит не больше одного поиска по
+первичному ключу.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Case, Count, F, Max, Sum, Value, When
+from django.db.models.functions import Length
+from django.utils import timezone
+
+from .cache import get_cache
+from .fields import PREFIX, unpack
+from .models import Note, UserStats
+
+FIELDS = ('notes', 'size', 'last_edited')
+
+
+def current_size(note):
+    """Размер заметки по уже загруженным полям, без запросов к базе."""
+    return sum(
+        len(unpack(note.__dict__[name])) for name in ('title', 'text')
+        if name in note.__dict__
+    )
+
+
+def size_change(note):
+    """
+    На сколько символов изменилась заметка с последнего чтения.
+
+    Без прочитанных значений (новая заметка) - её полный размер.
+    Запоминает текущие значения, чтобы повторное сохранение
+    не учло ту же разницу ещё раз.
+    """
+    current = note.__dict__
+    loaded = dict(getattr(note, '_loaded_values', {}))
+    change = 0
+    for name in ('title', 'text'):
+        # Отложенное поле не читалось и не менялось.
+        if name not in current or current[name] is loaded.get(name):
+            continue
+        change += len(unpack(current[name]))
+        if name in loaded:
+            change -= len(unpack(loaded[name]))
+        loaded[name] = current[name]
+    note._loaded_values = loaded
+    return change
+
+
+def _key(author_id):
+    return f'notes:note_stats:{author_id}'
+
+
+def forget(author_id):
+    """Удаляет сводку из кэша, в транзакции - ещё раз после фиксации."""
+    cache = get_cache()
+    cache.delete(_key(author_id))
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: cache.delete(_key(author_id)))
+
+
+def record(author_id, notes=0, size=0, edited=None):
+    """
+    Добавляет к сводке автора notes заметок и size символов.
+
+    Строка создаётся при первой новой заметке; если строки нет,
+    а заметки удаляются или меняются, сводку восстановит
+    reconcile_note_stats.
+    """
+    values = {'notes': F('notes') + notes, 'size': F('size') + size}
+    if edited is not None:
+        values['last_edited'] = edited
+    updated = UserStats.objects.filter(author_id=author_id).update(**values)
+    if not updated and notes > 0:
+        UserStats.objects.bulk_create(
+            [UserStats(author_id=author_id)], ignore_conflicts=True
+        )
+        UserStats.objects.filter(author_id=author_id).update(**values)
+    forget(author_id)
+
+
+def record_created(notes):
+    """Добавляет к сводкам авторов заметки, созданные bulk_create."""
+    totals = defaultdict(lambda: [0, 0])
+    for note in notes:
+        totals[note.author_id][0] += 1
+        totals[note.author_id][1] += size_change(note)
+    edited = timezone.now()
+    for author_id, (count, size) in totals.items():
+        record(author_id, notes=count, size=size, edited=edited)
+
+
+def get_stats(author_id):
+    """Сводка автора из кэша или из базы; без строки - нулевая."""
+    cache = get_cache()
+    key = _key(author_id)
+    stats = cache.get(key)
+    if stats is None:
+        stats = UserStats.objects.filter(author_id=author_id).first()
+        if stats is None:
+            stats = UserStats(author_id=author_id)
+        cache.set(key, stats, settings.NOTES_STATS_CACHE_TIMEOUT)
+    return stats
+
+
+def count_notes(notes):
+    """Сводки по авторам, посчитанные по заметкам queryset notes."""
+    rows = notes.values('author_id').annotate(
+        count=Count('id'),
+        edited=Max('updated'),
+        # Сжатые тексты считаются ниже, после распаковки.
+        size=Sum(Length('title')) + Sum(Case(
+            When(text__startswith=PREFIX, then=Value(0)),
+            default=Length('text'),
+        )),
+    ).order_by()
+    result = {
+        row['author_id']: UserStats(
+            author_id=row['author_id'], notes=row['count'],
+            size=row['size'], last_edited=row['edited'],
+        )
+        for row in rows
+    }
+    packed = notes.filter(text__startswith=PREFIX).values_list(
+        'author_id', 'text'
+    )
+    for author_id, text in packed.iterator():
+        result[author_id].size += len(unpack(text))
+    return result
+
+
+def reconcile(batch_size=500, progress=None):
+    """
+    Пересчитывает сводки всех пользователей порциями по batch_size.
+
+    Каждая порция - одна транзакция: строки сводок блокируются до
+    подсчёта, поэтому изменение заметки, которое не попало в подсчёт,
+    прибавит свою разницу уже после записи. Время изменения не
+    уменьшается: удаления в заметках не видны. Возвращает число
+    пользователей и исправленных сводок.
+    """
+    users = get_user_model().objects.order_by('pk').values_list(
+        'pk', flat=True
+    )
+    total = fixed = 0
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            author_ids = list(users.filter(pk__gt=last_pk)[:batch_size])
+            if not author_ids:
+                break
+            existing = {
+                row.author_id: row for row in
+                UserStats.objects.select_for_update().filter(
+                    author_id__in=author_ids
+                )
+            }
+            counted = count_notes(
+                Note.objects.filter(author_id__in=author_ids)
+            )
+            changed = []
+            for author_id in author_ids:
+                row = counted.get(author_id) or UserStats(author_id=author_id)
+                old = existing.get(author_id)
+                if old is not None and old.last_edited is not None and (
+                    row.last_edited is None
+                    or row.last_edited < old.last_edited
+                ):
+                    row.last_edited = old.last_edited
+                if old is None or any(
+                    getattr(old, name) != getattr(row, name) for name in FIELDS
+                ):
+                    changed.append(row)
+            UserStats.objects.bulk_create(
+                [row for row in changed if row.author_id not in existing]
+            )
+            UserStats.objects.bulk_update(
+                [row for row in changed if row.author_id in existing], FIELDS
+            )
+            for row in changed:
+                forget(row.author_id)
+        total += len(author_ids)
+        fixed += len(changed)
+        last_pk = author_ids[-1]
+        if progress is not None:
+            progress(total, fixed)
+    return total, fixed
@@ -0,0 +1,61 @@
+"""
+Хранилище статики с хешами в именах и сжатыми копиями.
+
+collectstatic записывает рядом с каждым текстовым файлом его копии
+.gz и, если установлен пакет brotli, .br; StaticFilesMiddleware
+отдаёт готовую копию без сжатия на лету.
+"""
+import gzip
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = ('.css', '.js', '.svg', '.txt', '.html', '.json', '.xml',
+                '.map', '.ico')
+# Копия не сохраняется, если экономит меньше этой доли размера.
+MIN_SAVING = 0.05
+
+
+def compressors():
+    yield '.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0)
+    if brotli is not None:
+        yield '.br', lambda data: brotli.compress(data, quality=11)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+
+    @property
+    def manifest_strict(self):
+        return settings.NOTES_STATIC_MANIFEST_STRICT
+
+    def stored_name(self, name):
+        # До первого collectstatic манифеста нет: в нестрогом режиме
+        # файлы отдаются под исходными именами, в строгом
+        # ManifestStaticFilesStorage сообщает об ошибке.
+        if not self.hashed_files and not self.manifest_strict:
+            return name
+        return super().stored_name(name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if name.endswith(COMPRESSIBLE) and self.exists(name):
+                self.compress(name)
+
+    def compress(self, name):
+        path = self.path(name)
+        with open(path, 'rb') as source:
+            data = source.read()
+        for suffix, compress in compressors():
+            compressed = compress(data)
+            if len(compressed) <= len(data) * (1 - MIN_SAVING):
+                with open(path + suffix, 'wb') as target:
+                    target.write(compressed)
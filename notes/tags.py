@@ -0,0 +1,131 @@
+"""
+Теги заметок и счётчики заметок по тегам.
+
+Заметка связана с тегами через таблицу NoteTag с индексом (tag, note):
+список заметок с тегом читается по нему в порядке id, как и обычный
+список. Количество заметок пользователя с каждым тегом хранится
+в TagCount и меняется на разницу при каждом изменении тегов заметки
+и при её удалении, поэтому облако тегов - это чтение нескольких строк
+без подсчёта по всей таблице заметок.
+"""
+from collections import namedtuple
+
+from django.db.models import Count, F, OuterRef, Subquery
+
+from .models import NoteTag, Tag, TagCount
+
+CloudTag = namedtuple('CloudTag', 'name count weight')
+
+# Число ступеней размера тега в облаке.
+CLOUD_WEIGHTS = 5
+
+
+def normalize(name):
+    """Имя тега без лишних пробелов, в нижнем регистре."""
+    return ' '.join(name.split()).lower()
+
+
+def parse(value):
+    """Имена тегов из строки через запятую, без повторов и пустых."""
+    names = []
+    for name in value.split(','):
+        name = normalize(name)
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def note_tags(note):
+    """Имена тегов заметки по алфавиту."""
+    # У заметки несколько тегов: сортировка в Python дешевле, чем
+    # временное B-дерево для ORDER BY.
+    return sorted(
+        NoteTag.objects.filter(note=note).values_list('tag__name', flat=True)
+    )
+
+
+def _tag_ids(names):
+    """Id тегов с именами names; недостающие теги создаются."""
+    ids = dict(Tag.objects.filter(name__in=names).values_list('name', 'id'))
+    missing = [name for name in names if name not in ids]
+    if missing:
+        Tag.objects.bulk_create(
+            [Tag(name=name) for name in missing], ignore_conflicts=True
+        )
+        ids.update(
+            Tag.objects.filter(name__in=missing).values_list('name', 'id')
+        )
+    return [ids[name] for name in names]
+
+
+def _add_counts(author_id, tag_ids, delta):
+    if delta > 0:
+        TagCount.objects.bulk_create(
+            [
+                TagCount(author_id=author_id, tag_id=tag_id)
+                for tag_id in tag_ids
+            ],
+            ignore_conflicts=True,
+        )
+    TagCount.objects.filter(author_id=author_id, tag_id__in=tag_ids).update(
+        count=F('count') + delta
+    )
+
+
+def set_note_tags(note, names):
+    """
+    Заменяет теги заметки на names и обновляет счётчики автора.
+
+    Меняются только добавленные и убранные связи; вызывать в той же
+    транзакции, что и сохранение заметки.
+    """
+    current = dict(
+        NoteTag.objects.filter(note=note).values_list('tag__name', 'tag_id')
+    )
+    removed = [
+        tag_id for name, tag_id in current.items() if name not in names
+    ]
+    added = [name for name in names if name not in current]
+    if removed:
+        NoteTag.objects.filter(note=note, tag_id__in=removed).delete()
+        _add_counts(note.author_id, removed, -1)
+    if added:
+        tag_ids = _tag_ids(added)
+        NoteTag.objects.bulk_create(
+            [NoteTag(note=note, tag_id=tag_id) for tag_id in tag_ids]
+        )
+        _add_counts(note.author_id, tag_ids, 1)
+
+
+def forget_notes(author_id, note_ids):
+    """
+    Вычитает из счётчиков автора теги заметок, которые будут удалены.
+
+    Один UPDATE: для каждого счётчика подзапрос считает связи
+    удаляемых заметок с его тегом по индексу (tag, note).
+    """
+    removed = NoteTag.objects.filter(
+        tag_id=OuterRef('tag_id'), note_id__in=note_ids
+    ).order_by().values('tag_id').annotate(total=Count('id')).values('total')
+    TagCount.objects.filter(
+        author_id=author_id,
+        tag_id__in=NoteTag.objects.filter(note_id__in=note_ids).values(
+            'tag_id'
+        ),
+    ).update(count=F('count') - Subquery(removed))
+
+
+def cloud(author):
+    """Теги пользователя по алфавиту с числом заметок и весом 1..5."""
+    counts = sorted(
+        TagCount.objects.filter(author=author, count__gt=0).values_list(
+            'tag__name', 'count'
+        )
+    )
+    if not counts:
+        return []
+    most = max(count for _, count in counts)
+    return [
+        CloudTag(name, count, 1 + (CLOUD_WEIGHTS - 1) * count // most)
+        for name, count in counts
+    ]
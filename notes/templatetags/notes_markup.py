@@ -0,0 +1,11 @@
+"""Фильтр markdown: текст заметки в HTML через кэш отрисовки."""
+from django import template
+
+from notes.markup import render_cached
+
+register = template.Library()
+
+
+@register.filter(is_safe=True)
+def markdown(text):
+    return render_cached(text)
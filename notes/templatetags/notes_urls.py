@@ -0,0 +1,35 @@
+"""
+Кэшированный reverse() для адресов без аргументов.
+
+Шапка страницы на каждой отрисовке строит одни и те же адреса;
+{% static_url %} вычисляет каждый один раз для пары urlconf
+и префикса скрипта.
+"""
+import functools
+
+from django import template
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.urls import get_script_prefix, get_urlconf, reverse
+
+register = template.Library()
+
+
+@functools.lru_cache(maxsize=None)
+def _reverse(viewname, urlconf, prefix):
+    return reverse(viewname, urlconf=urlconf)
+
+
+def cached_url(viewname):
+    return _reverse(viewname, get_urlconf(), get_script_prefix())
+
+
+@register.simple_tag
+def static_url(viewname):
+    return cached_url(viewname)
+
+
+@receiver(setting_changed)
+def clear_cached_urls(setting, **kwargs):
+    if setting == 'ROOT_URLCONF':
+        _reverse.cache_clear()
@@ -0,0 +1,55 @@
+"""
+Окружение тестов notes для manage.py test и pytest.
+
+Значения по умолчанию в yanote/settings.py рассчитаны на работу
+сайта, а тестам нужны другие: статика в тестах не собирается,
+поэтому ссылки на неё ведут на исходные имена файлов, а тестовые
+данные намеренно превышают NOTES_QUERY_BUDGET, и журнал notes.timing
+не должен засорять вывод.
+"""
+import copy
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+from django.utils.log import configure_logging
+
+TEST_SETTINGS = {
+    'NOTES_STATIC_MANIFEST_STRICT': False,
+}
+
+
+def _test_logging():
+    logging = copy.deepcopy(settings.LOGGING)
+    logging['loggers']['notes.timing']['level'] = 'ERROR'
+    return logging
+
+
+@contextmanager
+def test_environment():
+    """
+    Настройки и журнал на время всех тестов.
+
+    Журнал настраивается через LOGGING, а не уровнем логгера:
+    тесты, загружающие yanote.asgi, повторяют django.setup().
+    """
+    try:
+        with override_settings(LOGGING=_test_logging(), **TEST_SETTINGS):
+            configure_logging(settings.LOGGING_CONFIG, settings.LOGGING)
+            yield
+    finally:
+        configure_logging(settings.LOGGING_CONFIG, settings.LOGGING)
+
+
+class NotesTestRunner(DiscoverRunner):
+    """DiscoverRunner, включающий test_environment()."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._environment = ExitStack()
+        self._environment.enter_context(test_environment())
+
+    def teardown_test_environment(self, **kwargs):
+        self._environment.close()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,207 @@
+from http import HTTPStatus
+
+from django.contrib.admin import helpers
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from notes import fields, search, stats, tags
+from notes.models import Note, NoteRevision, TagCount, UserStats
+from notes.pagination import EstimatedCountPaginator, estimate_count
+from notes.tests.test_query_plans import FULL_SCAN
+
+User = get_user_model()
+
+LONG_TEXT = 'Длинный текст заметки. ' * 300
+
+
+class TestNoteAdmin(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            username='Admin_user', email='admin@example.com', password='pass'
+        )
+        cls.admin_client = Client()
+        cls.admin_client.force_login(cls.admin)
+        cls.authors = [
+            User.objects.create(username=f'Author_{index}')
+            for index in range(3)
+        ]
+        cls.notes = []
+        for index in range(12):
+            note = Note.objects.create(
+                title=f'Заметка {index}',
+                text='Борщ со свеклой' if index == 5 else 'Текст',
+                slug=f'note-{index}',
+                author=cls.authors[index % 3],
+            )
+            tags.set_note_tags(note, ['общий', f'тег-{index % 2}'])
+            cls.notes.append(note)
+        cls.URL_CHANGELIST = reverse('admin:notes_note_changelist')
+
+    def setUp(self):
+        cache.clear()
+
+    def changelist(self, **params):
+        response = self.admin_client.get(self.URL_CHANGELIST, params)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        return response
+
+    def action(self, name, notes=(), **data):
+        return self.admin_client.post(self.URL_CHANGELIST, {
+            'action': name,
+            helpers.ACTION_CHECKBOX_NAME: [note.pk for note in notes],
+            **data,
+        })
+
+    def test_changelist_queries(self):
+        """
+        Авторы читаются одним JOIN, число запросов не зависит от числа
+        заметок, стандартного удаления в действиях нет.
+        """
+        self.changelist()
+        with CaptureQueriesContext(connection) as first:
+            response = self.changelist()
+        self.assertNotIn('delete_selected"', response.content.decode())
+        self.assertContains(response, 'delete_selected_notes')
+        Note.objects.create(
+            title='Ещё', text='Текст', slug='more', author=self.authors[0]
+        )
+        with CaptureQueriesContext(connection) as second:
+            self.changelist()
+        self.assertEqual(len(first), len(second))
+        sql = ' '.join(query['sql'] for query in second)
+        self.assertIn('JOIN "auth_user"', sql)
+
+    def test_author_autocomplete(self):
+        """
+        Автор выбирается автодополнением, а не списком всех пользователей.
+        """
+        response = self.admin_client.get(reverse('admin:notes_note_add'))
+        self.assertContains(response, 'admin-autocomplete')
+        self.assertNotContains(response, 'Author_2</option>')
+
+    def test_search(self):
+        """
+        Поиск находит заметку по адресу, автору и словам текста.
+        """
+        response = self.changelist(q='note-3')
+        self.assertEqual(
+            [note.slug for note in response.context['cl'].result_list],
+            ['note-3'],
+        )
+        response = self.changelist(q='Author_1')
+        self.assertEqual(response.context['cl'].result_count, 4)
+        if search.is_available():
+            response = self.changelist(q='свеклой')
+            self.assertEqual(
+                [note.slug for note in response.context['cl'].result_list],
+                ['note-5'],
+            )
+
+    def test_search_uses_indexes(self):
+        """
+        Поиск в списке не просматривает всю таблицу заметок.
+        """
+        if connection.vendor != 'sqlite' or not search.is_available():
+            self.skipTest('Нужны SQLite и FTS5')
+        with CaptureQueriesContext(connection) as queries:
+            self.changelist(q='Author_1')
+        notes_queries = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('SELECT')
+            and 'FROM "notes_note"' in query['sql']
+        ]
+        self.assertTrue(notes_queries)
+        for sql in notes_queries:
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                plan = '\n'.join(row[-1] for row in cursor.fetchall())
+            with self.subTest(sql=sql):
+                self.assertIsNone(FULL_SCAN.search(plan), plan)
+
+    @override_settings(NOTES_ADMIN_COUNT_LIMIT=5)
+    def test_estimated_count(self):
+        """
+        Большая таблица не считается COUNT(*): число строк оценивается
+        по границам id, результат поиска считается до границы.
+        """
+        Note.objects.filter(pk=self.notes[3].pk).delete()
+        queryset = Note.objects.order_by('-pk')
+        self.assertEqual(estimate_count(queryset), 12)
+        with CaptureQueriesContext(connection) as queries:
+            count = EstimatedCountPaginator(queryset, 100).count
+        self.assertEqual(count, 12)
+        self.assertFalse(
+            any('COUNT(' in query['sql'] for query in queries)
+        )
+        filtered = queryset.filter(title__startswith='Заметка')
+        self.assertEqual(EstimatedCountPaginator(filtered, 100).count, 6)
+        with override_settings(NOTES_ADMIN_COUNT_LIMIT=100):
+            self.assertEqual(EstimatedCountPaginator(queryset, 100).count, 11)
+        self.assertEqual(self.changelist().context['cl'].result_count, 12)
+
+    def test_delete_action(self):
+        """
+        Удаление сначала показывает число заметок, затем удаляет их
+        вместе с тегами и историей и обновляет счётчики.
+        """
+        # Сводки всех пользователей есть и сходятся с заметками.
+        stats.reconcile()
+        author = self.authors[0]
+        selected = [note for note in self.notes if note.author == author]
+        response = self.action('delete_selected_notes', selected)
+        self.assertContains(response, 'Будет удалено заметок: 4.')
+        self.assertEqual(Note.objects.count(), 12)
+
+        response = self.action('delete_selected_notes', selected, post='yes')
+        self.assertRedirects(response, self.URL_CHANGELIST)
+        self.assertFalse(Note.objects.filter(author=author).exists())
+        self.assertFalse(NoteRevision.objects.filter(
+            note_id__in=[note.pk for note in selected]
+        ).exists())
+        self.assertEqual(
+            dict(TagCount.objects.filter(author=author).values_list(
+                'tag__name', 'count'
+            )),
+            {'общий': 0, 'тег-0': 0, 'тег-1': 0},
+        )
+        self.assertEqual(stats.get_stats(author.pk).notes, 0)
+        self.assertEqual(stats.get_stats(self.authors[1].pk).notes, 4)
+        self.assertEqual(stats.reconcile()[1], 0)
+
+    def test_delete_across(self):
+        """
+        Удаление всех найденных заметок не ограничено одной страницей.
+        """
+        self.admin_client.post(self.URL_CHANGELIST + '?q=Author_2', {
+            'action': 'delete_selected_notes',
+            helpers.ACTION_CHECKBOX_NAME: [self.notes[2].pk],
+            'select_across': '1',
+            'post': 'yes',
+        })
+        self.assertEqual(Note.objects.count(), 8)
+        self.assertFalse(UserStats.objects.filter(
+            author=self.authors[2], notes__gt=0
+        ).exists())
+        if search.is_available():
+            response = self.changelist(q='свеклой')
+            self.assertEqual(response.context['cl'].result_count, 0)
+
+    def test_compress_action(self):
+        """
+        Действие сжимает длинный текст выбранных заметок.
+        """
+        with override_settings(NOTES_TEXT_COMPRESS_MIN_SIZE=10 ** 9):
+            note = Note.objects.create(
+                title='Большая', text=LONG_TEXT, slug='big',
+                author=self.authors[0],
+            )
+        self.action('compress_text', [note])
+        raw = Note.objects.values_list('text', flat=True).get(pk=note.pk)
+        self.assertIsInstance(raw, fields.PackedText)
+        self.assertEqual(Note.objects.get(pk=note.pk).text, LONG_TEXT)
@@ -0,0 +1,181 @@
+import json
+from http import HTTPStatus
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from notes.forms import WARNING
+from notes import stats
+from notes.models import Job, Note
+
+User = get_user_model()
+
+
+class TestBatchApi(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Author_user')
+        cls.author_client = Client()
+        cls.author_client.force_login(cls.author)
+        cls.another_user = User.objects.create(username='Another_user')
+        cls.note = Note.objects.create(
+            title='Заголовок', text='Текст', slug='note', author=cls.author
+        )
+        cls.another_note = Note.objects.create(
+            title='Чужая', text='Текст', slug='another',
+            author=cls.another_user,
+        )
+        cls.URL_BATCH = reverse('notes:batch')
+
+    def post(self, operations, client=None):
+        client = client or self.author_client
+        return client.post(
+            self.URL_BATCH,
+            json.dumps({'operations': operations}),
+            content_type='application/json',
+        )
+
+    def results(self, operations):
+        response = self.post(operations)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        return response.json()['results']
+
+    def test_create_update_delete(self):
+        """
+        Пакет создаёт, изменяет и удаляет заметки,
+        возвращая результат по каждой операции.
+        """
+        results = self.results([
+            {'op': 'create', 'title': 'Заголовок', 'text': 'Новая'},
+            {'op': 'create', 'title': 'Своя', 'text': 'Текст', 'slug': 'own'},
+            {'op': 'update', 'slug': 'note', 'text': 'Изменённый текст'},
+        ])
+        self.assertEqual(
+            [(result['status'], result['slug']) for result in results],
+            [('created', 'zagolovok'), ('created', 'own'),
+             ('updated', 'note')],
+        )
+        self.note.refresh_from_db()
+        self.assertEqual(self.note.text, 'Изменённый текст')
+        self.assertEqual(self.note.title, 'Заголовок')
+
+        results = self.results([
+            {'op': 'delete', 'slug': 'own'},
+            {'op': 'delete', 'slug': 'zagolovok'},
+        ])
+        self.assertEqual(
+            [result['status'] for result in results], ['deleted', 'deleted']
+        )
+        self.assertEqual(Note.objects.filter(author=self.author).count(), 1)
+
+    def test_errors_are_reported_per_item(self):
+        """
+        Ошибочные операции не мешают остальным.
+        """
+        results = self.results([
+            {'op': 'create', 'title': '', 'text': 'Без заголовка'},
+            {'op': 'create', 'title': 'Дубль', 'text': 'x', 'slug': 'note'},
+            {'op': 'update', 'slug': 'another', 'text': 'Чужая заметка'},
+            {'op': 'rename', 'slug': 'note'},
+            'не объект',
+            {'op': 'create', 'title': 'Верная', 'text': 'x', 'slug': 'ok'},
+        ])
+        self.assertEqual(
+            [result['status'] for result in results],
+            ['error'] * 5 + ['created'],
+        )
+        self.assertIn('title', results[0]['errors'])
+        self.assertEqual(results[1]['errors']['slug'], ['note' + WARNING])
+        self.another_note.refresh_from_db()
+        self.assertEqual(self.another_note.text, 'Текст')
+
+    def test_non_string_slug(self):
+        """
+        Slug не строкой - ошибка операции, а не ошибка всего пакета.
+        """
+        Note.objects.create(
+            title='Число', text='x', slug='123', author=self.author
+        )
+        results = self.results([
+            {'op': 'create', 'title': 'Число', 'text': 'x', 'slug': 123},
+            {'op': 'update', 'slug': 'note', 'new_slug': 123},
+            {'op': 'update', 'slug': 'note', 'title': ['список']},
+            {'op': 'create', 'title': 'Список', 'text': 'x', 'slug': ['a']},
+            {'op': 'update', 'slug': 'note', 'new_slug': {'a': 1}},
+            {'op': 'delete', 'slug': ['note']},
+        ])
+        self.assertEqual(
+            [result['status'] for result in results], ['error'] * 6
+        )
+        self.assertEqual(results[0]['errors'], {'slug': ['Ожидается строка']})
+        self.assertIn('new_slug', results[1]['errors'])
+        self.assertEqual(results[3]['errors'], {'slug': ['Ожидается строка']})
+        self.assertIn('new_slug', results[4]['errors'])
+
+    def test_concurrent_slug(self):
+        """
+        Slug, занятый параллельным запросом после проверки, даёт 409
+        без частичных изменений.
+        """
+        with mock.patch(
+            'notes.api.BatchRunner.load_busy_slugs', return_value=set()
+        ):
+            response = self.post([
+                {'op': 'update', 'slug': 'note', 'text': 'Изменено'},
+                {'op': 'create', 'title': 'Дубль', 'text': 'x',
+                 'slug': 'another'},
+            ])
+        self.assertEqual(response.status_code, HTTPStatus.CONFLICT)
+        self.note.refresh_from_db()
+        self.assertEqual(self.note.text, 'Текст')
+
+    def test_queries_do_not_grow_with_batch(self):
+        """
+        Количество запросов не зависит от числа операций.
+        """
+        def count_queries(size, offset):
+            operations = [
+                {'op': 'create', 'title': f'Заметка {offset + index}',
+                 'text': 'Текст'}
+                for index in range(size)
+            ] + [{'op': 'update', 'slug': 'note', 'text': str(offset)}]
+            with CaptureQueriesContext(connection) as queries:
+                self.post(operations)
+            return len(queries)
+
+        self.assertEqual(count_queries(2, 0), count_queries(40, 100))
+
+    @override_settings(NOTES_JOBS_SYNC=False)
+    def test_delete_is_unindexed_in_background(self):
+        """
+        Удаление пакетом ставит обновление индекса в очередь,
+        а сводку автора меняет сразу.
+        """
+        stats.reconcile()
+        results = self.results([{'op': 'delete', 'slug': 'note'}])
+        self.assertEqual(results[0]['status'], 'deleted')
+        self.assertFalse(Note.objects.filter(pk=self.note.pk).exists())
+        job = Job.objects.get()
+        self.assertEqual(job.name, 'notes.search.refresh_notes')
+        self.assertEqual(job.args['deleted_ids'], [self.note.pk])
+        self.assertEqual(stats.get_stats(self.author.pk).notes, 0)
+
+    @override_settings(NOTES_API_BATCH_LIMIT=1)
+    def test_batch_limit(self):
+        response = self.post([{'op': 'delete', 'slug': 'a'}] * 2)
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_bad_json(self):
+        response = self.author_client.post(
+            self.URL_BATCH, '{', content_type='application/json'
+        )
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_anonymous_user_is_forbidden(self):
+        response = self.post([], client=Client())
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
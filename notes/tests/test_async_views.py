@@ -0,0 +1,102 @@
+import threading
+from http import HTTPStatus
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import Http404, HttpResponse
+from django.test import RequestFactory, TransactionTestCase, override_settings
+from django.utils.functional import SimpleLazyObject
+
+from notes import asgi, async_views
+from notes.middleware import RateLimitMiddleware
+from notes.models import Note
+
+User = get_user_model()
+
+
+class TestAsyncReadViews(TransactionTestCase):
+    """
+    Представления выполняются в потоках пула, поэтому нужны
+    закоммиченные данные, видимые из других соединений.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create(username='Author_user')
+        self.note = Note.objects.create(
+            title='Асинхронная заметка',
+            text='Текст заметки',
+            slug='async-note',
+            author=self.author,
+        )
+        self.factory = RequestFactory()
+
+    def call(self, view, path, **kwargs):
+        request = self.factory.get(path)
+        request.user = self.author
+        return async_to_sync(view)(request, **kwargs)
+
+    def test_detail(self):
+        """
+        Асинхронная страница заметки отдаёт отрисованный ответ.
+        """
+        response = self.call(
+            async_views.note_detail, '/note/async-note/', slug='async-note'
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertContains(response, self.note.text)
+
+    def test_list(self):
+        """
+        Асинхронный список содержит заметки автора.
+        """
+        response = self.call(async_views.notes_list, '/notes/')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertContains(response, self.note.title)
+
+    def test_not_found(self):
+        """
+        Исключения представления доходят до вызывающего кода.
+        """
+        with self.assertRaises(Http404):
+            self.call(
+                async_views.note_detail, '/note/missing/', slug='missing'
+            )
+
+    def test_views_run_in_pool(self):
+        """
+        Представления выполняются в ограниченном пуле потоков.
+        """
+        executor = asgi.get_executor()
+        self.assertIs(executor, asgi.get_executor())
+        self.call(async_views.notes_list, '/notes/')
+        self.assertTrue(all(
+            thread.name.startswith('notes-orm')
+            for thread in executor._threads
+        ))
+        self.assertLessEqual(
+            len(executor._threads), executor._max_workers
+        )
+
+    @override_settings(NOTES_RATE_LIMITS={'read': (10, 1)})
+    def test_rate_limit_loads_user_in_pool(self):
+        """
+        Под ASGI проверка частоты загружает пользователя в пуле,
+        а не в общем потоке sync_to_async.
+        """
+        threads = []
+
+        def get_user():
+            threads.append(threading.current_thread().name)
+            return self.author
+
+        async def get_response(request):
+            return HttpResponse()
+
+        request = self.factory.get('/notes/')
+        request.user = SimpleLazyObject(get_user)
+        response = async_to_sync(RateLimitMiddleware(get_response))(request)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(len(threads), 1)
+        self.assertTrue(threads[0].startswith('notes-orm'), threads)
@@ -0,0 +1,112 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.test import (
+    Client, SimpleTestCase, TestCase, override_settings
+)
+from django.urls import reverse
+
+from notes import cache as notes_cache
+from notes.backends import check_shared_cache
+
+User = get_user_model()
+
+
+@override_settings(
+    NOTES_USER_CACHE_TIMEOUT=60,
+    SESSION_ENGINE='django.contrib.sessions.backends.cached_db',
+)
+class TestCachedUser(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Author_user')
+        cls.URL_HOME = reverse('notes:home')
+        cls.URL_LIST = reverse('notes:list')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def test_warm_cache_without_queries(self):
+        """
+        С прогретым кэшем сессия и пользователь не загружаются из базы.
+        """
+        self.client.get(self.URL_HOME)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.URL_HOME)
+        self.assertTrue(response.context['user'].is_authenticated)
+
+    def test_password_change(self):
+        """
+        После смены пароля пользователь перечитывается из базы,
+        и старая сессия перестаёт действовать.
+        """
+        self.client.get(self.URL_HOME)
+        self.author.set_password('new-password')
+        self.author.save()
+        self.assertIsNone(notes_cache.get_user(self.author.pk))
+        response = self.client.get(self.URL_LIST)
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+    def test_logout(self):
+        """
+        Выход удаляет пользователя из кэша.
+        """
+        self.client.get(self.URL_HOME)
+        self.assertIsNotNone(notes_cache.get_user(self.author.pk))
+        self.client.get(reverse('users:logout'))
+        self.assertIsNone(notes_cache.get_user(self.author.pk))
+
+    def test_delete(self):
+        """
+        Удалённый пользователь не остаётся в кэше.
+        """
+        self.client.get(self.URL_HOME)
+        self.author.delete()
+        self.assertIsNone(notes_cache.get_user(self.author.pk))
+        response = self.client.get(self.URL_HOME)
+        self.assertFalse(response.context['user'].is_authenticated)
+
+    @override_settings(NOTES_USER_CACHE_TIMEOUT=0)
+    def test_disabled(self):
+        """
+        При NOTES_USER_CACHE_TIMEOUT = 0 пользователь не кэшируется.
+        """
+        self.client.get(self.URL_HOME)
+        self.assertIsNone(notes_cache.get_user(self.author.pk))
+
+    def test_model_backend_session(self):
+        """
+        Сессия, начатая с ModelBackend, остаётся действительной.
+        """
+        client = Client()
+        client.force_login(
+            self.author, backend='django.contrib.auth.backends.ModelBackend'
+        )
+        response = client.get(self.URL_LIST)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+
+class TestSharedCacheCheck(SimpleTestCase):
+
+    def test_process_local_cache_is_refused(self):
+        """
+        Кэш пользователей и сессий в памяти процесса не включается.
+        """
+        check_shared_cache()
+        for name, value in (
+            ('NOTES_USER_CACHE_TIMEOUT', 60),
+            ('SESSION_ENGINE', 'django.contrib.sessions.backends.cache'),
+        ):
+            with self.subTest(setting=name):
+                with override_settings(**{name: value}):
+                    with self.assertRaises(ImproperlyConfigured):
+                        check_shared_cache()
+                    with override_settings(CACHES={'default': {
+                        'BACKEND': 'django.core.cache.backends.filebased.'
+                                   'FileBasedCache',
+                        'LOCATION': '/tmp/yanote-test-cache',
+                    }}):
+                        check_shared_cache()
@@ -0,0 +1,114 @@
+import gzip
+import zlib
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from notes import middleware
+from notes.models import Note
+
+User = get_user_model()
+
+
+class TestCompression(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Author_user')
+        cls.author_client = Client()
+        cls.author_client.force_login(cls.author)
+        cls.notes = Note.objects.bulk_create(
+            Note(title=f'Заметка {index}', text='Длинный текст. ' * 200,
+                 slug=f'note-{index}', author=cls.author)
+            for index in range(30)
+        )
+        cls.URL_DETAIL = reverse('notes:detail', args=('note-0',))
+        cls.URL_EXPORT = reverse('notes:export')
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, url, encoding, **params):
+        return self.author_client.get(
+            url, params, HTTP_ACCEPT_ENCODING=encoding
+        )
+
+    def test_gzip(self):
+        """
+        Страница сжимается gzip, ETag становится слабым.
+        """
+        plain = self.author_client.get(self.URL_DETAIL)
+        response = self.get(self.URL_DETAIL, 'gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertLess(len(response.content), len(plain.content))
+        self.assertEqual(response['ETag'], 'W/' + plain['ETag'])
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_weak_etag_not_modified(self):
+        """
+        Слабый ETag сжатой страницы подходит для If-None-Match.
+        """
+        etag = self.get(self.URL_DETAIL, 'gzip')['ETag']
+        response = self.author_client.get(
+            self.URL_DETAIL, HTTP_IF_NONE_MATCH=etag,
+            HTTP_ACCEPT_ENCODING='gzip',
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_brotli(self):
+        """
+        Brotli предпочитается gzip, если клиент его принимает.
+        """
+        if middleware.brotli is None:
+            self.skipTest('brotli не установлен')
+        plain = self.author_client.get(self.URL_DETAIL)
+        response = self.get(self.URL_DETAIL, 'gzip, deflate, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(
+            middleware.brotli.decompress(response.content), plain.content
+        )
+
+    def test_small_body(self):
+        """
+        Короткие ответы не сжимаются.
+        """
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        response = middleware.CompressionMiddleware(
+            lambda request: HttpResponse('коротко')
+        )(request)
+        self.assertNotIn('Content-Encoding', response)
+
+    def test_compressed_types(self):
+        """
+        Zip-архив не сжимается повторно.
+        """
+        response = self.get(self.URL_EXPORT, 'gzip', format='zip')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertNotIn('Content-Encoding', response)
+
+    @override_settings(NOTES_COMPRESS_FLUSH_SIZE=1024)
+    def test_streaming(self):
+        """
+        Потоковая выгрузка сжимается частями по мере генерации.
+        """
+        plain = b''.join(
+            self.author_client.get(
+                self.URL_EXPORT, {'format': 'ndjson'}
+            ).streaming_content
+        )
+        response = self.get(self.URL_EXPORT, 'gzip', format='ndjson')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertNotIn('Content-Length', response)
+        chunks = list(response.streaming_content)
+        self.assertGreater(len(chunks), 2)
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        # Первая сброшенная часть распаковывается без остальных.
+        first = decompressor.decompress(chunks[0])
+        self.assertTrue(plain.startswith(first))
+        self.assertGreater(len(first), 0)
+        self.assertEqual(gzip.decompress(b''.join(chunks)), plain)
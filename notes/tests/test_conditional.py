@@ -0,0 +1,122 @@
+from datetime import timedelta
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+
+from notes import stats
+from notes.models import Note
+
+User = get_user_model()
+
+
+class TestConditionalGet(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Author_user')
+        cls.author_client = Client()
+        cls.author_client.force_login(cls.author)
+        cls.note = Note.objects.create(
+            title='Заголовок',
+            text='Текст заметки',
+            slug='note-slug',
+            author=cls.author,
+        )
+        cls.URL_DETAIL = reverse('notes:detail', args=(cls.note.slug,))
+        cls.URL_NOTES_LIST = reverse('notes:list')
+
+    def test_timestamps_are_set(self):
+        """
+        У заметки заполняются время создания и изменения.
+        """
+        self.assertIsNotNone(self.note.created)
+        self.assertIsNotNone(self.note.updated)
+
+    def test_detail_not_modified(self):
+        """
+        Страница заметки отвечает 304 на If-None-Match
+        и If-Modified-Since, пока заметка не изменилась.
+        """
+        response = self.author_client.get(self.URL_DETAIL)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        etag = response['ETag']
+        last_modified = response['Last-Modified']
+        self.assertIn('private', response['Cache-Control'])
+
+        response = self.author_client.get(
+            self.URL_DETAIL, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        response = self.author_client.get(
+            self.URL_DETAIL, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+        self.author_client.post(
+            reverse('notes:edit', args=(self.note.slug,)),
+            {'title': 'Новый заголовок', 'text': 'Текст', 'slug': 'note-slug'},
+        )
+        response = self.author_client.get(
+            self.URL_DETAIL, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertContains(response, 'Новый заголовок')
+
+    def test_header_stats_change_validators(self):
+        """
+        Изменение сводки в шапке меняет ETag и Last-Modified
+        страницы заметки и ETag списка.
+        """
+        cache.clear()
+        detail = self.author_client.get(self.URL_DETAIL)
+        notes_list = self.author_client.get(self.URL_NOTES_LIST)
+        edited = timezone.now() + timedelta(hours=1)
+        stats.record(self.author.pk, notes=1, size=10, edited=edited)
+        response = self.author_client.get(
+            self.URL_DETAIL, HTTP_IF_NONE_MATCH=detail['ETag']
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(
+            response['Last-Modified'], http_date(edited.timestamp())
+        )
+        response = self.author_client.get(
+            self.URL_DETAIL, HTTP_IF_MODIFIED_SINCE=detail['Last-Modified']
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        response = self.author_client.get(
+            self.URL_NOTES_LIST, HTTP_IF_NONE_MATCH=notes_list['ETag']
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_detail_of_missing_note(self):
+        """
+        Для чужой или несуществующей заметки по-прежнему 404.
+        """
+        response = self.author_client.get(
+            reverse('notes:detail', args=('missing',)),
+            HTTP_IF_NONE_MATCH='"anything"',
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_list_not_modified(self):
+        """
+        Список отвечает 304, пока заметки пользователя не изменились.
+        """
+        etag = self.author_client.get(self.URL_NOTES_LIST)['ETag']
+        response = self.author_client.get(
+            self.URL_NOTES_LIST, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+        Note.objects.create(
+            title='Вторая', text='Текст', slug='second', author=self.author
+        )
+        response = self.author_client.get(
+            self.URL_NOTES_LIST, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
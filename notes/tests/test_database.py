@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from notes.models import Note
+
+
+@override_settings(
+    NOTES_SQLITE_PRAGMAS=settings.NOTES_SQLITE_PRODUCTION_PRAGMAS
+)
+class TestSqlitePragmas(TestCase):
+
+    def setUp(self):
+        # PRAGMA выполняются на новом соединении.
+        self.connection = connection.copy()
+        self.addCleanup(self.connection.close)
+
+    def pragma(self, name):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas(self):
+        """
+        Новое соединение с SQLite получает PRAGMA из настроек.
+        """
+        pragmas = settings.NOTES_SQLITE_PRAGMAS
+        self.assertEqual(
+            self.pragma('busy_timeout'), pragmas['busy_timeout']
+        )
+        self.assertEqual(self.pragma('cache_size'), pragmas['cache_size'])
+        # 1 - NORMAL.
+        self.assertEqual(self.pragma('synchronous'), 1)
+
+
+class TestImmediateTransactions(TransactionTestCase):
+
+    def first_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            with transaction.atomic():
+                Note.objects.count()
+        return queries.captured_queries[0]['sql']
+
+    @override_settings(NOTES_SQLITE_BEGIN_IMMEDIATE=True)
+    def test_atomic_begins_immediate(self):
+        """
+        В профиле production транзакция сразу берёт блокировку на запись.
+        """
+        self.assertEqual(self.first_query(), 'BEGIN IMMEDIATE')
+
+    @override_settings(NOTES_SQLITE_BEGIN_IMMEDIATE=False)
+    def test_default_profile(self):
+        """
+        Без профиля production транзакции открываются, как в Django.
+        """
+        self.assertEqual(self.first_query(), 'BEGIN')
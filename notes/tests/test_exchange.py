@@ -0,0 +1,154 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from notes import search
+from notes.models import Note
+
+User = get_user_model()
+
+
+class TestImportExport(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='author')
+        cls.another_user = User.objects.create(username='another')
+        cls.note = Note.objects.create(
+            title='Существующая', text='Текст', slug='dup', author=cls.author
+        )
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def write_jsonl(self, name, rows):
+        with open(self.path(name), 'w', encoding='utf-8') as stream:
+            for row in rows:
+                stream.write(json.dumps(row, ensure_ascii=False) + '\n')
+        return self.path(name)
+
+    def import_notes(self, path, **options):
+        stdout, stderr = StringIO(), StringIO()
+        call_command(
+            'import_notes', path, stdout=stdout, stderr=stderr, **options
+        )
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_import_jsonl_with_collisions(self):
+        """
+        Импорт подбирает суффиксы для совпадающих slug,
+        в том числе с уже существующими заметками.
+        """
+        rows = [
+            {'title': 'Первая', 'text': 'раз', 'slug': 'dup'},
+            {'title': 'Вторая', 'text': 'два', 'slug': 'dup'},
+            {'title': 'Третья', 'text': 'три', 'author': 'another'},
+        ]
+        path = self.write_jsonl('notes.jsonl', rows)
+        self.import_notes(path, author='author', chunk_size=2)
+
+        self.assertEqual(
+            set(Note.objects.filter(
+                title__in=('Первая', 'Вторая')
+            ).values_list('slug', flat=True)),
+            {'dup-2', 'dup-3'},
+        )
+        third = Note.objects.get(title='Третья')
+        self.assertEqual(third.author, self.another_user)
+        self.assertIsNotNone(third.created)
+
+    def test_import_reports_skipped_rows(self):
+        """
+        Строки с неизвестным автором, полями не строками и битым JSON
+        пропускаются.
+        """
+        path = self.write_jsonl('notes.jsonl', [
+            {'title': 'Без автора', 'text': ''},
+            {'title': 'Чужой', 'text': '', 'author': 'nobody'},
+            {'title': 5, 'text': '', 'author': 'author'},
+            {'title': 'Текст', 'text': ['список'], 'author': 'author'},
+            {'title': 'Адрес', 'slug': {'a': 1}, 'author': 'author'},
+            {'title': 'Автор', 'author': ['author']},
+            {'title': 'Верная', 'author': 'author'},
+        ])
+        with open(path, 'a', encoding='utf-8') as stream:
+            stream.write('{не json\n')
+        stdout, stderr = self.import_notes(path)
+        self.assertIn('пропущено: 7', stdout)
+        self.assertIn('nobody', stderr)
+        self.assertIn('поле title должно быть строкой', stderr)
+        self.assertEqual(Note.objects.count(), 2)
+
+    def test_import_is_batched(self):
+        """
+        Количество запросов зависит от числа порций, а не строк.
+        """
+        path = self.write_jsonl('notes.jsonl', [
+            {'title': f'Заметка {index}', 'text': 'Текст'}
+            for index in range(50)
+        ])
+        with CaptureQueriesContext(connection) as queries:
+            self.import_notes(path, author='author', chunk_size=25)
+        inserts = [
+            query for query in queries.captured_queries
+            if query['sql'].startswith('INSERT INTO "notes_note"')
+        ]
+        self.assertEqual(len(inserts), 2)
+        self.assertLess(len(queries.captured_queries), 30)
+        self.assertEqual(Note.objects.count(), 51)
+
+    def test_imported_notes_are_searchable(self):
+        if not search.is_available():
+            self.skipTest('FTS5 доступен только в SQLite')
+        path = self.write_jsonl('notes.jsonl', [
+            {'title': 'Импорт', 'text': 'уникальноеслово'},
+        ])
+        self.import_notes(path, author='author')
+        results = search.search_notes(
+            Note.objects.filter(author=self.author),
+            self.author.pk,
+            'уникальноеслово',
+        )
+        self.assertEqual(len(results), 1)
+
+    def test_csv_round_trip(self):
+        """
+        Экспорт в CSV и импорт обратно сохраняют поля заметок.
+        """
+        path = self.path('notes.csv')
+        call_command(
+            'export_notes', path, chunk_size=1,
+            stdout=StringIO(), stderr=StringIO(),
+        )
+        self.note.delete()
+        self.import_notes(path)
+        note = Note.objects.get()
+        self.assertEqual(
+            (note.title, note.text, note.slug, note.author),
+            ('Существующая', 'Текст', 'dup', self.author),
+        )
+
+    def test_export_jsonl_to_stdout(self):
+        stdout = StringIO()
+        call_command(
+            'export_notes', '-', author='author',
+            stdout=stdout, stderr=StringIO(),
+        )
+        rows = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        self.assertEqual(rows, [{
+            'title': 'Существующая',
+            'text': 'Текст',
+            'slug': 'dup',
+            'author': 'author',
+        }])
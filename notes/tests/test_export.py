@@ -0,0 +1,143 @@
+import asyncio
+import io
+import json
+import threading
+import zipfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase, TransactionTestCase
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from notes import exchange
+from notes.models import Note
+from yanote.asgi import application
+
+User = get_user_model()
+
+
+@override_settings(NOTES_EXPORT_CHUNK_SIZE=2)
+class TestStreamingExport(TestCase):
+    NOTES_COUNT = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Author_user')
+        cls.author_client = Client()
+        cls.author_client.force_login(cls.author)
+        cls.another_user = User.objects.create(username='Another_user')
+        for index in range(cls.NOTES_COUNT):
+            Note.objects.create(
+                title=f'Заметка {index}',
+                text=f'Текст {index}',
+                slug=f'note-{index}',
+                author=cls.author,
+            )
+        Note.objects.create(
+            title='Чужая', text='Текст', slug='another',
+            author=cls.another_user,
+        )
+        cls.URL_EXPORT = reverse('notes:export')
+
+    def export(self, fmt):
+        response = self.author_client.get(self.URL_EXPORT, {'format': fmt})
+        self.assertTrue(response.streaming)
+        with CaptureQueriesContext(connection) as queries:
+            content = b''.join(response.streaming_content)
+        return response, content, queries
+
+    def test_ndjson(self):
+        """
+        NDJSON содержит только заметки автора, по одной в строке,
+        и читается порциями по NOTES_EXPORT_CHUNK_SIZE.
+        """
+        response, content, queries = self.export('ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in content.decode().splitlines()]
+        self.assertEqual(
+            [row['slug'] for row in rows],
+            [f'note-{index}' for index in range(self.NOTES_COUNT)],
+        )
+        self.assertEqual(rows[0]['text'], 'Текст 0')
+        # Три полные или неполные порции и пустая в конце.
+        self.assertEqual(len(queries), 4)
+
+    def test_markdown_zip(self):
+        """
+        Архив содержит по файлу Markdown на заметку.
+        """
+        response, content, _ = self.export('zip')
+        self.assertIn('notes.zip', response['Content-Disposition'])
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            self.assertEqual(
+                archive.namelist(),
+                [f'note-{index}.md' for index in range(self.NOTES_COUNT)],
+            )
+            self.assertEqual(
+                archive.read('note-1.md').decode(),
+                '# Заметка 1\n\nТекст 1\n',
+            )
+
+    def test_unknown_format(self):
+        response = self.author_client.get(self.URL_EXPORT, {'format': 'pdf'})
+        self.assertEqual(response.status_code, 404)
+
+
+class TestExportUnderAsgi(TransactionTestCase):
+
+    def setUp(self):
+        author = User.objects.create(username='Author_user')
+        for index in range(3):
+            Note.objects.create(
+                title=f'Заметка {index}', text='', author=author
+            )
+        client = Client()
+        client.force_login(author)
+        self.cookie = f'sessionid={client.cookies["sessionid"].value}'
+
+    def request(self, path, query):
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {
+            'type': 'http',
+            'method': 'GET',
+            'path': path,
+            'query_string': query.encode(),
+            'headers': [
+                (b'host', b'testserver'),
+                (b'cookie', self.cookie.encode()),
+            ],
+        }
+        asyncio.run(application(scope, receive, send))
+        return messages
+
+    @override_settings(NOTES_EXPORT_CHUNK_SIZE=2)
+    def test_chunks_are_read_outside_event_loop(self):
+        """
+        Под ASGI порции выгрузки читаются в отдельном потоке,
+        а не в потоке цикла событий.
+        """
+        threads = []
+        fetch = exchange.ChunkedRows.fetch
+
+        def record(rows, last_id):
+            threads.append(threading.get_ident())
+            return fetch(rows, last_id)
+
+        with mock.patch.object(exchange.ChunkedRows, 'fetch', record):
+            messages = self.request(reverse('notes:export'), 'format=ndjson')
+        self.assertEqual(messages[0]['status'], 200)
+        content = b''.join(message.get('body', b'') for message in messages)
+        self.assertEqual(len(content.decode().splitlines()), 3)
+        self.assertEqual(len(threads), 3)
+        self.assertNotIn(threading.get_ident(), threads)
+        self.assertEqual(messages[-1], {'type': 'http.response.body'})
@@ -0,0 +1,188 @@
+import json
+import threading
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from notes import jobs, search
+from notes.models import Job
+
+User = get_user_model()
+
+CALLS = []
+RELEASE = threading.Event()
+
+
+def remember(value):
+    CALLS.append(value)
+
+
+def fail(value):
+    raise ValueError(value)
+
+
+def hang():
+    RELEASE.wait(5)
+
+
+@override_settings(NOTES_JOBS_SYNC=False, NOTES_JOBS_KEEP_DONE=False)
+class TestJobs(TestCase):
+
+    def setUp(self):
+        CALLS.clear()
+        RELEASE.clear()
+
+    def enqueue(self, name, **kwargs):
+        return jobs.enqueue(f'{__name__}.{name}', **kwargs)
+
+    def run_worker(self, **kwargs):
+        return jobs.Worker(poll_interval=0.05, **kwargs).run(burst=True)
+
+    @override_settings(NOTES_JOBS_SYNC=True)
+    def test_sync_mode(self):
+        """
+        В синхронном режиме задача выполняется сразу, без записи в очередь.
+        """
+        self.assertIsNone(self.enqueue('remember', value=1))
+        self.assertEqual(CALLS, [1])
+        self.assertFalse(Job.objects.exists())
+
+    def test_unknown_task(self):
+        """
+        Несуществующая задача не попадает в очередь.
+        """
+        with self.assertRaises(ImportError):
+            self.enqueue('missing')
+        self.assertFalse(Job.objects.exists())
+
+    def test_claim_order(self):
+        """
+        Задачи выбираются по приоритету, затем по времени; отложенные
+        и уже занятые не выбираются.
+        """
+        low = self.enqueue('remember', value='low')
+        high = self.enqueue('remember', value='high', priority=10)
+        self.enqueue('remember', value='later', priority=20, delay=60)
+        first = jobs.claim(1, 'first')
+        self.assertEqual([job.pk for job in first], [high.pk])
+        self.assertEqual(first[0].attempts, 1)
+        self.assertEqual(first[0].status, Job.RUNNING)
+        self.assertEqual(
+            [job.pk for job in jobs.claim(10, 'second')], [low.pk]
+        )
+        self.assertEqual(jobs.claim(10, 'third'), [])
+
+    def test_worker(self):
+        """
+        Обработчик выполняет все задачи и удаляет выполненные.
+        """
+        for value in range(10):
+            self.enqueue('remember', value=value, priority=value % 3)
+        result = self.run_worker(concurrency=1)
+        self.assertEqual(result.done, 10)
+        self.assertEqual(CALLS[:4], [2, 5, 8, 1])
+        self.assertFalse(Job.objects.exists())
+
+    @override_settings(NOTES_JOBS_KEEP_DONE=True)
+    def test_keep_done(self):
+        """
+        С NOTES_JOBS_KEEP_DONE выполненная задача остаётся в таблице.
+        """
+        job = self.enqueue('remember', value=1)
+        self.run_worker()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertIsNotNone(job.finished)
+
+    @override_settings(NOTES_JOBS_RETRY_DELAY=100)
+    def test_retry_with_backoff(self):
+        """
+        Упавшая задача откладывается с растущей паузой, а после
+        последней попытки помечается ошибкой.
+        """
+        job = self.enqueue('fail', value='сбой', max_attempts=2)
+        started = timezone.now()
+        result = self.run_worker()
+        self.assertEqual(result.failed, 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertIn('ValueError: сбой', job.last_error)
+        delay = timedelta(seconds=100)
+        self.assertGreaterEqual(job.run_at, started + delay / 2)
+        self.assertLessEqual(job.run_at, timezone.now() + delay)
+        self.assertLessEqual(jobs.retry_delay(3), 400)
+        self.assertGreaterEqual(jobs.retry_delay(3), 200)
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        self.run_worker()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+
+    def test_timeout(self):
+        """
+        Задача дольше timeout считается упавшей, её поздний результат
+        не учитывается.
+        """
+        job = self.enqueue('hang', timeout=1, max_attempts=1)
+        timer = threading.Timer(1.5, RELEASE.set)
+        timer.start()
+        self.addCleanup(timer.cancel)
+        result = self.run_worker()
+        self.assertEqual((result.done, result.timed_out), (0, 1))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIn('не завершилась', job.last_error)
+
+    def test_requeue_stale(self):
+        """
+        Задача брошенного обработчика возвращается в очередь.
+        """
+        job = self.enqueue('remember', value=1, timeout=10)
+        jobs.claim(1, 'lost')
+        self.assertEqual(jobs.requeue_stale(), 0)
+        Job.objects.filter(pk=job.pk).update(
+            started=timezone.now() - timedelta(seconds=11)
+        )
+        self.assertEqual(jobs.requeue_stale(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by), (Job.QUEUED, ''))
+
+    def test_command(self):
+        """
+        Команда run_jobs --burst выполняет очередь и печатает итог.
+        """
+        self.enqueue('remember', value=1)
+        self.enqueue('fail', value=2, max_attempts=1)
+        out = StringIO()
+        call_command('run_jobs', '--burst', '--poll-interval=0.05', stdout=out)
+        self.assertIn('Выполнено задач: 1, ошибок: 1', out.getvalue())
+
+    def test_bulk_search_refresh(self):
+        """
+        Индекс после пакетного API обновляет фоновая задача.
+        """
+        author = User.objects.create(username='Author_user')
+        client = Client()
+        client.force_login(author)
+        client.post(
+            reverse('notes:batch'),
+            json.dumps({'operations': [
+                {'op': 'create', 'title': 'Борщ', 'text': 'Свекла'},
+            ]}),
+            content_type='application/json',
+        )
+        job = Job.objects.get()
+        self.assertEqual(job.name, 'notes.search.refresh_notes')
+        if not search.is_available():
+            return
+        response = client.get(reverse('notes:search'), {'q': 'свекла'})
+        self.assertEqual(list(response.context['results']), [])
+        for job in jobs.claim(1, 'test'):
+            search.refresh_notes(**job.args)
+        response = client.get(reverse('notes:search'), {'q': 'свекла'})
+        self.assertEqual(len(response.context['results']), 1)
@@ -0,0 +1,131 @@
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from notes import cache as notes_cache
+from notes.models import Note
+
+User = get_user_model()
+
+
+class TestListCache(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Author_user')
+        cls.author_client = Client()
+        cls.author_client.force_login(cls.author)
+        cls.another_user = User.objects.create(username='Another_user')
+        cls.another_user_client = Client()
+        cls.another_user_client.force_login(cls.another_user)
+        cls.note = Note.objects.create(
+            title='Заголовок',
+            text='Текст заметки',
+            slug='note-slug',
+            author=cls.author,
+        )
+        cls.URL_NOTES_LIST = reverse('notes:list')
+
+    def setUp(self):
+        cache.clear()
+
+    def get_list(self, client=None):
+        client = client or self.author_client
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(self.URL_NOTES_LIST)
+        notes_queries = [
+            query for query in queries.captured_queries
+            if 'notes_note' in query['sql']
+        ]
+        return response.content.decode(), len(notes_queries)
+
+    def test_second_request_is_served_from_cache(self):
+        """
+        Повторный запрос списка не обращается к таблице заметок.
+        """
+        content, queries = self.get_list()
+        self.assertEqual(queries, 1)
+        cached_content, queries = self.get_list()
+        self.assertEqual(queries, 0)
+        self.assertEqual(cached_content, content)
+        self.assertIn(self.note.title, cached_content)
+
+    def test_cache_is_per_user(self):
+        """
+        Пользователь не получает закэшированный список другого.
+        """
+        self.get_list()
+        content, _ = self.get_list(self.another_user_client)
+        self.assertNotIn(self.note.title, content)
+
+    def test_views_invalidate_cache(self):
+        """
+        Добавление, редактирование и удаление заметки сбрасывают кэш.
+        """
+        self.get_list()
+        self.author_client.post(
+            reverse('notes:add'),
+            {'title': 'Новая заметка', 'text': 'Текст', 'slug': 'new'},
+        )
+        content, queries = self.get_list()
+        self.assertEqual(queries, 1)
+        self.assertIn('Новая заметка', content)
+
+        self.author_client.post(
+            reverse('notes:edit', args=('new',)),
+            {'title': 'Изменённая заметка', 'text': 'Текст', 'slug': 'new'},
+        )
+        content, _ = self.get_list()
+        self.assertIn('Изменённая заметка', content)
+
+        self.author_client.post(reverse('notes:delete', args=('new',)))
+        content, _ = self.get_list()
+        self.assertNotIn('Изменённая заметка', content)
+
+    def test_hit_and_miss_counters(self):
+        """
+        Попадания и промахи учитываются в счётчиках.
+        """
+        before = notes_cache.stats.get('list_hits', 'list_misses')
+        self.get_list()
+        self.get_list()
+        self.get_list()
+        after = notes_cache.stats.get('list_hits', 'list_misses')
+        self.assertEqual(after['list_hits'] - before['list_hits'], 2)
+        self.assertEqual(after['list_misses'] - before['list_misses'], 1)
+        output = StringIO()
+        call_command('notes_cache_stats', stdout=output)
+        self.assertIn('попаданий', output.getvalue())
+
+
+class TestListCacheBackends(TestListCache):
+    """Те же проверки для файлового кэша и кэша в базе данных."""
+
+    def run_with_cache(self, backend, location):
+        caches = {'default': {'BACKEND': backend, 'LOCATION': location}}
+        with override_settings(CACHES=caches):
+            if backend.endswith('DatabaseCache'):
+                call_command('createcachetable', verbosity=0)
+            cache.clear()
+            self.test_second_request_is_served_from_cache()
+            self.test_views_invalidate_cache()
+
+    def test_file_based_cache(self):
+        with tempfile.TemporaryDirectory() as location:
+            self.run_with_cache(
+                'django.core.cache.backends.filebased.FileBasedCache',
+                location,
+            )
+
+    def test_database_cache(self):
+        self.run_with_cache(
+            'django.core.cache.backends.db.DatabaseCache',
+            'notes_cache_table',
+        )
@@ -0,0 +1,172 @@
+import time
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from notes import markup
+from notes.cache import stats
+from notes.models import Note
+
+User = get_user_model()
+
+
+class TestRender(TestCase):
+
+    def test_markup(self):
+        """
+        Поддерживаемая разметка превращается в HTML.
+        """
+        cases = (
+            ('Текст', '<p>Текст</p>'),
+            ('# Заголовок', '<h1>Заголовок</h1>'),
+            ('**жирный** и *курсив*',
+             '<p><strong>жирный</strong> и <em>курсив</em></p>'),
+            ('snake_case_name', '<p>snake_case_name</p>'),
+            (r'\*звёздочки\*', '<p>*звёздочки*</p>'),
+            ('`a <b> c`', '<p><code>a &lt;b&gt; c</code></p>'),
+            ('- один\n- два', '<ul><li>один</li><li>два</li></ul>'),
+            ('1. один\n2. два', '<ol><li>один</li><li>два</li></ol>'),
+            ('> цитата', '<blockquote><p>цитата</p></blockquote>'),
+            ('```\n<i>**код**</i>\n```',
+             '<pre><code>&lt;i&gt;**код**&lt;/i&gt;</code></pre>'),
+            ('Абзац\n\n---', '<p>Абзац</p><hr>'),
+            ('[Яндекс](https://ya.ru/?a=1&b=2)',
+             '<p><a href="https://ya.ru/?a=1&amp;b=2" '
+             'rel="nofollow noopener">Яндекс</a></p>'),
+        )
+        for text, html in cases:
+            with self.subTest(text=text):
+                self.assertEqual(markup.render(text), html)
+
+    def test_sanitized(self):
+        """
+        HTML в тексте экранируется, опасные ссылки не создаются.
+        """
+        cases = (
+            ('<script>alert(1)</script>',
+             '<p>&lt;script&gt;alert(1)&lt;/script&gt;</p>'),
+            ('[x](javascript:alert)', '<p>[x](javascript:alert)</p>'),
+            ('[x](JavaScript:alert)', '<p>[x](JavaScript:alert)</p>'),
+            ('[x](data:text/html,1)', '<p>[x](data:text/html,1)</p>'),
+            ('[x](/a"onclick="b)',
+             '<p><a href="/a&quot;onclick=&quot;b" '
+             'rel="nofollow noopener">x</a></p>'),
+            ('**<img src=x onerror=y>**',
+             '<p><strong>&lt;img src=x onerror=y&gt;</strong></p>'),
+            ('\x000\x00', '<p>\ufffd0\ufffd</p>'),
+        )
+        for text, html in cases:
+            with self.subTest(text=text):
+                self.assertEqual(markup.render(text), html)
+
+    def test_obfuscated_schemes(self):
+        """
+        Схему javascript не спрятать за управляющими символами,
+        пробелами, HTML-сущностями и регистром букв.
+        """
+        for url in (
+            '\x01javascript:alert%281%29',
+            'java\tscript:alert',
+            'java\x0bscript:alert',
+            '&#106;avascript:alert',
+            'javascript&colon;alert',
+            'JaVaScRiPt:alert',
+            '\x7fjavascript:alert',
+            'vbscript:msgbox',
+        ):
+            with self.subTest(url=url):
+                self.assertNotIn('<a ', markup.render(f'[click]({url})'))
+        for url in ('https://example.com/a:b', '/notes/?a=1&amp;b=2',
+                    'mailto:me@example.com', 'note-1'):
+            with self.subTest(url=url):
+                self.assertIn('<a ', markup.render(f'[click]({url})'))
+
+    def test_nested_emphasis(self):
+        """
+        Жирный и курсив вкладываются друг в друга.
+        """
+        cases = (
+            ('**а *б* в**', '<p><strong>а <em>б</em> в</strong></p>'),
+            ('*а **б** в*', '<p><em>а <strong>б</strong> в</em></p>'),
+            ('_snake_case_', '<p><em>snake_case</em></p>'),
+            ('__a_b__', '<p><strong>a_b</strong></p>'),
+        )
+        for text, html in cases:
+            with self.subTest(text=text):
+                self.assertEqual(markup.render(text), html)
+
+    def test_emphasis_time_is_linear(self):
+        """
+        Непарные ограничители выделения разбираются за линейное время.
+        """
+        for delimiter in ('*', '_', '**', '__'):
+            text = f'{delimiter}a ' * 20000
+            with self.subTest(delimiter=delimiter):
+                started = time.perf_counter()
+                html = markup.render(text)
+                self.assertLess(time.perf_counter() - started, 1)
+                self.assertNotIn('<em>', html)
+                self.assertNotIn('<strong>', html)
+
+    def test_deep_quote(self):
+        """
+        Вложенность цитат ограничена, лишние маркеры остаются текстом.
+        """
+        html = markup.render('>' * 500 + ' a')
+        self.assertEqual(
+            html.count('<blockquote>'), markup.MAX_QUOTE_DEPTH
+        )
+        self.assertIn('&gt;' * (500 - markup.MAX_QUOTE_DEPTH) + ' a', html)
+
+
+class TestRenderCache(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Author_user')
+        cls.author_client = Client()
+        cls.author_client.force_login(cls.author)
+        cls.note = Note.objects.create(
+            title='Заголовок', text='Текст *заметки*', slug='note-slug',
+            author=cls.author,
+        )
+        cls.URL_DETAIL = reverse('notes:detail', args=(cls.note.slug,))
+
+    def setUp(self):
+        cache.clear()
+
+    def counters(self):
+        return stats.get('markdown_hits', 'markdown_misses')
+
+    def test_rendered_once_per_edit(self):
+        """
+        Заметка отрисовывается один раз, после правки - заново.
+        """
+        before = self.counters()
+        for _ in range(3):
+            response = self.author_client.get(self.URL_DETAIL)
+            self.assertContains(response, 'Текст <em>заметки</em>')
+        self.author_client.post(reverse('notes:edit', args=('note-slug',)), {
+            'title': 'Заголовок', 'text': 'Новый **текст**',
+            'slug': 'note-slug',
+        })
+        response = self.author_client.get(self.URL_DETAIL)
+        self.assertContains(response, 'Новый <strong>текст</strong>')
+        after = self.counters()
+        for name in ('markdown_misses', 'markdown_hits'):
+            self.assertEqual(after[name] - before[name], 2)
+
+    def test_stats_command(self):
+        """
+        Команда показывает долю попаданий и время отрисовки.
+        """
+        markup.render_cached('Новый текст')
+        markup.render_cached('Новый текст')
+        output = StringIO()
+        call_command('notes_cache_stats', stdout=output)
+        self.assertIn('Markdown: попаданий', output.getvalue())
+        self.assertIn('Отрисовка Markdown', output.getvalue())
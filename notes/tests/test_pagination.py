@@ -0,0 +1,109 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from notes.models import Note
+
+User = get_user_model()
+
+
+@override_settings(NOTES_PAGE_SIZE=3)
+class TestNotesListPagination(TestCase):
+    NOTES_COUNT = 7
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Author_user')
+        cls.author_client = Client()
+        cls.author_client.force_login(cls.author)
+        cls.notes = [
+            Note.objects.create(
+                title=f'Заметка {index}',
+                text='Текст заметки',
+                slug=f'note-{index}',
+                author=cls.author,
+            )
+            for index in range(cls.NOTES_COUNT)
+        ]
+        cls.ids = [note.id for note in cls.notes]
+        cls.URL_NOTES_LIST = reverse('notes:list')
+
+    def setUp(self):
+        cache.clear()
+
+    def get_page(self, **params):
+        response = self.author_client.get(self.URL_NOTES_LIST, params)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        return response.context['page_obj']
+
+    def test_first_page(self):
+        """
+        Первая страница содержит NOTES_PAGE_SIZE заметок по порядку id
+        и курсор на следующую страницу.
+        """
+        page = self.get_page()
+        self.assertEqual([note.id for note in page], self.ids[:3])
+        self.assertFalse(page.has_previous())
+        self.assertEqual(page.next_cursor, self.ids[2])
+
+    def test_walk_forward_and_back(self):
+        """
+        По курсорам можно пройти все страницы вперёд и вернуться назад.
+        """
+        seen = []
+        params = {}
+        while True:
+            page = self.get_page(**params)
+            seen.extend(note.id for note in page)
+            if not page.has_next():
+                break
+            params = {'after': page.next_cursor}
+        self.assertEqual(seen, self.ids)
+
+        page = self.get_page(before=page.previous_cursor)
+        self.assertEqual([note.id for note in page], self.ids[3:6])
+
+    def test_text_is_deferred(self):
+        """
+        Список не загружает текст заметок.
+        """
+        page = self.get_page()
+        for note in page:
+            self.assertIn('text', note.get_deferred_fields())
+
+    def test_page_is_single_query(self):
+        """
+        Заметки страницы выбираются одним запросом без OFFSET.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            self.get_page(after=self.ids[2])
+        notes_queries = [
+            query['sql'] for query in queries.captured_queries
+            if 'notes_note' in query['sql']
+        ]
+        self.assertEqual(len(notes_queries), 1)
+        self.assertNotIn('OFFSET', notes_queries[0])
+        self.assertNotIn('"notes_note"."text"', notes_queries[0])
+
+    def test_invalid_cursor(self):
+        """
+        Некорректный курсор приводит к ошибке 404.
+        """
+        for params in (
+            {'after': 'abc'},
+            {'after': '-1'},
+            {'after': str(2 ** 63)},
+            {'before': '9' * 23},
+        ):
+            with self.subTest(params=params):
+                response = self.author_client.get(self.URL_NOTES_LIST, params)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+        response = self.author_client.get(
+            self.URL_NOTES_LIST, {'after': str(2 ** 63 - 1)}
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
@@ -0,0 +1,97 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from notes import tags
+from notes.models import Note
+
+User = get_user_model()
+
+# Полный просмотр таблицы заметок, в том числе по индексу.
+FULL_SCAN = re.compile(r'\bSCAN (TABLE )?notes_note\b')
+
+
+class TestQueryPlans(TestCase):
+    """
+    Запросы к заметкам во всех наследниках NoteBase используют индексы.
+
+    Для каждого запроса к таблице notes_note выполняется
+    EXPLAIN QUERY PLAN; полный просмотр таблицы или сортировка
+    во временном B-дереве считаются регрессией.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Author_user')
+        cls.author_client = Client()
+        cls.author_client.force_login(cls.author)
+        cls.another_user = User.objects.create(username='Another_user')
+        cls.notes = [
+            Note.objects.create(
+                title=f'Заметка {index}',
+                text='Текст заметки',
+                slug=f'note-{author.pk}-{index}',
+                author=author,
+            )
+            for author in (cls.author, cls.another_user)
+            for index in range(20)
+        ]
+        cls.note = Note.objects.filter(author=cls.author).first()
+        for note in cls.notes[::3]:
+            tags.set_note_tags(note, ['тег'])
+        cls.form_data = {
+            'title': 'Новая заметка',
+            'text': 'Текст',
+            'slug': 'new-note',
+        }
+
+    def setUp(self):
+        cache.clear()
+        if connection.vendor != 'sqlite':
+            self.skipTest('EXPLAIN QUERY PLAN есть только в SQLite')
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assert_uses_indexes(self, method, url, data=None):
+        with CaptureQueriesContext(connection) as queries:
+            getattr(self.author_client, method)(url, data)
+        notes_queries = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('SELECT')
+            and 'notes_note' in query['sql']
+        ]
+        self.assertTrue(notes_queries, f'{method.upper()} {url}')
+        for sql in notes_queries:
+            plan = '\n'.join(self.explain(sql))
+            with self.subTest(url=url, sql=sql):
+                self.assertIsNone(FULL_SCAN.search(plan), plan)
+                self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_views_use_indexes(self):
+        slug_args = (self.note.slug,)
+        requests = (
+            ('get', reverse('notes:list'), None),
+            ('get', reverse('notes:list'), {'after': self.note.id}),
+            ('get', reverse('notes:list'), {'before': self.note.id + 10}),
+            ('get', reverse('notes:list'), {'tag': 'тег'}),
+            ('get', reverse('notes:list'), {'tag': 'тег', 'after': 3}),
+            ('get', reverse('notes:detail', args=slug_args), None),
+            ('get', reverse('notes:edit', args=slug_args), None),
+            ('get', reverse('notes:delete', args=slug_args), None),
+            ('post', reverse('notes:add'), self.form_data),
+            ('post', reverse('notes:edit', args=slug_args), self.form_data),
+        )
+        for method, url, data in requests:
+            self.assert_uses_indexes(method, url, data)
+
+    def test_delete_uses_indexes(self):
+        url = reverse('notes:delete', args=(self.note.slug,))
+        self.assert_uses_indexes('post', url)
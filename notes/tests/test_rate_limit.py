@@ -0,0 +1,150 @@
+from http import HTTPStatus
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from notes import cache as notes_cache
+from notes import middleware
+
+User = get_user_model()
+
+LIMITS = {'read': (3, 0.5), 'write': (2, 0.5)}
+
+
+@override_settings(NOTES_RATE_LIMITS=LIMITS, NOTES_RATE_LIMIT_PROXIES=0)
+class TestRateLimit(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Author_user')
+        cls.author_client = Client()
+        cls.author_client.force_login(cls.author)
+        cls.another_user = User.objects.create(username='Another_user')
+        cls.another_client = Client()
+        cls.another_client.force_login(cls.another_user)
+        cls.URL_HOME = reverse('notes:home')
+        cls.URL_LIST = reverse('notes:list')
+        cls.URL_ADD = reverse('notes:add')
+
+    def setUp(self):
+        cache.clear()
+
+    def statuses(self, request, count):
+        return [request().status_code for _ in range(count)]
+
+    def test_read_budget(self):
+        """
+        После ёмкости корзины чтение получает 429 с Retry-After,
+        а запись и другой пользователь расходуют свои корзины.
+        """
+        self.assertNotIn(
+            HTTPStatus.TOO_MANY_REQUESTS,
+            self.statuses(lambda: self.author_client.get(self.URL_LIST), 3),
+        )
+        response = self.author_client.get(self.URL_LIST)
+        self.assertEqual(response.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '2')
+        response = self.author_client.post(self.URL_ADD, {})
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        response = self.another_client.get(self.URL_LIST)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_write_budget(self):
+        """
+        Анонимные запросы ограничиваются по IP-адресу.
+        """
+        url = reverse('users:login')
+        client = Client(REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(
+            self.statuses(lambda: client.post(url, {}), 3),
+            [HTTPStatus.OK, HTTPStatus.OK, HTTPStatus.TOO_MANY_REQUESTS],
+        )
+        response = Client(REMOTE_ADDR='10.0.0.2').post(url, {})
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    @override_settings(NOTES_RATE_LIMIT_PROXIES=1)
+    def test_forwarded_for(self):
+        """
+        За доверенным прокси адрес клиента берётся из X-Forwarded-For.
+        """
+        def get(address):
+            return self.client.get(
+                self.URL_HOME, HTTP_X_FORWARDED_FOR=f'1.1.1.1, {address}',
+            )
+
+        self.assertEqual(
+            self.statuses(lambda: get('10.0.0.1'), 4)[-1],
+            HTTPStatus.TOO_MANY_REQUESTS,
+        )
+        self.assertEqual(get('10.0.0.2').status_code, HTTPStatus.OK)
+
+    def test_refill(self):
+        """
+        Корзина пополняется со скоростью rate токенов в секунду.
+        """
+        def get_at(now):
+            with mock.patch('notes.ratelimit.time') as clock:
+                clock.time.return_value = now
+                return self.author_client.get(self.URL_HOME).status_code
+
+        self.assertEqual(
+            [get_at(1000.0) for _ in range(4)][-1],
+            HTTPStatus.TOO_MANY_REQUESTS,
+        )
+        self.assertEqual(get_at(1001.0), HTTPStatus.TOO_MANY_REQUESTS)
+        self.assertEqual(get_at(1002.0), HTTPStatus.OK)
+        self.assertEqual(get_at(1002.0), HTTPStatus.TOO_MANY_REQUESTS)
+
+    def test_metrics(self):
+        """
+        Отказы считаются и выводятся командой notes_cache_stats.
+        """
+        before = notes_cache.stats.get('rejected_read')['rejected_read']
+        self.statuses(lambda: self.author_client.get(self.URL_HOME), 5)
+        after = notes_cache.stats.get('rejected_read')['rejected_read']
+        self.assertEqual(after - before, 2)
+        output = StringIO()
+        call_command('notes_cache_stats', stdout=output)
+        self.assertIn(f'чтение, 429 - {after}', output.getvalue())
+
+
+class TestConcurrencyLimit(TestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.nested = []
+
+        def view(request):
+            # Второй запрос приходит, пока первый ещё обрабатывается.
+            if not request.GET:
+                self.nested.append(self.layer(self.factory.get('/?n=2')))
+            return HttpResponse('ok')
+
+        self.layer = middleware.ConcurrencyLimitMiddleware(view)
+
+    @override_settings(NOTES_MAX_CONCURRENT_REQUESTS=1)
+    def test_overload(self):
+        """
+        Сверх лимита одновременных запросов ответ - 503 с Retry-After;
+        после завершения запроса место освобождается.
+        """
+        response = self.layer(self.factory.get('/'))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        rejected = self.nested[0]
+        self.assertEqual(rejected.status_code, HTTPStatus.SERVICE_UNAVAILABLE)
+        self.assertEqual(rejected['Retry-After'], '1')
+        self.assertEqual(self.layer.active, 0)
+
+    @override_settings(NOTES_MAX_CONCURRENT_REQUESTS=0)
+    def test_unlimited(self):
+        """
+        Лимит 0 не ограничивает число запросов.
+        """
+        self.layer(self.factory.get('/'))
+        self.assertEqual(self.nested[0].status_code, HTTPStatus.OK)
@@ -0,0 +1,171 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from notes import revisions
+from notes.models import Note, NoteRevision
+
+User = get_user_model()
+
+
+class TestDelta(TestCase):
+
+    def test_round_trip(self):
+        """
+        Дельта восстанавливает новый текст из старого.
+        """
+        cases = (
+            ('', 'Новый текст'),
+            ('Одна строка', ''),
+            ('a\nb\nc\n', 'a\nB\nc\nd'),
+            ('a\r\nb\r\n', 'a\r\nb\r\nc\r\n'),
+            ('x\n' * 50, 'y\n' + 'x\n' * 49 + 'z'),
+            ('  отступ и  два пробела', ' отступ и два  пробела '),
+            ('a b a b a b', 'a b a b'),
+            ('одно и то же', 'одно и то же'),
+        )
+        for old, new in cases:
+            with self.subTest(old=old, new=new):
+                delta = revisions.make_delta(old, new)
+                self.assertEqual(revisions.apply_delta(old, delta), new)
+
+    def test_small_edit_is_compact(self):
+        """
+        Дельта небольшой правки много меньше текста.
+        """
+        old = ' '.join(f'слово{index}' for index in range(500))
+        new = old.replace('слово250', 'правка')
+        self.assertLess(len(revisions.make_delta(old, new)), 50)
+
+
+class TestRevisions(TestCase):
+
+    TEXT = 'Первая строка\nВторая строка'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Author_user')
+        cls.author_client = Client()
+        cls.author_client.force_login(cls.author)
+        cls.reader = User.objects.create(username='Reader_user')
+        cls.reader_client = Client()
+        cls.reader_client.force_login(cls.reader)
+        cls.note = Note.objects.create(
+            title='Заголовок', text=cls.TEXT, slug='note-slug',
+            author=cls.author,
+        )
+        cls.URL_EDIT = reverse('notes:edit', args=(cls.note.slug,))
+        cls.URL_HISTORY = reverse('notes:history', args=(cls.note.slug,))
+
+    def edit(self, text, title='Заголовок'):
+        response = self.author_client.post(self.URL_EDIT, {
+            'title': title, 'text': text, 'slug': self.note.slug,
+        })
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+    def texts(self):
+        return [
+            revisions.rebuild(self.note, number)
+            for number in range(1, self.note.revisions.count() + 1)
+        ]
+
+    def test_first_edit(self):
+        """
+        Первая правка сохраняет исходную версию и новую.
+        """
+        self.edit(self.TEXT + '\nТретья строка', title='Новый заголовок')
+        self.assertEqual(self.texts(), [
+            ('Заголовок', self.TEXT),
+            ('Новый заголовок', self.TEXT + '\nТретья строка'),
+        ])
+        first, second = self.note.revisions.order_by('number')
+        self.assertTrue(first.is_snapshot)
+        self.assertFalse(second.is_snapshot)
+
+    def test_unchanged(self):
+        """
+        Сохранение без изменений не создаёт ревизию.
+        """
+        self.edit(self.TEXT)
+        self.assertFalse(self.note.revisions.exists())
+
+    @override_settings(NOTES_REVISION_SNAPSHOT_EVERY=3)
+    def test_snapshots(self):
+        """
+        Каждая N-я ревизия хранится полным текстом.
+        """
+        expected = [self.TEXT]
+        for index in range(6):
+            expected.append(expected[-1] + f'\nСтрока {index}')
+            self.edit(expected[-1])
+        self.assertEqual(
+            list(self.note.revisions.order_by('number').values_list(
+                'base', flat=True
+            )),
+            [1, 1, 1, 4, 4, 4, 7],
+        )
+        self.assertEqual([text for _, text in self.texts()], expected)
+        with self.assertNumQueries(1):
+            revisions.rebuild(self.note, 6)
+
+    def test_change_outside_history(self):
+        """
+        Изменение в обход истории сохраняется снимком перед новой версией.
+        """
+        self.edit('Версия 1')
+        Note.objects.filter(pk=self.note.pk).update(text='Версия 2')
+        self.edit('Версия 3')
+        self.assertEqual(
+            [text for _, text in self.texts()],
+            [self.TEXT, 'Версия 1', 'Версия 2', 'Версия 3'],
+        )
+
+    def test_history_page(self):
+        """
+        Автор видит список ревизий, другой пользователь - нет.
+        """
+        self.edit('Новый текст')
+        response = self.author_client.get(self.URL_HISTORY)
+        self.assertContains(
+            response, reverse('notes:restore', args=(self.note.slug, 2))
+        )
+        response = self.reader_client.get(self.URL_HISTORY)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_restore(self):
+        """
+        Восстановление возвращает текст ревизии и пишет новую ревизию.
+        """
+        self.edit('Новый текст', title='Новый заголовок')
+        url = reverse('notes:restore', args=(self.note.slug, 1))
+        response = self.author_client.get(url)
+        self.assertContains(response, 'Вторая строка')
+        response = self.author_client.post(url)
+        self.assertRedirects(
+            response, reverse('notes:detail', args=(self.note.slug,))
+        )
+        self.note.refresh_from_db()
+        self.assertEqual(
+            (self.note.title, self.note.text), ('Заголовок', self.TEXT)
+        )
+        self.assertEqual(self.note.revisions.count(), 3)
+        self.assertEqual(self.texts()[-1], ('Заголовок', self.TEXT))
+
+    def test_restore_missing_revision(self):
+        """
+        Несуществующая ревизия и чужая заметка - 404.
+        """
+        self.edit('Новый текст')
+        cases = (
+            (self.author_client, 5),
+            (self.reader_client, 1),
+        )
+        for client, number in cases:
+            with self.subTest(number=number):
+                response = client.post(
+                    reverse('notes:restore', args=(self.note.slug, number))
+                )
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+        self.assertEqual(NoteRevision.objects.count(), 2)
@@ -0,0 +1,108 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from notes import search
+from notes.models import Note
+
+User = get_user_model()
+
+
+class TestSearch(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Author_user')
+        cls.author_client = Client()
+        cls.author_client.force_login(cls.author)
+        cls.another_user = User.objects.create(username='Another_user')
+
+        cls.title_note = Note.objects.create(
+            title='Рецепт борща',
+            text='Свекла, капуста и картофель.',
+            slug='borsch',
+            author=cls.author,
+        )
+        cls.text_note = Note.objects.create(
+            title='Покупки',
+            text='Купить свеклу для борща и <b>хлеб</b>.',
+            slug='shopping',
+            author=cls.author,
+        )
+        cls.another_note = Note.objects.create(
+            title='Чужой борщ',
+            text='Борщ другого пользователя.',
+            slug='another-borsch',
+            author=cls.another_user,
+        )
+        cls.URL_SEARCH = reverse('notes:search')
+
+    def setUp(self):
+        if not search.is_available():
+            self.skipTest('FTS5 доступен только в SQLite')
+
+    def get_results(self, query):
+        response = self.author_client.get(self.URL_SEARCH, {'q': query})
+        return response.context['results']
+
+    def test_results_are_ranked_and_scoped_to_author(self):
+        """
+        Совпадение в заголовке ранжируется выше совпадения в тексте,
+        заметки другого пользователя в результаты не попадают.
+        """
+        results = self.get_results('борща')
+        self.assertEqual(
+            [result.note for result in results],
+            [self.title_note, self.text_note],
+        )
+
+    def test_snippet_is_highlighted_and_escaped(self):
+        """
+        Совпадения выделены тегом mark, HTML из текста экранирован.
+        """
+        result, = self.get_results('хлеб')
+        self.assertIn('<mark>хлеб</mark>', result.snippet)
+        self.assertIn('&lt;b&gt;', result.snippet)
+
+    def test_query_operators_are_not_interpreted(self):
+        """
+        Синтаксис FTS5 в запросе не вызывает ошибку.
+        """
+        results = self.get_results('борща"* (')
+        self.assertEqual(len(results), 2)
+
+    def test_words_are_not_matched_against_author(self):
+        """
+        Слова запроса ищутся только в заголовке и тексте,
+        служебный столбец автора им не виден.
+        """
+        self.assertEqual(
+            self.get_results(search.author_token(self.author.pk)), []
+        )
+
+    def test_index_follows_edit_and_delete(self):
+        """
+        Индекс обновляется при сохранении и удалении заметки.
+        """
+        self.text_note.text = 'Купить молоко'
+        self.text_note.save()
+        self.assertEqual(
+            [result.note for result in self.get_results('молоко')],
+            [self.text_note],
+        )
+        self.text_note.delete()
+        self.assertEqual(self.get_results('молоко'), [])
+
+    def test_rebuild_command(self):
+        """
+        Команда rebuild_search_index восстанавливает индекс.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {search.FTS_TABLE}')
+        self.assertEqual(self.get_results('борща'), [])
+        call_command('rebuild_search_index', batch_size=1, stdout=StringIO())
+        self.assertEqual(len(self.get_results('борща')), 2)
@@ -0,0 +1,150 @@
+import json
+import re
+import time
+from http import HTTPStatus
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.template.loader import render_to_string
+from django.test import (
+    Client, RequestFactory, TestCase, TransactionTestCase, override_settings
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from notes import async_views, middleware
+from notes.middleware import ServerTimingMiddleware
+from notes.models import Note
+
+User = get_user_model()
+
+SLOW_RENDER = 0.02
+
+HEADER = re.compile(
+    r'db;dur=[\d.]+;desc="(?P<queries>\d+) queries", '
+    r'tpl;dur=(?P<tpl>[\d.]+), total;dur=[\d.]+'
+)
+
+
+def slow_render(*args, **kwargs):
+    time.sleep(SLOW_RENDER)
+    return render_to_string(*args, **kwargs)
+
+
+@override_settings(NOTES_SERVER_TIMING_PUBLIC=True)
+class TestServerTiming(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Author_user')
+        cls.author_client = Client()
+        cls.author_client.force_login(cls.author)
+        cls.note = Note.objects.create(
+            title='Заголовок', text='Текст', slug='note', author=cls.author
+        )
+        cls.URL_DETAIL = reverse('notes:detail', args=(cls.note.slug,))
+        cls.URL_LIST = reverse('notes:list')
+
+    def setUp(self):
+        cache.clear()
+
+    def get_timing(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.author_client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        match = HEADER.fullmatch(response['Server-Timing'])
+        self.assertIsNotNone(match, response['Server-Timing'])
+        return match, len(queries)
+
+    def test_header_counts_queries(self):
+        """
+        Заголовок Server-Timing содержит число выполненных SQL-запросов.
+        """
+        match, queries = self.get_timing(self.URL_DETAIL)
+        self.assertEqual(int(match['queries']), queries)
+
+    def test_template_time(self):
+        """
+        Время отрисовки шаблона учитывается отдельно.
+        """
+        match, _ = self.get_timing(self.URL_DETAIL)
+        self.assertGreater(float(match['tpl']), 0)
+
+    def test_list_fragment_time(self):
+        """
+        Фрагмент списка, отрисованный render_to_string, входит
+        во время шаблонов.
+        """
+        with mock.patch('notes.views.render_to_string',
+                        side_effect=slow_render) as render:
+            match, _ = self.get_timing(self.URL_LIST)
+        render.assert_called_once()
+        self.assertGreaterEqual(float(match['tpl']), SLOW_RENDER * 1000)
+
+    @override_settings(NOTES_SERVER_TIMING_PUBLIC=False)
+    def test_header_for_staff_only(self):
+        """
+        Заголовок получают только сотрудники.
+        """
+        response = self.author_client.get(self.URL_DETAIL)
+        self.assertNotIn('Server-Timing', response)
+        self.author.is_staff = True
+        self.author.save()
+        response = self.author_client.get(self.URL_DETAIL)
+        self.assertIn('Server-Timing', response)
+
+    def test_log_line(self):
+        """
+        Каждый запрос пишется в журнал строкой JSON.
+        """
+        with self.assertLogs('notes.timing', 'INFO') as logs:
+            self.author_client.get(self.URL_DETAIL)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(logs.records[0].levelname, 'INFO')
+        self.assertEqual(record['path'], self.URL_DETAIL)
+        self.assertEqual(record['status'], HTTPStatus.OK)
+        self.assertFalse(record['over_budget'])
+
+    @override_settings(NOTES_QUERY_BUDGET=1)
+    def test_over_budget(self):
+        """
+        Запрос сверх бюджета SQL-запросов пишется с уровнем WARNING.
+        """
+        with self.assertLogs('notes.timing', 'WARNING') as logs:
+            self.author_client.get(self.URL_DETAIL)
+        self.assertTrue(logs.records[0].timing['over_budget'])
+
+    def test_queries_outside_request(self):
+        """
+        Запросы вне обработки запроса не учитываются.
+        """
+        self.author_client.get(self.URL_DETAIL)
+        self.assertIsNone(middleware._current.get())
+
+
+@override_settings(NOTES_SERVER_TIMING_PUBLIC=True)
+class TestServerTimingAsync(TransactionTestCase):
+
+    def test_async_view_queries(self):
+        """
+        Запросы асинхронного представления из потока пула попадают
+        в замер запроса.
+        """
+        author = User.objects.create(username='Author_user')
+        Note.objects.create(
+            title='Заголовок', text='Текст', slug='note', author=author
+        )
+        request = RequestFactory().get('/note/note/')
+        request.user = author
+
+        async def view(request):
+            return await async_views.note_detail(request, slug='note')
+
+        response = async_to_sync(ServerTimingMiddleware(view))(request)
+        match = HEADER.fullmatch(response['Server-Timing'])
+        self.assertGreater(int(match['queries']), 0)
+        # Шаблон отрисован в потоке пула и тоже учтён.
+        self.assertGreater(float(match['tpl']), 0)
@@ -0,0 +1,85 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from pytils.translit import slugify
+
+from notes import slugs
+from notes.models import Note
+
+User = get_user_model()
+
+
+class TestSlugAllocator(TestCase):
+    TITLE = 'Заголовок заметки'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Author_user')
+        cls.author_client = Client()
+        cls.author_client.force_login(cls.author)
+        cls.SLUG = slugify(cls.TITLE)
+        cls.URL_NOTES_ADD = reverse('notes:add')
+
+    def create_note(self):
+        return Note.objects.create(
+            title=self.TITLE, text='Текст', author=self.author
+        )
+
+    def test_collisions_get_suffixes(self):
+        """
+        Одинаковые заголовки получают slug, slug-2, slug-3.
+        """
+        notes = [self.create_note() for _ in range(3)]
+        self.assertEqual(
+            [note.slug for note in notes],
+            [self.SLUG, f'{self.SLUG}-2', f'{self.SLUG}-3'],
+        )
+
+    def test_form_without_slug_gets_suffix(self):
+        """
+        Форма без slug не выдаёт ошибку при совпадении заголовков,
+        а заметка получает следующий свободный суффикс.
+        """
+        self.create_note()
+        with CaptureQueriesContext(connection) as queries:
+            self.author_client.post(
+                self.URL_NOTES_ADD, {'title': self.TITLE, 'text': 'Текст'}
+            )
+        self.assertTrue(Note.objects.filter(slug=f'{self.SLUG}-2').exists())
+        slug_queries = [
+            query for query in queries.captured_queries
+            if query['sql'].startswith('SELECT')
+            and '"notes_note"."slug"' in query['sql']
+        ]
+        self.assertEqual(len(slug_queries), 1)
+
+    def test_race_is_retried(self):
+        """
+        Если slug заняли между выбором и сохранением,
+        сохранение повторяется со следующим вариантом.
+        """
+        self.create_note()
+        with mock.patch.object(
+            slugs, 'taken_slugs', side_effect=[set(), {self.SLUG}]
+        ), mock.patch.object(slugs.random, 'randrange', return_value=0):
+            note = self.create_note()
+        self.assertEqual(note.slug, f'{self.SLUG}-2')
+
+    def test_suffix_fits_max_length(self):
+        """
+        Суффикс не выходит за максимальную длину slug.
+        """
+        base = 'a' * 10
+        slug = slugs.next_free_slug(base, {base}, max_length=10)
+        self.assertEqual(slug, 'a' * 8 + '-2')
+
+    def test_title_without_letters(self):
+        """
+        Для заголовка без букв и цифр используется slug по умолчанию.
+        """
+        note = Note.objects.create(title='!!!', text='', author=self.author)
+        self.assertEqual(note.slug, slugs.DEFAULT_SLUG)
@@ -0,0 +1,136 @@
+import gzip
+import shutil
+import tempfile
+from http import HTTPStatus
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.test import (
+    Client, SimpleTestCase, TestCase, override_settings
+)
+from django.urls import reverse
+
+from notes import storage
+
+CSS = 'vendor/bootstrap/css/bootstrap.min.css'
+
+
+class TestStaticFiles(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.static_root = tempfile.mkdtemp()
+        cls.settings_override = override_settings(
+            STATIC_ROOT=cls.static_root
+        )
+        cls.settings_override.enable()
+        call_command(
+            'collectstatic', interactive=False, verbosity=0,
+            ignore_patterns=['admin'],
+        )
+        cls.hashed = staticfiles_storage.stored_name(CSS)
+        with staticfiles_storage.open(CSS) as source:
+            cls.content = source.read()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        shutil.rmtree(cls.static_root)
+        super().tearDownClass()
+
+    def get(self, name, encoding=None):
+        headers = {'HTTP_ACCEPT_ENCODING': encoding} if encoding else {}
+        response = Client().get(f'/static/{name}', **headers)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        return response, b''.join(response.streaming_content)
+
+    def test_hashed_name_in_pages(self):
+        """
+        Страницы подключают локальную копию стилей с хешем в имени.
+        """
+        response = Client().get(reverse('notes:home'))
+        self.assertContains(response, f'/static/{self.hashed}')
+        self.assertNotContains(response, 'cdn.jsdelivr.net')
+
+    def test_precompressed_copies(self):
+        """
+        Команда collectstatic сохраняет сжатые копии файлов.
+        """
+        path = staticfiles_storage.path(self.hashed)
+        with open(path + '.gz', 'rb') as compressed:
+            self.assertEqual(gzip.decompress(compressed.read()), self.content)
+
+    def test_gzip(self):
+        """
+        Клиенту с gzip отдаётся сжатая копия с вечным кэшированием.
+        """
+        response, body = self.get(self.hashed, 'gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(body), self.content)
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertNotIn('Content-Disposition', response)
+
+    def test_brotli(self):
+        """
+        Brotli предпочитается gzip, если клиент его принимает.
+        """
+        if storage.brotli is None:
+            self.skipTest('brotli не установлен')
+        response, body = self.get(self.hashed, 'gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(storage.brotli.decompress(body), self.content)
+
+    def test_identity(self):
+        """
+        Без Accept-Encoding и при q=0 файл отдаётся несжатым.
+        """
+        for encoding in (None, 'gzip;q=0'):
+            with self.subTest(encoding=encoding):
+                response, body = self.get(self.hashed, encoding)
+                self.assertNotIn('Content-Encoding', response)
+                self.assertEqual(body, self.content)
+
+    def test_precompressed_copy_requested_directly(self):
+        """
+        Сжатая копия, запрошенная по имени, отдаётся архивом,
+        а не стилями без Content-Encoding.
+        """
+        response, body = self.get(self.hashed + '.gz')
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertNotIn('Content-Encoding', response)
+        self.assertEqual(gzip.decompress(body), self.content)
+
+    def test_unhashed_name(self):
+        """
+        Файл без хеша в имени кэшируется ограниченное время.
+        """
+        response, _ = self.get(CSS)
+        self.assertNotIn('immutable', response['Cache-Control'])
+
+    def test_outside_static_root(self):
+        """
+        Пути за пределами STATIC_ROOT не отдаются.
+        """
+        response = Client().get('/static/../settings.py')
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+
+class TestManifestStrict(SimpleTestCase):
+
+    def test_missing_manifest(self):
+        """
+        Без манифеста строгое хранилище сообщает об ошибке,
+        нестрогое ссылается на исходное имя.
+        """
+        with tempfile.TemporaryDirectory() as location:
+            with override_settings(NOTES_STATIC_MANIFEST_STRICT=True):
+                strict = storage.CompressedManifestStaticFilesStorage(
+                    location=location
+                )
+                with self.assertRaises(ValueError):
+                    strict.url(CSS)
+            with override_settings(NOTES_STATIC_MANIFEST_STRICT=False):
+                self.assertEqual(strict.stored_name(CSS), CSS)
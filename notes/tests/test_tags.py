@@ -0,0 +1,140 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from notes import tags
+from notes.forms import MAX_TAGS
+from notes.models import Note, NoteTag, TagCount
+
+User = get_user_model()
+
+
+class TestTags(TestCase):
+
+    URL_ADD = reverse('notes:add')
+    URL_LIST = reverse('notes:list')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Author_user')
+        cls.author_client = Client()
+        cls.author_client.force_login(cls.author)
+        cls.reader = User.objects.create(username='Reader_user')
+        cls.note = Note.objects.create(
+            title='Заголовок', text='Текст', slug='note-slug',
+            author=cls.author,
+        )
+        tags.set_note_tags(cls.note, ['работа', 'идеи'])
+        other = Note.objects.create(
+            title='Чужая', text='Текст', slug='other', author=cls.reader,
+        )
+        tags.set_note_tags(other, ['работа'])
+
+    def setUp(self):
+        cache.clear()
+
+    def counts(self, author=None):
+        return dict(
+            TagCount.objects.filter(author=author or self.author).values_list(
+                'tag__name', 'count'
+            )
+        )
+
+    def post(self, url, tags_value, slug='new'):
+        response = self.author_client.post(url, {
+            'title': 'Заметка', 'text': 'Текст', 'slug': slug,
+            'tags': tags_value,
+        })
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+    def test_create_and_update(self):
+        """
+        Теги из формы сохраняются, счётчики меняются на разницу.
+        """
+        self.post(self.URL_ADD, ' Работа, покупки ,,работа')
+        note = Note.objects.get(slug='new')
+        self.assertEqual(tags.note_tags(note), ['покупки', 'работа'])
+        self.assertEqual(
+            self.counts(), {'работа': 2, 'идеи': 1, 'покупки': 1}
+        )
+        self.post(reverse('notes:edit', args=('new',)), 'идеи')
+        self.assertEqual(tags.note_tags(note), ['идеи'])
+        self.assertEqual(
+            self.counts(), {'работа': 1, 'идеи': 2, 'покупки': 0}
+        )
+        self.assertEqual(self.counts(self.reader), {'работа': 1})
+
+    def test_edit_form_initial(self):
+        """
+        Форма редактирования показывает теги заметки.
+        """
+        response = self.author_client.get(
+            reverse('notes:edit', args=(self.note.slug,))
+        )
+        self.assertEqual(
+            response.context['form'].initial['tags'], 'идеи, работа'
+        )
+
+    def test_too_many_tags(self):
+        """
+        Больше MAX_TAGS тегов сохранить нельзя.
+        """
+        response = self.author_client.post(self.URL_ADD, {
+            'title': 'Заметка', 'text': 'Текст', 'slug': 'new',
+            'tags': ','.join(f'тег{index}' for index in range(MAX_TAGS + 1)),
+        })
+        self.assertFormError(
+            response, 'form', 'tags', f'Не больше {MAX_TAGS} тегов'
+        )
+        self.assertFalse(Note.objects.filter(slug='new').exists())
+
+    def test_delete(self):
+        """
+        Удаление заметки уменьшает счётчики и удаляет связи.
+        """
+        self.author_client.post(reverse('notes:delete', args=('note-slug',)))
+        self.assertEqual(self.counts(), {'работа': 0, 'идеи': 0})
+        self.assertEqual(self.counts(self.reader), {'работа': 1})
+        self.assertFalse(NoteTag.objects.filter(note_id=self.note.pk).exists())
+
+    def test_filter_and_cloud(self):
+        """
+        Список фильтруется по тегу, облако читается из счётчиков.
+        """
+        self.post(self.URL_ADD, 'покупки')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.author_client.get(self.URL_LIST, {'tag': 'Идеи'})
+        self.assertContains(
+            response, reverse('notes:detail', args=('note-slug',))
+        )
+        self.assertNotContains(
+            response, reverse('notes:detail', args=('new',))
+        )
+        self.assertContains(response, '?tag=%D0%BF%D0%BE%D0%BA%D1%83%D0%BF')
+        self.assertEqual(
+            [item.name for item in response.context['tag_cloud']],
+            ['идеи', 'покупки', 'работа'],
+        )
+        for query in queries.captured_queries:
+            self.assertNotIn('GROUP BY', query['sql'])
+
+    def test_pagination_keeps_tag(self):
+        """
+        Ссылки на соседние страницы сохраняют фильтр по тегу.
+        """
+        for index in range(3):
+            note = Note.objects.create(
+                title='Заметка', text='Текст', slug=f'tagged-{index}',
+                author=self.author,
+            )
+            tags.set_note_tags(note, ['идеи'])
+        with self.settings(NOTES_PAGE_SIZE=2):
+            response = self.author_client.get(self.URL_LIST, {'tag': 'идеи'})
+        self.assertContains(
+            response, '?tag=%D0%B8%D0%B4%D0%B5%D0%B8&amp;after='
+        )
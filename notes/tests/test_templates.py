@@ -0,0 +1,129 @@
+from http import HTTPStatus
+from unittest import skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.template import engines
+from django.template.loaders.cached import Loader
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from notes.models import Note
+from notes.templatetags import notes_urls
+
+try:
+    import jinja2
+except ImportError:
+    jinja2 = None
+
+User = get_user_model()
+
+JINJA2_TEMPLATES = [{
+    'BACKEND': 'django.template.backends.jinja2.Jinja2',
+    'APP_DIRS': True,
+    'OPTIONS': {
+        'environment': 'notes.jinja_env.environment',
+        'context_processors': settings.CONTEXT_PROCESSORS,
+    },
+}] + settings.TEMPLATES
+
+
+class TestTemplateLoading(TestCase):
+
+    def test_cached_loader(self):
+        """
+        Шаблоны Django загружаются через кэширующий загрузчик.
+        """
+        loaders = engines['django'].engine.template_loaders
+        self.assertIsInstance(loaders[0], Loader)
+
+    def test_static_url_is_memoized(self):
+        """
+        Адрес из {% static_url %} вычисляется один раз.
+        """
+        notes_urls.cached_url('notes:home')
+        hits = notes_urls._reverse.cache_info().hits
+        self.assertEqual(
+            notes_urls.cached_url('notes:home'), reverse('notes:home')
+        )
+        self.assertEqual(notes_urls._reverse.cache_info().hits, hits + 1)
+
+
+@skipUnless(jinja2, 'jinja2 не установлен')
+@override_settings(TEMPLATES=JINJA2_TEMPLATES)
+class TestJinja2Pages(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Author_user')
+        cls.author_client = Client()
+        cls.author_client.force_login(cls.author)
+        cls.note = Note.objects.create(
+            title='Заголовок', text='Текст заметки', slug='note-slug',
+            author=cls.author,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def assert_page(self, name, args=None, contains=()):
+        response = self.author_client.get(reverse(name, args=args))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertContains(response, reverse('notes:list'))
+        self.assertContains(response, self.author.username)
+        for text in contains:
+            self.assertContains(response, text)
+
+    def test_pages(self):
+        """
+        Страницы заметок отрисовываются шаблонами Jinja2.
+        """
+        slug = (self.note.slug,)
+        cases = (
+            ('notes:home', None, ('О проекте',)),
+            ('notes:list', None, (
+                reverse('notes:detail', args=slug), 'format=ndjson'
+            )),
+            ('notes:detail', slug, (
+                self.note.text, reverse('notes:edit', args=slug)
+            )),
+            ('notes:add', None, ('csrfmiddlewaretoken', 'name="title"')),
+            ('notes:edit', slug, ('value="Заголовок"',)),
+            ('notes:delete', slug, ('csrfmiddlewaretoken',)),
+            ('notes:success', None, ('Успешно',)),
+            ('notes:search', None, ('Поиск по заметкам',)),
+            ('notes:history', slug, ('Заметка ещё не изменялась',)),
+        )
+        for name, args, contains in cases:
+            with self.subTest(name=name):
+                self.assert_page(name, args, contains)
+
+    def test_search_results(self):
+        """
+        Подсветка в результатах поиска не экранируется повторно.
+        """
+        response = self.author_client.get(
+            reverse('notes:search'), {'q': 'заметки'}
+        )
+        self.assertContains(response, '<mark>заметки</mark>')
+
+    def test_markdown(self):
+        """
+        Отрисованный Markdown не экранируется повторно.
+        """
+        Note.objects.filter(pk=self.note.pk).update(text='**Жирный** текст')
+        response = self.author_client.get(
+            reverse('notes:detail', args=(self.note.slug,))
+        )
+        self.assertContains(response, '<p><strong>Жирный</strong> текст</p>')
+
+    def test_form_errors(self):
+        """
+        Ошибки формы выводятся и экранируются.
+        """
+        response = self.author_client.post(reverse('notes:add'), {
+            'title': 'Новая', 'text': 'Текст', 'slug': self.note.slug,
+        })
+        self.assertContains(response, 'alert-danger')
+        self.assertContains(response, 'такой slug уже существует')
@@ -0,0 +1,185 @@
+import json
+from io import StringIO
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from notes import fields, revisions
+from notes.models import Note
+
+User = get_user_model()
+
+LONG_TEXT = 'Длинный текст заметки про молоко и хлеб. ' * 300
+
+
+def stored_text(note):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT text FROM notes_note WHERE id = %s', [note.pk])
+        return cursor.fetchone()[0]
+
+
+class TestCompressedText(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Author_user')
+        cls.author_client = Client()
+        cls.author_client.force_login(cls.author)
+        cls.note = Note.objects.create(
+            title='Большая', text=LONG_TEXT, slug='big', author=cls.author,
+        )
+        cls.short = Note.objects.create(
+            title='Маленькая', text='Короткий текст', slug='small',
+            author=cls.author,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_storage(self):
+        """
+        Длинный текст хранится сжатым, короткий - как есть.
+        """
+        raw = stored_text(self.note)
+        self.assertTrue(raw.startswith(fields.PREFIX + 'z'))
+        self.assertLess(len(raw), len(LONG_TEXT) // 10)
+        self.assertEqual(stored_text(self.short), 'Короткий текст')
+
+    def test_lazy_unpack(self):
+        """
+        Текст распаковывается при обращении и не пересжимается при save.
+        """
+        note = Note.objects.get(pk=self.note.pk)
+        self.assertIsInstance(note.__dict__['text'], fields.PackedText)
+        field = Note._meta.get_field('text')
+        self.assertEqual(
+            field.get_db_prep_save(field.pre_save(note, False), connection),
+            stored_text(self.note),
+        )
+        self.assertIsInstance(note.__dict__['text'], fields.PackedText)
+        self.assertEqual(note.text, LONG_TEXT)
+        self.assertIsInstance(note.__dict__['text'], str)
+
+    def test_values_list(self):
+        """
+        values_list() возвращает сжатое значение, unpack() - строку.
+        """
+        value = Note.objects.values_list('text', flat=True).get(
+            pk=self.note.pk
+        )
+        self.assertEqual(fields.unpack(value), LONG_TEXT)
+
+    def test_prefixed_text(self):
+        """
+        Текст, похожий на сжатый, сжимается всегда и читается верно.
+        """
+        text = fields.PREFIX + 'z не сжатый'
+        note = Note.objects.create(
+            title='Префикс', text=text, slug='prefix', author=self.author,
+        )
+        self.assertEqual(Note.objects.get(pk=note.pk).text, text)
+
+    @skipUnless(fields.zstandard, 'zstandard не установлен')
+    @override_settings(NOTES_TEXT_COMPRESSION='zstd')
+    def test_zstd(self):
+        """
+        Текст сжимается zstd, старые значения zlib читаются.
+        """
+        note = Note.objects.create(
+            title='Zstd', text=LONG_TEXT + 'zstd', slug='zstd',
+            author=self.author,
+        )
+        self.assertTrue(stored_text(note).startswith(fields.PREFIX + 's'))
+        self.assertEqual(Note.objects.get(pk=note.pk).text, LONG_TEXT + 'zstd')
+        self.assertEqual(Note.objects.get(pk=self.note.pk).text, LONG_TEXT)
+
+    def test_pages(self):
+        """
+        Страница заметки, форма, поиск и выгрузка видят исходный текст.
+        """
+        slug = (self.note.slug,)
+        response = self.author_client.get(reverse('notes:detail', args=slug))
+        self.assertContains(response, LONG_TEXT[:100])
+        response = self.author_client.get(reverse('notes:edit', args=slug))
+        self.assertEqual(response.context['form'].initial['text'], LONG_TEXT)
+        response = self.author_client.get(
+            reverse('notes:search'), {'q': 'молоко'}
+        )
+        self.assertContains(response, reverse('notes:detail', args=slug))
+        response = self.author_client.get(
+            reverse('notes:export'), {'format': 'ndjson'}
+        )
+        rows = [
+            json.loads(line)
+            for line in b''.join(response.streaming_content).splitlines()
+        ]
+        self.assertIn(LONG_TEXT, [row['text'] for row in rows])
+
+    def test_revision_snapshot(self):
+        """
+        Длинный снимок в истории тоже сжат и восстанавливается.
+        """
+        self.author_client.post(reverse('notes:edit', args=('big',)), {
+            'title': 'Большая', 'text': LONG_TEXT + 'правка', 'slug': 'big',
+        })
+        snapshot = self.note.revisions.values_list('data', flat=True).get(
+            number=1
+        )
+        self.assertIsInstance(snapshot, fields.PackedText)
+        self.assertEqual(revisions.rebuild(self.note, 1)[1], LONG_TEXT)
+        self.assertEqual(
+            revisions.rebuild(self.note, 2)[1], LONG_TEXT + 'правка'
+        )
+
+
+class TestCompressCommand(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create(username='Author_user')
+        with override_settings(NOTES_TEXT_COMPRESS_MIN_SIZE=10 ** 9):
+            cls.notes = [
+                Note.objects.create(
+                    title=f'Заметка {index}', text=LONG_TEXT + str(index),
+                    slug=f'note-{index}', author=author,
+                )
+                for index in range(5)
+            ] + [Note.objects.create(
+                title='Короткая', text='Текст', slug='short', author=author,
+            )]
+
+    def compress_notes(self, *args):
+        out = StringIO()
+        call_command('compress_notes', '--batch-size=2', *args, stdout=out)
+        return out.getvalue()
+
+    def test_compress_and_decompress(self):
+        """
+        Команда сжимает старые заметки, не меняя текст и время изменения.
+        """
+        updated = {note.pk: note.updated for note in self.notes}
+        output = self.compress_notes()
+        self.assertIn('строк 6, изменено 5, сжато 5', output)
+        for note in Note.objects.all():
+            self.assertEqual(note.updated, updated[note.pk])
+            if note.slug != 'short':
+                self.assertTrue(stored_text(note).startswith(fields.PREFIX))
+                self.assertTrue(note.text.startswith(LONG_TEXT))
+        self.assertIn('изменено 0', self.compress_notes())
+        self.compress_notes('--decompress')
+        for note in self.notes:
+            self.assertEqual(stored_text(note), note.text)
+
+    def test_dry_run(self):
+        """
+        Пробный запуск считает экономию, но не пишет в базу.
+        """
+        output = self.compress_notes('--dry-run')
+        self.assertIn('изменено 5', output)
+        self.assertIn('база не изменена', output)
+        self.assertEqual(stored_text(self.notes[0]), self.notes[0].text)
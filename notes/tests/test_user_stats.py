@@ -0,0 +1,161 @@
+import json
+from importlib import import_module
+from io import StringIO
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from notes import stats
+from notes.models import Note, UserStats
+
+User = get_user_model()
+
+
+class TestUserStats(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Author_user')
+        cls.author_client = Client()
+        cls.author_client.force_login(cls.author)
+        cls.reader = User.objects.create(username='Reader_user')
+        cls.note = Note.objects.create(
+            title='Заголовок', text='Текст', slug='note-slug',
+            author=cls.author,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def assert_stats(self, author=None):
+        """Сводка совпадает с подсчётом по заметкам."""
+        author = author or self.author
+        notes = Note.objects.filter(author=author)
+        row = UserStats.objects.get(author=author)
+        self.assertEqual(
+            (row.notes, row.size),
+            (len(notes), sum(len(n.title) + len(n.text) for n in notes)),
+        )
+        return row
+
+    def post(self, url, text, slug='new'):
+        self.author_client.post(url, {
+            'title': 'Заметка', 'text': text, 'slug': slug,
+        })
+
+    def test_views(self):
+        """
+        Создание, правка и удаление заметки меняют сводку.
+        """
+        self.assertEqual(self.assert_stats().notes, 1)
+        self.post(reverse('notes:add'), 'Новый текст')
+        row = self.assert_stats()
+        self.assertEqual(row.notes, 2)
+        self.assertEqual(
+            row.last_edited, Note.objects.get(slug='new').updated
+        )
+        self.post(reverse('notes:edit', args=('new',)), 'Короче')
+        self.assert_stats()
+        self.author_client.post(reverse('notes:delete', args=('new',)))
+        self.assertEqual(self.assert_stats().notes, 1)
+        self.assertFalse(UserStats.objects.filter(author=self.reader).exists())
+
+    @override_settings(NOTES_TEXT_COMPRESS_MIN_SIZE=100)
+    def test_compressed_text(self):
+        """
+        Размер сжатой заметки считается по исходному тексту,
+        в том числе при пересчёте.
+        """
+        self.post(reverse('notes:add'), 'Длинный текст. ' * 50)
+        self.post(reverse('notes:edit', args=('new',)), 'Другой текст. ' * 40)
+        self.assert_stats()
+        UserStats.objects.update(size=0)
+        call_command('reconcile_note_stats', stdout=StringIO())
+        self.assert_stats()
+
+    def test_batch_api(self):
+        """
+        Пакетное API обновляет сводку одним изменением на пакет.
+        """
+        self.author_client.post(
+            reverse('notes:batch'),
+            json.dumps({'operations': [
+                {'op': 'create', 'title': 'Новая', 'text': 'Текст'},
+                {'op': 'update', 'slug': 'note-slug', 'text': 'Другой'},
+            ]}),
+            content_type='application/json',
+        )
+        self.assertEqual(self.assert_stats().notes, 2)
+        self.author_client.post(
+            reverse('notes:batch'),
+            json.dumps({'operations': [{'op': 'delete', 'slug': 'novaya'}]}),
+            content_type='application/json',
+        )
+        self.assertEqual(self.assert_stats().notes, 1)
+
+    def test_header(self):
+        """
+        Шапка показывает сводку, прочитанную одним запросом из кэша.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.author_client.get(reverse('notes:home'))
+        self.assertContains(response, 'заметок: 1')
+        self.assertContains(response, 'символов: 14')
+        stats_queries = [
+            query['sql'] for query in queries.captured_queries
+            if 'notes_userstats' in query['sql']
+        ]
+        self.assertEqual(len(stats_queries), 1)
+        with CaptureQueriesContext(connection) as queries:
+            self.author_client.get(reverse('notes:home'))
+        self.assertFalse([
+            query for query in queries.captured_queries
+            if 'notes_userstats' in query['sql']
+        ])
+        self.post(reverse('notes:add'), 'Новый текст')
+        response = self.author_client.get(reverse('notes:home'))
+        self.assertContains(response, 'заметок: 2')
+
+    def test_reconcile(self):
+        """
+        Команда пересчитывает испорченные и недостающие сводки.
+        """
+        UserStats.objects.filter(author=self.author).update(notes=5, size=0)
+        Note.objects.create(
+            title='Чужая', text='Текст', slug='other', author=self.reader,
+        )
+        UserStats.objects.filter(author=self.reader).delete()
+        stats.get_stats(self.author.pk)
+        output = StringIO()
+        call_command('reconcile_note_stats', '--batch-size=1', stdout=output)
+        self.assertIn('пользователей 2, исправлено 2', output.getvalue())
+        self.assert_stats()
+        self.assert_stats(self.reader)
+        self.assertEqual(stats.get_stats(self.author.pk).notes, 1)
+        output = StringIO()
+        call_command('reconcile_note_stats', stdout=output)
+        self.assertIn('исправлено 0', output.getvalue())
+
+    def test_backfill_migration(self):
+        """
+        Миграция заполняет сводки по уже существующим заметкам.
+        """
+        migration = import_module('notes.migrations.0010_backfill_user_stats')
+        Note.objects.create(
+            title='Чужая', text='Текст', slug='other', author=self.reader,
+        )
+        UserStats.objects.filter(author=self.author).update(notes=5, size=0)
+        UserStats.objects.filter(author=self.reader).delete()
+        migration.backfill_user_stats(apps, None)
+        self.assert_stats()
+        row = self.assert_stats(self.reader)
+        self.assertEqual(
+            row.last_edited,
+            Note.objects.get(slug='other').updated,
+        )
@@ -1,9 +1,84 @@
+import hashlib
+
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.urls import reverse_lazy
+from django.core.paginator import InvalidPage
+from django.db import transaction
+from django.db.models.functions import Length
+from django.http import Http404, HttpResponseRedirect, StreamingHttpResponse
+from django.template.loader import render_to_string
+from django.urls import reverse, reverse_lazy
+from django.utils.decorators import method_decorator
+from django.utils.safestring import mark_safe
 from django.views import generic
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 
+from . import cache, exchange, revisions, search, stats, tags
 from .forms import NoteForm
-from .models import Note
+from .middleware import template_timer
+from .models import Note, NoteRevision
+from .pagination import KeysetPaginator
+
+
+def _make_etag(*parts):
+    return hashlib.md5(':'.join(map(str, parts)).encode()).hexdigest()
+
+
+def _note_validators(request, slug):
+    """
+    Id и время изменения заметки одним запросом по индексу (author, slug).
+
+    Результат запоминается на запросе: condition() вызывает функции
+    для ETag и Last-Modified по отдельности.
+    """
+    if not hasattr(request, '_note_validators'):
+        request._note_validators = Note.objects.filter(
+            author=request.user, slug=slug
+        ).values_list('id', 'updated').first()
+    return request._note_validators
+
+
+def _header_stats(request):
+    """Сводка из шапки страницы: от неё зависит общая часть ответа."""
+    note_stats = stats.get_stats(request.user.pk)
+    return note_stats.notes, note_stats.size, note_stats.last_edited
+
+
+def note_etag(request, slug):
+    validators = _note_validators(request, slug)
+    if validators is None:
+        return None
+    note_id, updated = validators
+    # Версия списка меняется при любом изменении заметок автора,
+    # а от них зависит и общая часть страницы.
+    return _make_etag(
+        note_id, updated.timestamp(), cache.list_version(request.user.pk),
+        *_header_stats(request),
+    )
+
+
+def note_last_modified(request, slug):
+    validators = _note_validators(request, slug)
+    if validators is None:
+        return None
+    last_edited = _header_stats(request)[2]
+    return max(validators[1], last_edited or validators[1])
+
+
+def notes_list_etag(request):
+    return _make_etag(
+        request.user.pk,
+        cache.list_version(request.user.pk),
+        request.GET.urlencode(),
+        settings.NOTES_PAGE_SIZE,
+        *_header_stats(request),
+    )
+
+
+# Страницы заметок личные: браузер хранит их у себя
+# и перепроверяет условным запросом при каждом открытии.
+revalidate = cache_control(private=True, no_cache=True)
 
 
 class Home(generic.TemplateView):
@@ -26,34 +101,210 @@ class NoteBase(LoginRequiredMixin):
         return self.model.objects.filter(author=self.request.user)
 
 
+@method_decorator(transaction.atomic, name='post')
 class NoteCreate(NoteBase, generic.CreateView):
     """Добавление заметки."""
     template_name = 'notes/form.html'
     form_class = NoteForm
 
     def form_valid(self, form):
-        new_note = form.save(commit=False)
-        new_note.author = self.request.user
-        new_note.save()
+        form.instance.author = self.request.user
         return super().form_valid(form)
 
 
-class NoteUpdate(NoteBase, generic.UpdateView):
+class HistoryMixin:
+    """
+    Изменение заметки с записью ревизии.
+
+    POST выполняется в транзакции, и заметка читается с блокировкой:
+    дельта строится от того текста, который сейчас в базе, без
+    отдельного запроса за ним.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method != 'POST':
+            return queryset
+        return queryset.select_for_update()
+
+
+@method_decorator(transaction.atomic, name='post')
+class NoteUpdate(HistoryMixin, NoteBase, generic.UpdateView):
     """Редактирование заметки."""
     template_name = 'notes/form.html'
     form_class = NoteForm
 
+    def form_valid(self, form):
+        # Время изменения не входит в форму и ещё не обновлено.
+        previous_updated = form.instance.updated
+        response = super().form_valid(form)
+        revisions.record_revision(
+            form.instance, form.initial['title'], form.initial['text'],
+            previous_updated,
+        )
+        return response
+
 
 class NoteDelete(NoteBase, generic.DeleteView):
     """Удаление заметки."""
     template_name = 'notes/delete.html'
 
 
+@method_decorator((revalidate, condition(etag_func=notes_list_etag)),
+                  name='get')
 class NotesList(NoteBase, generic.ListView):
     """Список всех заметок пользователя."""
     template_name = 'notes/list.html'
+    fragment_template_name = 'notes/includes/list_items.html'
+    paginator_class = KeysetPaginator
+    # Шаблону списка нужны только эти поля, текст заметки не загружаем.
+    list_fields = ('id', 'slug', 'title')
+
+    def get(self, request, *args, **kwargs):
+        self.fragment_key = cache.list_fragment_key(
+            request.user.pk,
+            {**request.GET.dict(), 'page_size': settings.NOTES_PAGE_SIZE},
+        )
+        self.fragment = cache.get_list_fragment(self.fragment_key)
+        return super().get(request, *args, **kwargs)
+
+    def get_queryset(self):
+        queryset = super().get_queryset().only(*self.list_fields)
+        tag = self.request.GET.get('tag')
+        if tag:
+            queryset = queryset.filter(tags__name=tags.normalize(tag))
+        return queryset
+
+    def get_paginate_by(self, queryset):
+        if self.fragment is not None:
+            # Страница уже отрисована, выбирать заметки не нужно.
+            return None
+        return settings.NOTES_PAGE_SIZE
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        if self.fragment is None:
+            context['tag'] = self.request.GET.get('tag', '')
+            context['tag_cloud'] = tags.cloud(self.request.user)
+            with template_timer():
+                fragment = render_to_string(
+                    self.fragment_template_name, context, self.request
+                )
+            self.fragment = cache.set_list_fragment(
+                self.fragment_key, fragment
+            )
+        context['list_fragment'] = mark_safe(self.fragment)
+        return context
 
+    def paginate_queryset(self, queryset, page_size):
+        """Страница выбирается по курсору ?after=<id> или ?before=<id>."""
+        paginator = self.get_paginator(queryset, page_size)
+        try:
+            page = paginator.page(
+                after=self.request.GET.get('after'),
+                before=self.request.GET.get('before'),
+            )
+        except InvalidPage as error:
+            raise Http404(str(error))
+        return paginator, page, page.object_list, page.has_other_pages()
 
+
+@method_decorator(
+    (
+        revalidate,
+        condition(
+            etag_func=note_etag, last_modified_func=note_last_modified
+        ),
+    ),
+    name='get',
+)
 class NoteDetail(NoteBase, generic.DetailView):
     """Заметка подробно."""
     template_name = 'notes/detail.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['tags'] = tags.note_tags(self.object)
+        return context
+
+
+class NoteHistory(NoteBase, generic.DetailView):
+    """Список ревизий заметки."""
+    template_name = 'notes/history.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Сами тексты и дельты списку не нужны, только их размер.
+        context['revisions'] = self.object.revisions.only(
+            'number', 'base', 'title', 'created'
+        ).annotate(size=Length('data')).order_by('-number')
+        return context
+
+
+@method_decorator(transaction.atomic, name='post')
+class NoteRestore(HistoryMixin, NoteBase, generic.DetailView):
+    """Просмотр ревизии и восстановление заметки до неё."""
+    template_name = 'notes/restore.html'
+
+    def get_object(self, queryset=None):
+        note = super().get_object(queryset)
+        try:
+            self.revision = revisions.rebuild(note, self.kwargs['number'])
+        except NoteRevision.DoesNotExist as error:
+            raise Http404(str(error))
+        return note
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['number'] = self.kwargs['number']
+        context['revision_title'], context['revision_text'] = self.revision
+        return context
+
+    def post(self, request, *args, **kwargs):
+        """Восстановление записывается новой ревизией."""
+        note = self.get_object()
+        previous = (note.title, note.text, note.updated)
+        note.title, note.text = self.revision
+        note.save(update_fields=('title', 'text', 'updated'))
+        revisions.record_revision(note, *previous)
+        return HttpResponseRedirect(
+            reverse('notes:detail', args=(note.slug,))
+        )
+
+
+class NoteSearch(NoteBase, generic.TemplateView):
+    """Полнотекстовый поиск по заметкам пользователя."""
+    template_name = 'notes/search.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        query = self.request.GET.get('q', '').strip()
+        context['query'] = query
+        context['results'] = search.search_notes(
+            self.get_queryset(), self.request.user.pk, query
+        ) if query else []
+        return context
+
+
+class NoteExport(NoteBase, generic.View):
+    """Выгрузка всех заметок пользователя потоковым ответом."""
+    formats = {
+        'ndjson': (
+            exchange.ndjson_stream, 'application/x-ndjson', 'notes.ndjson'
+        ),
+        'zip': (exchange.markdown_zip_stream, 'application/zip', 'notes.zip'),
+    }
+
+    def get(self, request, *args, **kwargs):
+        try:
+            stream, content_type, filename = self.formats[
+                request.GET.get('format', 'ndjson')
+            ]
+        except KeyError:
+            raise Http404('Неизвестный формат выгрузки')
+        response = StreamingHttpResponse(
+            stream(self.get_queryset(), settings.NOTES_EXPORT_CHUNK_SIZE),
+            content_type=content_type,
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
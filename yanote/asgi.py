@@ -9,8 +9,14 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yanote.settings')
 
-application = get_asgi_application()
+# Как get_asgi_application(), но потоковые ответы (выгрузка заметок,
+# статика) перебираются вне цикла событий.
+django.setup(set_prefix=False)
+
+from notes.asgi import StreamingASGIHandler  # noqa: E402
+
+application = StreamingASGIHandler()
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 from django.urls import reverse_lazy
@@ -22,40 +23,131 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'notes.middleware.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'notes.middleware.CompressionMiddleware',
+    'notes.middleware.StaticFilesMiddleware',
+    'notes.middleware.ConcurrencyLimitMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'notes.middleware.RateLimitMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
 ROOT_URLCONF = 'yanote.urls'
 
+# Настройки тестов задаются в тестовом окружении, а не здесь.
+TEST_RUNNER = 'notes.tests.runner.NotesTestRunner'
+
+CONTEXT_PROCESSORS = [
+    'django.template.context_processors.debug',
+    'django.template.context_processors.request',
+    'django.contrib.auth.context_processors.auth',
+    'django.contrib.messages.context_processors.messages',
+    'notes.context_processors.note_stats',
+]
+
+# Скомпилированные шаблоны кэшируются всегда, а не только при
+# DEBUG = False; после правки шаблона нужен перезапуск сервера.
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
+        'APP_DIRS': False,
         'OPTIONS': {
-            'context_processors': [
-                'django.template.context_processors.debug',
-                'django.template.context_processors.request',
-                'django.contrib.auth.context_processors.auth',
-                'django.contrib.messages.context_processors.messages',
+            'context_processors': CONTEXT_PROCESSORS,
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
             ],
         },
     },
 ]
 
+# YANOTE_JINJA2=1 отрисовывает страницы заметок шаблонами Jinja2
+# из notes/jinja2/ (нужен пакет jinja2).
+if os.environ.get('YANOTE_JINJA2') == '1':
+    TEMPLATES.insert(0, {
+        'BACKEND': 'django.template.backends.jinja2.Jinja2',
+        'DIRS': [],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'environment': 'notes.jinja_env.environment',
+            'context_processors': CONTEXT_PROCESSORS,
+        },
+    })
+
 WSGI_APPLICATION = 'yanote.wsgi.application'
 
 
-DATABASES = {
+# YANOTE_DB_PROFILE=production - профиль для нагруженного сервера:
+# постоянные соединения, PRAGMA для SQLite и транзакции BEGIN
+# IMMEDIATE. Без него база работает, как стандартная в Django:
+# так запускаются разработка и тесты.
+DB_PRODUCTION = os.environ.get('YANOTE_DB_PROFILE') == 'production'
+
+# Соединение с базой переиспользуется столько секунд; 0 - новое
+# соединение на каждый запрос.
+CONN_MAX_AGE = int(
+    os.environ.get('YANOTE_CONN_MAX_AGE', 60 if DB_PRODUCTION else 0)
+)
+
+# По умолчанию - SQLite; YANOTE_DB_ENGINE=postgresql включает
+# PostgreSQL с параметрами из переменных POSTGRES_* (нужен psycopg2).
+if os.environ.get('YANOTE_DB_ENGINE') == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'yanote'),
+            'USER': os.environ.get('POSTGRES_USER', 'yanote'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            'CONN_MAX_AGE': CONN_MAX_AGE,
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'yanote.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            'CONN_MAX_AGE': CONN_MAX_AGE,
+        }
+    }
+
+# PRAGMA профиля production: WAL позволяет читать во время записи,
+# synchronous=NORMAL в режиме WAL не теряет целостность при сбое,
+# busy_timeout - сколько миллисекунд писатель ждёт блокировку,
+# cache_size в КиБ со знаком минус.
+NOTES_SQLITE_PRODUCTION_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -20000,
+}
+# PRAGMA, которые бэкенд yanote.sqlite3 выполняет на каждом новом
+# соединении, и открывают ли atomic() транзакцию BEGIN IMMEDIATE.
+NOTES_SQLITE_PRAGMAS = NOTES_SQLITE_PRODUCTION_PRAGMAS if DB_PRODUCTION else {}
+NOTES_SQLITE_BEGIN_IMMEDIATE = DB_PRODUCTION
+
+
+# Кэш списка заметок работает с бэкендами locmem, filebased и db;
+# для db таблицу нужно создать командой createcachetable. Кэшу
+# пользователей и сессиям в кэше нужен общий для процессов кэш,
+# например django.core.cache.backends.memcached.PyMemcacheCache.
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': os.environ.get(
+            'YANOTE_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.environ.get('YANOTE_CACHE_LOCATION', ''),
     }
 }
 
@@ -82,8 +174,166 @@ USE_TZ = True
 
 
 STATIC_URL = '/static/'
+STATIC_ROOT = os.environ.get('YANOTE_STATIC_ROOT', BASE_DIR / 'staticfiles')
+STATICFILES_DIRS = [BASE_DIR / 'static']
+# collectstatic добавляет хеш содержимого к именам файлов и сохраняет
+# сжатые копии .gz и .br (для .br нужен пакет brotli).
+STATICFILES_STORAGE = 'notes.storage.CompressedManifestStaticFilesStorage'
+# Без манифеста collectstatic ссылка на статику - ошибка, как
+# в ManifestStaticFilesStorage. 0 - ссылаться на исходные имена,
+# для разработки без collectstatic.
+NOTES_STATIC_MANIFEST_STRICT = os.environ.get(
+    'YANOTE_STATIC_MANIFEST_STRICT', '1'
+) == '1'
+
+# Отдавать собранную статику из STATIC_ROOT самим приложением;
+# False, если её отдаёт веб-сервер. Файлы без хеша в имени
+# кэшируются на NOTES_STATIC_MAX_AGE секунд.
+NOTES_SERVE_STATIC = True
+NOTES_STATIC_MAX_AGE = 60 * 60
+
+# Сжатие ответов: тела меньше NOTES_COMPRESS_MIN_SIZE байт отдаются
+# как есть, потоковые ответы сбрасываются клиенту каждые
+# NOTES_COMPRESS_FLUSH_SIZE исходных байт. Brotli используется,
+# если установлен пакет brotli.
+NOTES_COMPRESS_MIN_SIZE = 512
+NOTES_COMPRESS_FLUSH_SIZE = 16 * 1024
+NOTES_GZIP_LEVEL = 6
+NOTES_BROTLI_QUALITY = 4
+
+# Корзины токенов для чтения и записи: (ёмкость, токенов в секунду)
+# на пользователя, для анонимных клиентов - на IP-адрес. Вид запроса
+# без записи не ограничивается.
+NOTES_RATE_LIMITS = {
+    'read': (
+        int(os.environ.get('YANOTE_RATE_LIMIT_READ_BURST', 300)),
+        float(os.environ.get('YANOTE_RATE_LIMIT_READ_RATE', 5)),
+    ),
+    'write': (
+        int(os.environ.get('YANOTE_RATE_LIMIT_WRITE_BURST', 60)),
+        float(os.environ.get('YANOTE_RATE_LIMIT_WRITE_RATE', 1)),
+    ),
+}
+# Сколько прокси перед приложением дописывают адрес в X-Forwarded-For;
+# 0 - адрес клиента берётся из REMOTE_ADDR.
+NOTES_RATE_LIMIT_PROXIES = int(os.environ.get('YANOTE_RATE_LIMIT_PROXIES', 0))
+# Сколько запросов процесс обрабатывает одновременно, остальные
+# получают 503 с Retry-After; 0 - без ограничения.
+NOTES_MAX_CONCURRENT_REQUESTS = int(
+    os.environ.get('YANOTE_MAX_CONCURRENT_REQUESTS', 0)
+)
+NOTES_OVERLOAD_RETRY_AFTER = 1
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# django.contrib.sessions.backends.cached_db читает сессии из кэша
+# и пишет в кэш и в базу; включается только с общим кэшем.
+SESSION_ENGINE = os.environ.get(
+    'YANOTE_SESSION_ENGINE', 'django.contrib.sessions.backends.db'
+)
+
+# ModelBackend остаётся в списке, чтобы сессии, начатые с ним,
+# не закончились при смене бэкенда.
+AUTHENTICATION_BACKENDS = [
+    'notes.backends.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
 LOGIN_URL = reverse_lazy('users:login')
 LOGIN_REDIRECT_URL = reverse_lazy('notes:home')
+
+# Количество заметок на одной странице списка;
+# None отключает постраничный вывод.
+NOTES_PAGE_SIZE = 50
+
+# Админка заметок не считает COUNT(*) по всей таблице: число строк
+# больше этого оценивается, а результаты поиска и фильтров
+# считаются не дальше этой границы.
+NOTES_ADMIN_COUNT_LIMIT = 10000
+
+
+# Кэш, в котором хранятся фрагменты списка заметок и их счётчики.
+NOTES_CACHE_ALIAS = 'default'
+# Время жизни фрагмента списка; устаревшие версии вытесняются сами.
+NOTES_LIST_CACHE_TIMEOUT = 60 * 60
+
+# Сколько секунд авторизованный пользователь хранится в кэше;
+# 0 - загружать из базы на каждом запросе. Включается только
+# с общим кэшем, например 60 вместе с YANOTE_CACHE_BACKEND.
+NOTES_USER_CACHE_TIMEOUT = int(
+    os.environ.get('YANOTE_USER_CACHE_TIMEOUT', 0)
+)
+
+# Отрисованный Markdown текста заметки хранится в кэше по хешу текста;
+# ключ меняется с каждой правкой, поэтому время жизни нужно только
+# для вытеснения неиспользуемых записей.
+NOTES_MARKDOWN_CACHE_TIMEOUT = 24 * 60 * 60
+
+# Сколько секунд сводка по заметкам пользователя для шапки страницы
+# хранится в кэше; при изменении заметок она удаляется из кэша сразу.
+NOTES_STATS_CACHE_TIMEOUT = 60 * 60
+
+# Максимальное количество операций в одном запросе к пакетному API.
+NOTES_API_BATCH_LIMIT = 500
+
+# Сколько заметок читается из базы за раз при потоковой выгрузке.
+NOTES_EXPORT_CHUNK_SIZE = 500
+
+# Текст заметки от стольких символов хранится сжатым алгоритмом
+# zlib или zstd (нужен пакет zstandard); сжимать уже сохранённые
+# заметки - команда compress_notes.
+NOTES_TEXT_COMPRESS_MIN_SIZE = int(
+    os.environ.get('YANOTE_TEXT_COMPRESS_MIN_SIZE', 4096)
+)
+NOTES_TEXT_COMPRESSION = os.environ.get('YANOTE_TEXT_COMPRESSION', 'zlib')
+
+# Ревизии заметки хранятся дельтами от предыдущей версии, и только
+# каждая N-я - полным текстом: восстановление любой версии читает
+# не больше N строк истории.
+NOTES_REVISION_SNAPSHOT_EVERY = 20
+
+# Асинхронные варианты списка и страницы заметки для запуска под ASGI
+# и размер пула потоков, в котором они обращаются к базе.
+NOTES_ASYNC_READ_VIEWS = os.environ.get('YANOTE_ASYNC_READ_VIEWS') == '1'
+NOTES_ASYNC_THREADS = int(os.environ.get('YANOTE_ASYNC_THREADS', 8))
+
+# Фоновые задачи notes.jobs. По умолчанию задача выполняется сразу
+# при постановке в очередь; с YANOTE_JOBS_SYNC=0 она записывается
+# в таблицу задач и выполняется командой run_jobs, которую нужно
+# держать запущенной рядом с сервером (см. notes/jobs.py).
+NOTES_JOBS_SYNC = os.environ.get('YANOTE_JOBS_SYNC', '1') == '1'
+# Попыток на задачу и секунд на попытку, если не заданы в enqueue().
+NOTES_JOBS_MAX_ATTEMPTS = 5
+NOTES_JOBS_TIMEOUT = 5 * 60
+# Пауза перед повтором удваивается с каждой попыткой, но не больше
+# NOTES_JOBS_RETRY_MAX_DELAY секунд.
+NOTES_JOBS_RETRY_DELAY = 10
+NOTES_JOBS_RETRY_MAX_DELAY = 60 * 60
+# Хранить ли выполненные задачи; иначе они удаляются.
+NOTES_JOBS_KEEP_DONE = False
+
+# Запрос, выполнивший больше SQL-запросов, попадает в журнал
+# notes.timing с уровнем WARNING: так видны регрессии вида N+1.
+NOTES_QUERY_BUDGET = 20
+
+# Заголовок Server-Timing раскрывает время запросов к базе, поэтому
+# его получают только сотрудники и все при DEBUG; True - всем.
+NOTES_SERVER_TIMING_PUBLIC = False
+
+# Замеры запросов пишутся в журнал notes.timing строками JSON;
+# уровень INFO записывает каждый запрос, WARNING - только превысившие
+# NOTES_QUERY_BUDGET.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'notes.timing': {
+            'handlers': ['console'],
+            'level': os.environ.get('YANOTE_TIMING_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
@@ -0,0 +1,28 @@
+"""
+SQLite с PRAGMA из настроек и транзакциями BEGIN IMMEDIATE.
+
+Каждое новое соединение выполняет NOTES_SQLITE_PRAGMAS.
+
+Стандартный бэкенд открывает atomic() командой BEGIN, и блокировка
+на запись берётся только при первой записи. Если к этому моменту
+другая транзакция уже что-то записала, SQLite сразу возвращает
+"database is locked", не дожидаясь busy_timeout. BEGIN IMMEDIATE
+(NOTES_SQLITE_BEGIN_IMMEDIATE) берёт блокировку в начале транзакции,
+поэтому параллельные писатели ждут друг друга, а не падают.
+"""
+from django.conf import settings
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def init_connection_state(self):
+        super().init_connection_state()
+        for name, value in settings.NOTES_SQLITE_PRAGMAS.items():
+            self.connection.execute(f'PRAGMA {name} = {value}')
+
+    def _start_transaction_under_autocommit(self):
+        if settings.NOTES_SQLITE_BEGIN_IMMEDIATE:
+            self.cursor().execute('BEGIN IMMEDIATE')
+        else:
+            super()._start_transaction_under_autocommit()